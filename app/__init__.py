@@ -1,55 +1,49 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, current_user
+from flask_login import LoginManager
 from flask_migrate import Migrate
 
-import rq
-from redis import Redis
 from config import Config
+from app.connections import Application
 
-from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
+# Database setup
+db = SQLAlchemy()
+migrate = Migrate()
 
-from flask_ckeditor import CKEditor, CKEditorField
+# Flask Login setup
+login = LoginManager()
+login.login_view = "main.login"
 
+def create_app(config_class=Config):
+    app = Application(__name__)
+    app.config.from_object(config_class)
 
-app = Flask(__name__)
-app.config.from_object(Config)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    login.init_app(app)
 
-# Database setup
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+    # Request latency, SQL and Redis instrumentation
+    from app import metrics
+    metrics.init_app(app)
 
-# Redis setup
-app.redis = Redis.from_url(app.config["REDIS_URL"])
-app.task_queue = rq.Queue("evaluation-tasks", connection=app.redis)
+    # Rendered fragment cache
+    from app import cache
+    cache.init_app(app)
 
-# Flask Login setup
-login = LoginManager(app)
-login.login_view = "login"
-
-from app.models import User, Problem, Contest, Registration, Submission, Announcement, SampleCase
-
-# Flask Admin setup
-ckeditor = CKEditor(app)
-admin = Admin(app, template_mode='bootstrap3')
-
-# BetterView allows us to use a more advanced text editor
-class BetterView(ModelView):
-    def is_accessible(self):
-        return current_user.is_authenticated # and current_user.is_admin
-
-    form_overrides = dict(body=CKEditorField)
-    create_template = 'edit.html'
-    edit_template = 'edit.html'
-
-# Setting up the administrators page
-admin.add_view(BetterView(Announcement, db.session))
-admin.add_view(BetterView(User, db.session))
-admin.add_view(BetterView(Problem, db.session))
-admin.add_view(BetterView(Contest, db.session))
-admin.add_view(BetterView(Registration, db.session))
-admin.add_view(BetterView(Submission, db.session))
-admin.add_view(BetterView(SampleCase, db.session))
-
-from app import routes, models
+    # current_user comes from a short lived cache, see app.identity
+    from app import identity
+    identity.init_app(app)
+
+    from app.routes import bp as main_bp
+    app.register_blueprint(main_bp)
+
+    # Flask Admin setup
+    if app.config["ADMIN_ENABLED"]:
+        from app import admin
+        admin.init_app(app)
+
+    from app import cli
+    cli.register(app)
+
+    return app
+
+from app import models
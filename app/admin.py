@@ -0,0 +1,119 @@
+from app import db, cache, rejudge, similarity
+from app.models import User, Problem, Contest, Registration, Submission, Announcement, SampleCase, Rejudge, SimilarityMatch
+from flask import flash, url_for
+from flask_login import current_user
+from markupsafe import Markup
+
+from flask_admin import Admin
+from flask_admin.contrib.sqla import ModelView
+from flask_admin.actions import action
+
+from flask_ckeditor import CKEditor, CKEditorField
+
+# The administrators page at /admin. Only imported when ADMIN_ENABLED is set,
+# so processes that don't serve it (the scheduler loop, one-off CLI commands)
+# skip Flask-Admin, CKEditor and building the views.
+
+# BetterView allows us to use a more advanced text editor
+class BetterView(ModelView):
+    def is_accessible(self):
+        return current_user.is_authenticated # and current_user.is_admin
+
+    form_overrides = dict(body=CKEditorField)
+    create_template = 'edit.html'
+    edit_template = 'edit.html'
+
+    # Actions only administrators may run
+    admin_actions = ()
+
+    def is_action_allowed(self, name):
+        if name in self.admin_actions and not current_user.is_admin:
+            return False
+        return super().is_action_allowed(name)
+
+    # Drop any cached pages showing the model. Done again after the commit so a
+    # page rendered in between doesn't stay cached with the old content.
+    def on_model_change(self, form, model, is_created):
+        cache.invalidate_model(model)
+
+    def after_model_change(self, form, model, is_created):
+        cache.invalidate_model(model)
+
+    def on_model_delete(self, model):
+        cache.invalidate_model(model)
+
+class SubmissionView(BetterView):
+    # Results are large and deferred, don't load them for every row
+    column_exclude_list = ("raw_testcases",)
+
+class ProblemView(BetterView):
+    admin_actions = ("rejudge",)
+
+    @action("rejudge", "Rejudge", "Rejudge every submission of the selected problems?")
+    def action_rejudge(self, ids):
+        for id in ids:
+            rejudge.create(problem_id=int(id))
+        flash(f"Started {len(ids)} rejudges.")
+
+class ContestView(BetterView):
+    admin_actions = ("rejudge", "similarity")
+
+    @action("rejudge", "Rejudge", "Rejudge every submission of the selected contests?")
+    def action_rejudge(self, ids):
+        for id in ids:
+            rejudge.create(contest_id=int(id))
+        flash(f"Started {len(ids)} rejudges.")
+
+    @action("similarity", "Check similarity", "Compare the accepted submissions of the selected contests?")
+    def action_similarity(self, ids):
+        count = sum(similarity.check(Contest.query.get(int(id))) for id in ids)
+        flash(f"Found {count} similar pairs.")
+
+def submission_link(view, context, model, name):
+    id = getattr(model, name)
+    return Markup(f'<a href="{url_for("main.submission", id=id)}">#{id}</a>')
+
+# Written by app.similarity.check, highest scores first
+class SimilarityMatchView(ModelView):
+    def is_accessible(self):
+        return current_user.is_authenticated and current_user.is_admin
+
+    can_create = False
+    can_edit = False
+    column_list = ("contest", "problem", "first_id", "second_id", "shared", "score", "created_at")
+    column_labels = {"first_id": "First", "second_id": "Second"}
+    column_formatters = {"first_id": submission_link, "second_id": submission_link}
+    column_filters = ("contest_id", "problem_id", "score")
+    column_default_sort = ("score", True)
+
+# Creating one starts it, app.rejudge does the rest
+class RejudgeView(ModelView):
+    def is_accessible(self):
+        return current_user.is_authenticated and current_user.is_admin
+
+    can_edit = False
+    form_columns = ("problem", "contest", "language", "user")
+    column_list = ("id", "problem", "contest", "language", "user", "total", "queued", "created_at", "finished_at")
+    column_default_sort = ("id", True)
+
+    def on_model_change(self, form, model, is_created):
+        if is_created:
+            model.language = model.language or None
+            rejudge.prepare(model)
+
+def init_app(app):
+    CKEditor(app)
+    admin = Admin(app, template_mode='bootstrap3')
+
+    # Setting up the administrators page
+    admin.add_view(BetterView(Announcement, db.session))
+    admin.add_view(BetterView(User, db.session))
+    admin.add_view(ProblemView(Problem, db.session))
+    admin.add_view(ContestView(Contest, db.session))
+    admin.add_view(BetterView(Registration, db.session))
+    admin.add_view(SubmissionView(Submission, db.session))
+    admin.add_view(BetterView(SampleCase, db.session))
+    admin.add_view(RejudgeView(Rejudge, db.session))
+    admin.add_view(SimilarityMatchView(SimilarityMatch, db.session, name="Similarity"))
+
+    return admin
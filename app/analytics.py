@@ -0,0 +1,219 @@
+from app import db, cache
+from app.models import ArchivedSubmission, Problem, Submission, TestcaseResult
+from flask import current_app
+from datetime import datetime
+from sqlalchemy import and_, case, func, union_all
+
+import json
+import redis
+
+# Contest statistics: attempts, accepted count and acceptance rate, time to
+# first solve, runtime and memory distributions of accepted submissions, per
+# problem and per language. Everything comes from one grouped query over a
+# projection of the contest's submissions (hot and archived) made during the
+# contest, per (problem, language), which is then rolled up here.
+#
+# Once the contest has ended and nothing is left to judge the numbers can't
+# change, so they are cached for CONTEST_STATS_TTL. Rejudges and admin edits
+# drop the entry through cache.contest_keys().
+
+# Upper bounds of the distribution buckets, the last bucket has none
+TIME_BUCKETS = (10, 50, 100, 250, 500, 1000, 2000)
+MEMORY_BUCKETS = (16, 32, 64, 128, 256)
+
+COLUMNS = ("problem_id", "language", "status", "timestamp", "max_time", "max_memory")
+
+def labelled(*columns):
+    return [column.label(name) for column, name in zip(columns, COLUMNS)]
+
+def projection(contest):
+    # COLUMNS of every submission made during the contest
+    hot = Submission.query.join(Problem, Problem.id == Submission.problem_id) \
+        .filter(Problem.contest_id == contest.id)
+
+    worst = db.session.query(
+        TestcaseResult.submission_id,
+        func.max(TestcaseResult.real_time).label("max_time"),
+        func.max(TestcaseResult.memory).label("max_memory")
+    ).filter(TestcaseResult.submission_id.in_(hot.with_entities(Submission.id).subquery())) \
+        .group_by(TestcaseResult.submission_id).subquery()
+
+    hot = hot.with_entities(*labelled(
+        Submission.problem_id,
+        Submission.language,
+        Submission.status,
+        Submission.timestamp,
+        worst.c.max_time,
+        worst.c.max_memory
+    )).outerjoin(worst, worst.c.submission_id == Submission.id) \
+        .filter(Submission.timestamp >= contest.start_time, Submission.timestamp <= contest.end_time)
+
+    cold = db.session.query(*labelled(
+        ArchivedSubmission.problem_id,
+        ArchivedSubmission.language,
+        ArchivedSubmission.status,
+        ArchivedSubmission.timestamp,
+        ArchivedSubmission.max_time,
+        ArchivedSubmission.max_memory
+    )).filter(ArchivedSubmission.contest_id == contest.id,
+        ArchivedSubmission.timestamp >= contest.start_time, ArchivedSubmission.timestamp <= contest.end_time)
+
+    return union_all(hot, cold).alias("submissions")
+
+def count_if(condition):
+    return func.sum(case([(condition, 1)], else_=0))
+
+def buckets(column, bounds, accepted):
+    # One count per bucket, the last for everything above the last bound
+    columns = []
+    lower = None
+
+    for bound in bounds + (None,):
+        condition = [accepted]
+        if lower is not None:
+            condition.append(column > lower)
+        if bound is not None:
+            condition.append(column <= bound)
+
+        columns.append(count_if(and_(*condition)))
+        lower = bound
+
+    return columns
+
+def query(contest):
+    s = projection(contest)
+    accepted = s.c.status == 0
+    measured = and_(accepted, s.c.max_time.isnot(None))
+
+    columns = [
+        Problem.id,
+        Problem.title,
+        s.c.language,
+        func.count(s.c.status),
+        count_if(accepted),
+        count_if(s.c.status == -2),
+        func.min(case([(accepted, s.c.timestamp)])),
+        count_if(measured),
+        func.sum(case([(measured, s.c.max_time)], else_=0)),
+        func.max(case([(accepted, s.c.max_time)])),
+        func.sum(case([(measured, s.c.max_memory)], else_=0)),
+        func.max(case([(accepted, s.c.max_memory)]))
+    ]
+    columns += buckets(s.c.max_time, TIME_BUCKETS, measured)
+    columns += buckets(s.c.max_memory, tuple(bound * 1024 ** 2 for bound in MEMORY_BUCKETS), measured)
+
+    return db.session.query(*columns).select_from(Problem) \
+        .outerjoin(s, s.c.problem_id == Problem.id) \
+        .filter(Problem.contest_id == contest.id) \
+        .group_by(Problem.id, Problem.title, s.c.language) \
+        .order_by(Problem.points, Problem.id)
+
+def rate(accepted, attempts):
+    return round(accepted / attempts, 4) if attempts else None
+
+def empty():
+    return {
+        "attempts": 0, "accepted": 0, "pending": 0, "first_solve": None,
+        "measured": 0, "total_time": 0, "max_time": None, "total_memory": 0, "max_memory": None,
+        "time_buckets": [0] * (len(TIME_BUCKETS) + 1), "memory_buckets": [0] * (len(MEMORY_BUCKETS) + 1)
+    }
+
+def add(totals, row):
+    # Folds one (problem, language) row into totals
+    attempts, accepted, pending, first_solve, measured, total_time, max_time, total_memory, max_memory = row[:9]
+    time_buckets = row[9:9 + len(TIME_BUCKETS) + 1]
+    memory_buckets = row[9 + len(TIME_BUCKETS) + 1:]
+
+    totals["attempts"] += attempts or 0
+    totals["accepted"] += int(accepted or 0)
+    totals["pending"] += int(pending or 0)
+    totals["measured"] += int(measured or 0)
+    totals["total_time"] += int(total_time or 0)
+    totals["total_memory"] += int(total_memory or 0)
+
+    if first_solve is not None and (totals["first_solve"] is None or first_solve < totals["first_solve"]):
+        totals["first_solve"] = first_solve
+    if max_time is not None:
+        totals["max_time"] = max(totals["max_time"] or 0, max_time)
+    if max_memory is not None:
+        totals["max_memory"] = max(totals["max_memory"] or 0, max_memory)
+
+    totals["time_buckets"] = [a + int(b or 0) for a, b in zip(totals["time_buckets"], time_buckets)]
+    totals["memory_buckets"] = [a + int(b or 0) for a, b in zip(totals["memory_buckets"], memory_buckets)]
+
+def summary(totals, contest):
+    first_solve = totals["first_solve"]
+    if isinstance(first_solve, str):
+        # SQLite hands back the text from inside CASE
+        first_solve = datetime.strptime(first_solve[:19], "%Y-%m-%d %H:%M:%S")
+
+    return {
+        "attempts": totals["attempts"],
+        "accepted": totals["accepted"],
+        "pending": totals["pending"],
+        "acceptance_rate": rate(totals["accepted"], totals["attempts"]),
+        "first_solve": int((first_solve - contest.start_time).total_seconds()) if first_solve else None,
+        "time": {
+            "avg": round(totals["total_time"] / totals["measured"], 1) if totals["measured"] else None,
+            "max": totals["max_time"],
+            "buckets": [{"le": bound, "count": count} for bound, count in zip(TIME_BUCKETS + (None,), totals["time_buckets"])]
+        },
+        "memory": {
+            "avg": round(totals["total_memory"] / totals["measured"]) if totals["measured"] else None,
+            "max": totals["max_memory"],
+            "buckets": [{"le": bound, "count": count} for bound, count in zip(MEMORY_BUCKETS + (None,), totals["memory_buckets"])]
+        }
+    }
+
+def compute(contest):
+    problems = {}
+    languages = {}
+    overall = empty()
+
+    for row in query(contest):
+        problem_id, title, language = row[:3]
+        problem = problems.setdefault(problem_id, {"id": problem_id, "title": title, "totals": empty(), "languages": {}})
+
+        if language is None:
+            # No submissions
+            continue
+
+        add(problem["totals"], row[3:])
+        add(problem["languages"].setdefault(language, empty()), row[3:])
+        add(languages.setdefault(language, empty()), row[3:])
+        add(overall, row[3:])
+
+    return {
+        "contest": contest.id,
+        "final": datetime.utcnow() > contest.end_time and overall["pending"] == 0,
+        "generated_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "overall": summary(overall, contest),
+        "problems": [dict(summary(problem["totals"], contest), id=problem["id"], title=problem["title"], languages={
+            language: summary(totals, contest) for language, totals in sorted(problem["languages"].items())
+        }) for problem in problems.values()],
+        "languages": {language: summary(totals, contest) for language, totals in sorted(languages.items())}
+    }
+
+def contest_stats(contest):
+    # Cached once final, computed on every call before that
+    backend = current_app.extensions["fragment_cache"]
+    key = cache.contest_keys(contest.id)[2]
+
+    if datetime.utcnow() > contest.end_time:
+        try:
+            cached = backend.get(key)
+        except redis.exceptions.RedisError:
+            cached = None
+
+        if cached is not None:
+            return json.loads(cached)
+
+    stats = compute(contest)
+
+    if stats["final"]:
+        try:
+            backend.set(key, json.dumps(stats), current_app.config["CONTEST_STATS_TTL"])
+        except redis.exceptions.RedisError:
+            pass
+
+    return stats
@@ -0,0 +1,93 @@
+from app import db
+from app.models import ArchivedSubmission, Contest, Fingerprint, Problem, Standing, Submission, SubmissionOutbox, \
+    SubmissionPayload, TestcaseResult
+from datetime import datetime, timedelta
+from sqlalchemy import exists
+from sqlalchemy.orm import selectinload, undefer
+
+import json
+
+# Moves judged submissions of contests that ended ARCHIVE_AFTER_DAYS ago from
+# the submission table (and its payload and testcase result rows) into
+# archived_submission, so the hot tables only hold what is still being judged,
+# listed and ranked. Submissions standings point at stay, which keeps
+# standings.rebuild() exact for archived contests.
+#
+# Every batch is moved in its own transaction with the rows locked (skipping
+# any a rejudge or the judge holds), inserting the archived copies before
+# deleting the originals, so it can run while the site is live. find() looks
+# in the hot table first for the same reason: a row is always in one of them.
+
+def find(submission_id):
+    # The submission or its archived copy, both serve the detail views
+    return Submission.query.get(submission_id) or ArchivedSubmission.query.get(submission_id)
+
+def candidates(cutoff, after, batch, contest_id=None):
+    query = db.session.query(Submission.id) \
+        .join(Problem, Problem.id == Submission.problem_id) \
+        .join(Contest, Contest.id == Problem.contest_id) \
+        .filter(Contest.end_time < cutoff, Submission.status != -2, Submission.id > after) \
+        .filter(~exists().where(Standing.submission_id == Submission.id)) \
+        .filter(~exists().where(SubmissionOutbox.submission_id == Submission.id))
+
+    if contest_id is not None:
+        query = query.filter(Contest.id == contest_id)
+
+    return [id for id, in query.order_by(Submission.id).limit(batch).with_for_update(of=Submission, skip_locked=True)]
+
+def move(ids):
+    submissions = Submission.query.filter(Submission.id.in_(ids)).options(
+        undefer("raw_testcases"),
+        selectinload(Submission.payload),
+        selectinload(Submission.results),
+        selectinload(Submission.problem)
+    ).all()
+
+    rows = []
+    for submission in submissions:
+        cases = submission.get_testcases()
+        rows.append({
+            "id": submission.id,
+            "contest_id": submission.problem.contest_id,
+            "user_id": submission.user_id,
+            "problem_id": submission.problem_id,
+            "timestamp": submission.timestamp,
+            "language": submission.language,
+            "status": submission.status,
+            "progress": submission.progress,
+            "max_time": max(case.get("real_time") or 0 for case in cases) if cases else None,
+            "max_memory": max(case.get("memory") or 0 for case in cases) if cases else None,
+            "code": submission.code,
+            "testcases": json.dumps(cases) if cases is not None else None
+        })
+
+    db.session.bulk_insert_mappings(ArchivedSubmission, rows)
+
+    for model in (TestcaseResult, SubmissionPayload, Fingerprint):
+        model.query.filter(model.submission_id.in_(ids)).delete(synchronize_session=False)
+    Submission.query.filter(Submission.id.in_(ids)).delete(synchronize_session=False)
+
+    db.session.commit()
+
+def run(days, batch=500, contest_id=None):
+    # Archives everything eligible in batches, returns the number moved
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    after = 0
+    count = 0
+
+    while True:
+        ids = candidates(cutoff, after, batch, contest_id)
+        if not ids:
+            db.session.rollback()
+            return count
+
+        move(ids)
+        after = ids[-1]
+        count += len(ids)
+
+def stats():
+    return {
+        "hot": Submission.query.count(),
+        "archived": ArchivedSubmission.query.count(),
+        "contests": db.session.query(db.func.count(db.distinct(ArchivedSubmission.contest_id))).scalar()
+    }
@@ -0,0 +1,141 @@
+from flask import current_app
+from markupsafe import Markup
+from collections import OrderedDict
+from sqlalchemy import inspect
+
+import threading
+import time
+import redis
+
+# Cache for rendered fragments of pages that only change when an admin edits
+# them (announcements, problem statements, contest problem lists). Entries are
+# dropped from the Flask-Admin hooks through invalidate() and expire after
+# FRAGMENT_CACHE_TTL seconds regardless.
+#
+# FRAGMENT_CACHE selects the backend: "redis" is shared by every worker,
+# "memory" is a per-process LRU (so an edit only clears the process that
+# handled it, the others catch up within the TTL) and "none" disables caching.
+
+class RedisBackend(object):
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    @property
+    def connection(self):
+        return current_app.redis
+
+    def get(self, key):
+        value = self.connection.get(f"{self.prefix}:{key}")
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.connection.set(f"{self.prefix}:{key}", value, ex=ttl)
+
+    def delete(self, *keys):
+        self.connection.delete(*[f"{self.prefix}:{key}" for key in keys])
+
+class MemoryBackend(object):
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+class NullBackend(object):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+def create_backend(kind, prefix, size):
+    if kind == "redis":
+        return RedisBackend(prefix)
+    elif kind == "memory":
+        return MemoryBackend(size)
+    return NullBackend()
+
+def init_app(app):
+    app.extensions["fragment_cache"] = create_backend(app.config["FRAGMENT_CACHE"], "fragment", app.config["FRAGMENT_CACHE_SIZE"])
+
+def fragment(key, render):
+    # Returns the cached HTML for key, rendering and storing it on a miss
+    backend = current_app.extensions["fragment_cache"]
+
+    try:
+        html = backend.get(key)
+    except redis.exceptions.RedisError:
+        return Markup(render())
+
+    if html is None:
+        html = render()
+
+        try:
+            backend.set(key, html, current_app.config["FRAGMENT_CACHE_TTL"])
+        except redis.exceptions.RedisError:
+            pass
+
+    return Markup(html)
+
+def invalidate(*keys):
+    try:
+        current_app.extensions["fragment_cache"].delete(*keys)
+    except redis.exceptions.RedisError:
+        pass
+
+def announcements_key():
+    return "announcements"
+
+def problem_key(problem_id):
+    return f"problem:{problem_id}"
+
+def contest_keys(contest_id):
+    # The problem list is rendered differently before and after the start,
+    # followed by the final statistics (see app.analytics)
+    return [f"contest:{contest_id}:started", f"contest:{contest_id}:upcoming", f"contest:{contest_id}:statistics"]
+
+def values(model, attribute):
+    # The current value along with the one it replaces in this edit, if any
+    return {getattr(model, attribute)} | set(inspect(model).attrs[attribute].history.deleted or ())
+
+def invalidate_model(model):
+    # Called by the admin views whenever a model is created, edited or deleted
+    name = type(model).__name__
+
+    if name == "Announcement":
+        invalidate(announcements_key())
+    elif name == "Problem":
+        invalidate(problem_key(model.id), *[key for id in values(model, "contest_id") for key in contest_keys(id)])
+    elif name == "SampleCase":
+        invalidate(*[problem_key(id) for id in values(model, "problem_id")])
+    elif name == "Contest":
+        invalidate(*contest_keys(model.id))
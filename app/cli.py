@@ -0,0 +1,227 @@
+import click
+import json
+import time
+
+from app import db, standings, scheduler, outbox, importer, archive, rejudge, reconciler, similarity
+from app.models import Contest, Problem, Rejudge, Submission, User
+
+def register(app):
+    @app.cli.group("standings")
+    def standings_group():
+        """Leaderboard standings commands."""
+        pass
+
+    @standings_group.command()
+    @click.argument("contest_id", type=int, required=False)
+    def rebuild(contest_id):
+        """Recompute standings from the submission table."""
+        if contest_id is None:
+            count = standings.rebuild_all()
+        else:
+            contest = Contest.query.get(contest_id)
+            if contest is None:
+                raise click.ClickException(f"Contest {contest_id} does not exist.")
+            count = standings.rebuild(contest)
+
+        click.echo(f"Rebuilt {count} standings.")
+
+    @app.cli.group("submissions")
+    def submissions_group():
+        """Submission storage commands."""
+        pass
+
+    @submissions_group.command()
+    @click.option("--batch", default=500, help="Submissions per transaction.")
+    def compact(batch):
+        """Move judged testcase results into compressed storage."""
+        count = 0
+
+        while True:
+            submissions = Submission.query.filter(Submission.raw_testcases.isnot(None), Submission.status != -2) \
+                .order_by(Submission.id).limit(batch).all()
+            if not submissions:
+                break
+
+            for submission in submissions:
+                submission.compact()
+
+            db.session.commit()
+            count += len(submissions)
+
+        click.echo(f"Compacted {count} submissions.")
+
+    @submissions_group.command()
+    @click.option("--batch", default=None, type=int, help="Jobs or submissions per batch.")
+    def reconcile(batch):
+        """Write back the state of judged submissions, land their verdicts and requeue those whose job vanished."""
+        counts = reconciler.reconcile(batch or app.config["RECONCILE_BATCH"])
+        click.echo(f"Finalised {counts['finalised']} jobs, landed {counts['landed']} verdicts, "
+            f"requeued {counts['recovered']} lost submissions.")
+
+    @submissions_group.command("archive")
+    @click.option("--days", default=None, type=int, help="Archive contests that ended this many days ago.")
+    @click.option("--batch", default=None, type=int, help="Submissions per transaction.")
+    @click.option("--contest", "contest_id", default=None, type=int, help="Only archive this contest.")
+    def archive_submissions(days, batch, contest_id):
+        """Move judged submissions of long finished contests to the archive table."""
+        if days is None:
+            days = app.config["ARCHIVE_AFTER_DAYS"]
+
+        count = archive.run(days, batch or app.config["ARCHIVE_BATCH"], contest_id)
+        click.echo(f"Archived {count} submissions.")
+
+    @submissions_group.command("stats")
+    def submission_stats():
+        """Show how many submissions are in the hot and archive tables."""
+        click.echo(json.dumps(archive.stats(), indent=4))
+
+    @app.cli.group("scheduler")
+    def scheduler_group():
+        """Evaluation queue scheduler commands."""
+        pass
+
+    @scheduler_group.command()
+    def run():
+        """Keep relaying the outbox, advancing rejudges, releasing held submissions to the evaluation queues
+        and finalising judged ones."""
+        reconciled = 0
+
+        while True:
+            rejudge.advance()
+            outbox.drain(app.config["OUTBOX_BATCH"])
+            scheduler.dispatch_all()
+            reconciler.land(app.config["RECONCILE_BATCH"])
+
+            if time.time() - reconciled >= app.config["RECONCILE_INTERVAL"]:
+                reconciler.reconcile(app.config["RECONCILE_BATCH"])
+                reconciled = time.time()
+
+            time.sleep(app.config["SCHEDULER_INTERVAL"])
+
+    @scheduler_group.command()
+    def stats():
+        """Show queue depth and wait time per queue and toolchain."""
+        click.echo(json.dumps(scheduler.stats(), indent=4))
+
+    @scheduler_group.command()
+    @click.argument("toolchain", type=click.Choice(scheduler.TOOLCHAINS))
+    def queues(toolchain):
+        """Print the queues a worker for TOOLCHAIN listens on."""
+        click.echo(" ".join(scheduler.worker_queues(toolchain)))
+
+    @app.cli.group("outbox")
+    def outbox_group():
+        """Submission outbox commands."""
+        pass
+
+    @outbox_group.command()
+    @click.option("--batch", default=None, type=int, help="Entries per batch.")
+    def relay(batch):
+        """Hand every due outbox entry to the scheduler once."""
+        count = outbox.drain(batch or app.config["OUTBOX_BATCH"])
+        click.echo(f"Relayed {count} submissions.")
+
+    @outbox_group.command("stats")
+    def outbox_stats():
+        """Show pending and retrying outbox entries."""
+        click.echo(json.dumps(outbox.stats(), indent=4))
+
+    @app.cli.group("problems")
+    def problems_group():
+        """Problem set commands."""
+        pass
+
+    @problems_group.command("import")
+    @click.argument("path", type=click.Path(exists=True))
+    @click.option("--contest", "contest_id", default=None, type=int, help="Import into this contest instead of contest.yaml's.")
+    @click.option("--batch", default=100, help="Rows per insert or update statement.")
+    @click.option("--dry-run", is_flag=True, help="Show what would change without writing anything.")
+    def import_problems(path, contest_id, batch, dry_run):
+        """Create or update problems and samples from a directory or zip archive."""
+        try:
+            count = importer.run(path, contest_id, batch, dry_run, lambda sign, text: click.echo(f"{sign} {text}"))
+        except importer.ArchiveError as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{'Checked' if dry_run else 'Imported'} {count} problems.")
+
+    @app.cli.group("rejudge")
+    def rejudge_group():
+        """Bulk rejudge commands."""
+        pass
+
+    @rejudge_group.command()
+    @click.option("--problem", "problem_id", default=None, type=int, help="Only this problem.")
+    @click.option("--contest", "contest_id", default=None, type=int, help="Only problems of this contest.")
+    @click.option("--language", default=None, type=click.Choice(scheduler.LANGUAGES), help="Only this language.")
+    @click.option("--user", "username", default=None, help="Only this user's submissions.")
+    def start(problem_id, contest_id, language, username):
+        """Rejudge every submission matching the given filters."""
+        if problem_id is None and contest_id is None and language is None and username is None:
+            raise click.ClickException("Give at least one of --problem, --contest, --language and --user.")
+
+        user_id = None
+        if username is not None:
+            user = User.query.filter_by(username=username).first()
+            if user is None:
+                raise click.ClickException(f"User {username} does not exist.")
+            user_id = user.id
+
+        job = rejudge.create(problem_id, contest_id, language, user_id)
+        click.echo(f"Rejudge {job.id} covers {job.total} submissions, `flask scheduler run` queues them.")
+
+    @rejudge_group.command("status")
+    @click.argument("rejudge_id", type=int, required=False)
+    def rejudge_status(rejudge_id):
+        """Show the progress of a rejudge, or of every unfinished one."""
+        if rejudge_id is None:
+            jobs = Rejudge.query.filter(Rejudge.finished_at.is_(None)).order_by(Rejudge.id).all()
+        else:
+            jobs = [Rejudge.query.get(rejudge_id)]
+            if jobs[0] is None:
+                raise click.ClickException(f"Rejudge {rejudge_id} does not exist.")
+
+        click.echo(json.dumps([rejudge.progress(job) for job in jobs], indent=4))
+
+    @app.cli.group("similarity")
+    def similarity_group():
+        """Code similarity commands."""
+        pass
+
+    @similarity_group.command()
+    @click.option("--contest", "contest_id", default=None, type=int, help="Only this contest.")
+    @click.option("--processes", default=None, type=int, help="Fingerprinting processes, one per CPU by default.")
+    @click.option("--batch", default=500, help="Submissions per transaction.")
+    def backfill(contest_id, processes, batch):
+        """Index accepted contest submissions judged before the similarity index existed."""
+        count = similarity.backfill(contest_id, processes, batch)
+        click.echo(f"Indexed {count} submissions.")
+
+    @similarity_group.command()
+    @click.argument("contest_id", type=int)
+    def check(contest_id):
+        """Find pairs of similar submissions in a contest."""
+        contest = Contest.query.get(contest_id)
+        if contest is None:
+            raise click.ClickException(f"Contest {contest_id} does not exist.")
+
+        count = similarity.check(contest)
+        click.echo(f"Found {count} similar pairs, see Similarity in the admin.")
+
+    @app.cli.group("verdicts")
+    def verdicts_group():
+        """Verdict cache commands."""
+        pass
+
+    @verdicts_group.command()
+    @click.argument("problem_id", type=int)
+    def invalidate(problem_id):
+        """Stop reusing verdicts after a problem's tests change."""
+        problem = Problem.query.get(problem_id)
+        if problem is None:
+            raise click.ClickException(f"Problem {problem_id} does not exist.")
+
+        problem.testcase_version = (problem.testcase_version or 1) + 1
+        db.session.commit()
+
+        click.echo(f"Problem {problem_id} is now at testcase version {problem.testcase_version}.")
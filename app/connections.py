@@ -0,0 +1,82 @@
+from flask import Flask
+from redis import Redis, BlockingConnectionPool
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+import os
+import threading
+
+# Connections are made on first use and belong to the process that made them.
+# current_app.redis and current_app.task_queues are created the first time a
+# process asks for them, so importing the app, running a CLI command or
+# starting a worker opens nothing. Everything is tied to the pid: when gunicorn
+# forks workers from a --preload master that already connected, each worker
+# builds its own Redis pool and rq queues, and database connections made
+# before the fork are discarded at checkout instead of being shared.
+
+class Application(Flask):
+    _redis = None
+    _task_queues = None
+    _pid = None
+    _lock = threading.Lock()
+
+    def _connections(self):
+        # Forget whatever another process made
+        pid = os.getpid()
+        if self._pid != pid:
+            self._redis = self._task_queues = None
+            self._pid = pid
+
+    @property
+    def redis(self):
+        with self._lock:
+            self._connections()
+            if self._redis is None:
+                self._redis = connect_redis(self.config)
+            return self._redis
+
+    @redis.setter
+    def redis(self, connection):
+        with self._lock:
+            self._connections()
+            self._redis = connection
+
+    @property
+    def task_queues(self):
+        connection = self.redis
+
+        with self._lock:
+            if self._task_queues is None:
+                from app import scheduler
+                self._task_queues = scheduler.create_queues(connection)
+            return self._task_queues
+
+    @task_queues.setter
+    def task_queues(self, queues):
+        with self._lock:
+            self._connections()
+            self._task_queues = queues
+
+def connect_redis(config):
+    from app import metrics
+
+    return metrics.instrument_redis(Redis(connection_pool=BlockingConnectionPool.from_url(
+        config["REDIS_URL"],
+        max_connections=config["REDIS_MAX_CONNECTIONS"],
+        timeout=config["REDIS_POOL_TIMEOUT"],
+        socket_timeout=config["REDIS_SOCKET_TIMEOUT"],
+        socket_connect_timeout=config["REDIS_SOCKET_TIMEOUT"],
+        health_check_interval=config["REDIS_HEALTH_CHECK_INTERVAL"]
+    )))
+
+@event.listens_for(Engine, "connect")
+def connect(dbapi_connection, connection_record):
+    connection_record.info["pid"] = os.getpid()
+
+@event.listens_for(Engine, "checkout")
+def checkout(dbapi_connection, connection_record, connection_proxy):
+    # A pooled connection inherited through fork, the pool opens a fresh one.
+    # It is dropped without being closed, closing it would end the parent's session.
+    if connection_record.info["pid"] != os.getpid():
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(f"Connection made in process {connection_record.info['pid']}, now in {os.getpid()}")
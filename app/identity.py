@@ -0,0 +1,85 @@
+from app import db, cache, login
+from app.models import User
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import load_only
+
+import json
+import redis
+
+# The identity behind current_user, cached for USER_CACHE_TTL seconds so
+# authenticated requests don't load the user row every time. Only the fields
+# the views and templates use are kept. Entries are dropped once a commit
+# changes or deletes the user (admin edits, password changes).
+#
+# USER_CACHE selects the backend like FRAGMENT_CACHE: "redis", "memory" (per
+# process, other workers catch up within the TTL) or "none".
+
+FIELDS = ("id", "username", "is_admin")
+
+class Identity(UserMixin):
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = is_admin
+
+    @property
+    def user(self):
+        # The full row, for the rare view that needs it
+        return User.query.get(self.id)
+
+def init_app(app):
+    app.extensions["user_cache"] = cache.create_backend(app.config["USER_CACHE"], "user", app.config["USER_CACHE_SIZE"])
+
+def backend():
+    return current_app.extensions["user_cache"]
+
+def load(user_id):
+    try:
+        cached = backend().get(user_id)
+    except redis.exceptions.RedisError:
+        cached = None
+
+    if cached is not None:
+        return Identity(**json.loads(cached))
+
+    user = User.query.options(load_only(*FIELDS)).get(user_id)
+    if user is None:
+        return None
+
+    fields = {field: getattr(user, field) for field in FIELDS}
+
+    try:
+        backend().set(user_id, json.dumps(fields), current_app.config["USER_CACHE_TTL"])
+    except redis.exceptions.RedisError:
+        pass
+
+    return Identity(**fields)
+
+@login.user_loader
+def load_user(id):
+    return load(int(id))
+
+def invalidate(*user_ids):
+    try:
+        backend().delete(*user_ids)
+    except redis.exceptions.RedisError:
+        pass
+
+@event.listens_for(db.session, "after_flush")
+def after_flush(session, flush_context):
+    changed = [user.id for user in session.deleted if isinstance(user, User)] + [
+        user.id for user in session.dirty if isinstance(user, User) and session.is_modified(user, include_collections=False)]
+    if changed:
+        session.info.setdefault("changed_users", set()).update(changed)
+
+@event.listens_for(db.session, "after_commit")
+def after_commit(session):
+    changed = session.info.pop("changed_users", None)
+    if changed:
+        invalidate(*changed)
+
+@event.listens_for(db.session, "after_rollback")
+def after_rollback(session):
+    session.info.pop("changed_users", None)
@@ -0,0 +1,323 @@
+from app import db, cache
+from app.models import Contest, Problem, SampleCase
+
+from collections import defaultdict
+from datetime import datetime
+
+import os
+import posixpath
+import zipfile
+
+# Imports a problem set from a directory or a zip archive laid out as
+#
+#   contest.yaml                  title, start_time, end_time and optionally
+#                                 editorial, submission_limit, submission_period
+#   <problem>/problem.yaml        title, points, difficulty, time_limit (ms),
+#                                 memory_limit (MB)
+#   <problem>/statement.md        or statement.html
+#   <problem>/samples/<name>.in   sample input, titled <name>
+#   <problem>/samples/<name>.out  sample output
+#   <problem>/samples/<name>.md   optional explanation
+#
+# Contests are matched by title, problems by title within their contest and
+# samples by title within their problem. Matching rows are updated with the
+# fields the files set (anything left out keeps its current value), the rest
+# inserted, and samples missing from the archive deleted. Problems are read
+# one at a time and written in batches, all in the caller's transaction.
+
+CONTEST_FIELDS = ("title", "start_time", "end_time", "editorial", "submission_limit", "submission_period")
+PROBLEM_FIELDS = ("title", "body", "points", "difficulty", "time_limit", "memory_limit")
+
+class ArchiveError(ValueError):
+    pass
+
+class DirectoryArchive(object):
+    def __init__(self, path):
+        self.path = path
+
+    def names(self):
+        for root, dirs, files in os.walk(self.path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.relpath(os.path.join(root, name), self.path).replace(os.sep, "/")
+
+    def read(self, name):
+        with open(os.path.join(self.path, name), encoding="utf-8") as f:
+            return f.read()
+
+class ZipArchive(object):
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path)
+
+    def names(self):
+        # Only the central directory is read, members are decompressed on demand
+        return sorted(info.filename for info in self.zip.infolist() if not info.filename.endswith("/"))
+
+    def read(self, name):
+        return self.zip.read(name).decode("utf-8")
+
+def open_archive(path):
+    if os.path.isdir(path):
+        return DirectoryArchive(path)
+    if zipfile.is_zipfile(path):
+        return ZipArchive(path)
+    raise ArchiveError(f"{path} is neither a directory nor a zip archive.")
+
+def load_yaml(archive, name):
+    import yaml
+
+    try:
+        data = yaml.safe_load(archive.read(name))
+    except yaml.YAMLError as e:
+        raise ArchiveError(f"{name}: {e}")
+
+    if not isinstance(data, dict):
+        raise ArchiveError(f"{name} must be a mapping.")
+    return data
+
+def require(data, name, fields):
+    missing = [field for field in fields if data.get(field) is None]
+    if missing:
+        raise ArchiveError(f"{name} is missing {', '.join(missing)}.")
+
+def timestamp(value, name):
+    if isinstance(value, datetime):
+        return value
+
+    for format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(str(value), format)
+        except ValueError:
+            pass
+
+    raise ArchiveError(f"{name}: {value!r} is not a date and time.")
+
+def markdown(text):
+    import markdown
+    return markdown.markdown(text, extensions=["fenced_code", "tables"])
+
+def index(archive):
+    # {directory: [file names]} from the listing alone
+    files = defaultdict(list)
+    for name in archive.names():
+        files[posixpath.dirname(name)].append(posixpath.basename(name))
+    return files
+
+def find(files, directory, *names):
+    for name in names:
+        if name in files.get(directory, ()):
+            return posixpath.join(directory, name)
+    return None
+
+def present(data, fields):
+    # Only the fields the file sets, the rest keep what the row has (admin edits included)
+    return {field: data[field] for field in fields if field in data}
+
+def read_contest(archive, files):
+    # The contest.yaml closest to the root, if any
+    directories = sorted((d for d in files if find(files, d, "contest.yaml", "contest.yml")),
+        key=lambda d: (d.count("/") if d else -1, d))
+    if not directories:
+        return None
+
+    name = find(files, directories[0], "contest.yaml", "contest.yml")
+    data = load_yaml(archive, name)
+    require(data, name, ("title", "start_time", "end_time"))
+
+    data["start_time"] = timestamp(data["start_time"], name)
+    data["end_time"] = timestamp(data["end_time"], name)
+    return present(data, CONTEST_FIELDS)
+
+def read_samples(archive, files, directory):
+    directory = posixpath.join(directory, "samples")
+    names = files.get(directory, [])
+
+    for stem in sorted({posixpath.splitext(name)[0] for name in names if name.endswith(".in")}):
+        if f"{stem}.out" not in names:
+            raise ArchiveError(f"{directory}/{stem}.in has no {stem}.out.")
+
+        explanation = find(files, directory, f"{stem}.md")
+        yield {
+            "title": stem,
+            "input_text": archive.read(posixpath.join(directory, f"{stem}.in")),
+            "output_text": archive.read(posixpath.join(directory, f"{stem}.out")),
+            "body": markdown(archive.read(explanation)) if explanation else None
+        }
+
+def read_problems(archive, files):
+    # (problem fields, samples) one problem at a time, samples read lazily
+    for directory in sorted(d for d in files if find(files, d, "problem.yaml", "problem.yml")):
+        name = find(files, directory, "problem.yaml", "problem.yml")
+        data = load_yaml(archive, name)
+        require(data, name, ("title", "points", "time_limit", "memory_limit"))
+
+        statement = find(files, directory, "statement.md", "statement.html")
+        if statement is None:
+            raise ArchiveError(f"{directory} has no statement.md or statement.html.")
+
+        body = archive.read(statement)
+        data["body"] = markdown(body) if statement.endswith(".md") else body
+
+        yield present(data, PROBLEM_FIELDS), read_samples(archive, files, directory)
+
+def changed(row, fields):
+    return [field for field, value in fields.items() if getattr(row, field) != value]
+
+class Writer(object):
+    # Queues row changes and writes them with bulk statements every batch rows
+    def __init__(self, batch, dry_run):
+        self.batch = batch
+        self.dry_run = dry_run
+        self.new_problems = []
+        self.inserts = []
+        self.updates = defaultdict(list)
+        self.deletes = defaultdict(list)
+        self.problem_ids = set()
+
+    def queued(self):
+        return len(self.new_problems) + len(self.inserts) + sum(map(len, self.updates.values())) + \
+            sum(map(len, self.deletes.values()))
+
+    def insert_problem(self, fields, samples):
+        self.new_problems.append((fields, samples))
+        self.maybe_flush()
+
+    def insert_sample(self, fields):
+        self.inserts.append(fields)
+        self.maybe_flush()
+
+    def update(self, model, fields):
+        self.updates[model].append(fields)
+        self.maybe_flush()
+
+    def delete(self, model, id):
+        self.deletes[model].append(id)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if self.queued() >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.dry_run:
+            if self.new_problems:
+                # Ids are needed for the samples
+                db.session.bulk_insert_mappings(Problem, [fields for fields, samples in self.new_problems],
+                    return_defaults=True)
+
+            for fields, samples in self.new_problems:
+                self.problem_ids.add(fields["id"])
+                for sample in samples:
+                    sample["problem_id"] = fields["id"]
+                    self.inserts.append(sample)
+
+            if self.inserts:
+                db.session.bulk_insert_mappings(SampleCase, self.inserts)
+            for model, rows in self.updates.items():
+                db.session.bulk_update_mappings(model, rows)
+            for model, ids in self.deletes.items():
+                model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+
+        self.new_problems = []
+        self.inserts = []
+        self.updates = defaultdict(list)
+        self.deletes = defaultdict(list)
+
+def import_samples(writer, problem, samples, echo):
+    existing = {sample.title: sample for sample in SampleCase.query.filter_by(problem_id=problem.id)}
+
+    for fields in samples:
+        sample = existing.pop(fields["title"], None)
+
+        if sample is None:
+            echo("+", f"sample {problem.title}/{fields['title']}")
+            writer.insert_sample(dict(fields, problem_id=problem.id))
+            writer.problem_ids.add(problem.id)
+            continue
+
+        fields_changed = changed(sample, fields)
+        if fields_changed:
+            echo("~", f"sample {problem.title}/{fields['title']} ({', '.join(fields_changed)})")
+            writer.update(SampleCase, dict(fields, id=sample.id))
+            writer.problem_ids.add(problem.id)
+
+    for sample in existing.values():
+        echo("-", f"sample {problem.title}/{sample.title}")
+        writer.delete(SampleCase, sample.id)
+        writer.problem_ids.add(problem.id)
+
+def run(path, contest_id=None, batch=100, dry_run=False, echo=None):
+    # Imports the archive at path, committing unless dry_run. echo(sign, text)
+    # is called for every row created (+), changed (~), deleted (-) or left as
+    # is (=). Returns the number of problems read.
+    echo = echo or (lambda sign, text: None)
+    archive = open_archive(path)
+    files = index(archive)
+    writer = Writer(batch, dry_run)
+    count = 0
+
+    try:
+        contest = None
+        fields = read_contest(archive, files)
+
+        if contest_id is not None:
+            contest = Contest.query.get(contest_id)
+            if contest is None:
+                raise ArchiveError(f"Contest {contest_id} does not exist.")
+        elif fields:
+            contest = Contest.query.filter_by(title=fields["title"]).first()
+
+            if contest is None:
+                echo("+", f"contest {fields['title']}")
+                if not dry_run:
+                    contest = Contest(**fields)
+                    db.session.add(contest)
+                    db.session.flush()
+            elif changed(contest, fields):
+                echo("~", f"contest {contest.title} ({', '.join(changed(contest, fields))})")
+                for field, value in fields.items():
+                    setattr(contest, field, value)
+
+        contest_id = contest.id if contest else None
+        existing = {problem.title: problem for problem in Problem.query.filter_by(contest_id=contest_id)} \
+            if contest or not fields else {}
+
+        for fields, samples in read_problems(archive, files):
+            count += 1
+            problem = existing.get(fields["title"])
+
+            if problem is None:
+                echo("+", f"problem {fields['title']}")
+                samples = list(samples)
+                for sample in samples:
+                    echo("+", f"sample {fields['title']}/{sample['title']}")
+                writer.insert_problem(dict(fields, contest_id=contest_id), samples)
+                continue
+
+            fields_changed = changed(problem, fields)
+            if fields_changed:
+                echo("~", f"problem {problem.title} ({', '.join(fields_changed)})")
+                writer.update(Problem, dict(fields, id=problem.id))
+                writer.problem_ids.add(problem.id)
+            else:
+                echo("=", f"problem {problem.title}")
+
+            import_samples(writer, problem, samples, echo)
+
+        writer.flush()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if dry_run:
+        db.session.rollback()
+        return count
+
+    db.session.commit()
+
+    # Pages showing the imported rows are cached
+    cache.invalidate(*[cache.problem_key(id) for id in writer.problem_ids])
+    if contest_id is not None:
+        cache.invalidate(*cache.contest_keys(contest_id))
+
+    return count
@@ -0,0 +1,121 @@
+from app import db
+from app.models import Contest, Problem
+from flask import current_app, request
+from flask_login import current_user
+from datetime import datetime
+from sqlalchemy import case, func, or_
+from werkzeug.http import is_resource_modified
+
+import hashlib
+import time
+
+# The problem and contest listings. Both read only the columns they show,
+# filter, sort and paginate in SQL, and answer conditional GETs: the ETag and
+# Last-Modified come from a version made of a few aggregates (row count, max
+# id, max updated_at and the contest starts and ends passed so far), so a
+# repeat visit costs one small query and a 304 instead of the whole page.
+#
+# Pages are per user (the navigation bar, the login form's CSRF token), so
+# they are only ever cached privately and revalidated on every visit.
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+
+# ?sort= of the problem list -> ORDER BY
+PROBLEM_SORTS = {
+    "id": lambda: [Problem.id],
+    "points": lambda: [Problem.points, Problem.id],
+    "-points": lambda: [Problem.points.desc(), Problem.id],
+    "difficulty": lambda: [case([(Problem.difficulty == d, i) for i, d in enumerate(DIFFICULTIES)],
+        else_=len(DIFFICULTIES)), Problem.points, Problem.id]
+}
+
+CONTEST_STATUSES = ("upcoming", "ongoing", "ended")
+
+def problems(difficulty=None, sort="id", page=1):
+    now = datetime.utcnow()
+
+    query = db.session.query(Problem.id, Problem.title, Problem.points, Problem.difficulty) \
+        .outerjoin(Contest, Contest.id == Problem.contest_id) \
+        .filter(or_(Problem.contest_id.is_(None), Contest.start_time <= now))
+
+    if difficulty:
+        query = query.filter(Problem.difficulty == difficulty)
+
+    return query.order_by(*PROBLEM_SORTS.get(sort, PROBLEM_SORTS["id"])()) \
+        .paginate(page, current_app.config["LISTING_PER_PAGE"], False)
+
+def contests(status=None, page=1):
+    now = datetime.utcnow()
+
+    query = db.session.query(Contest.id, Contest.title, Contest.start_time, Contest.end_time)
+
+    if status == "upcoming":
+        query = query.filter(Contest.start_time > now)
+    elif status == "ongoing":
+        query = query.filter(Contest.start_time <= now, Contest.end_time >= now)
+    elif status == "ended":
+        query = query.filter(Contest.end_time < now)
+
+    return query.order_by(Contest.start_time.desc(), Contest.id.desc()) \
+        .paginate(page, current_app.config["LISTING_PER_PAGE"], False)
+
+def aggregates(model):
+    return [func.count(model.id), func.max(model.id), func.max(model.updated_at)]
+
+def boundaries(now):
+    # What a listing shows changes as contests start and end
+    started, ended = Contest.start_time <= now, Contest.end_time < now
+
+    return [
+        func.sum(case([(started, 1)], else_=0)),
+        func.sum(case([(ended, 1)], else_=0)),
+        func.max(case([(started, Contest.start_time)])),
+        func.max(case([(ended, Contest.end_time)]))
+    ]
+
+def as_datetime(value):
+    if isinstance(value, str):
+        # SQLite hands back the text from inside CASE
+        return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
+    return value
+
+def version(*models):
+    # (tag, last modified) of listings of models
+    now = datetime.utcnow()
+    row = []
+
+    for model in models:
+        columns = aggregates(model)
+        if model is Contest:
+            columns += boundaries(now)
+        row += db.session.query(*columns).one()
+
+    last_modified = max([value for value in map(as_datetime, row) if isinstance(value, datetime)], default=None)
+    return "-".join(str(value) for value in row), last_modified
+
+def respond(name, models, render):
+    # A 304 when the client has this version for this user, render() otherwise
+    tag, last_modified = version(*models)
+
+    parts = [name, tag, str(current_user.get_id())]
+    limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    if not current_user.is_authenticated and limit:
+        # The login form carries a CSRF token that expires
+        parts.append(str(int(time.time() // max(limit // 2, 1))))
+    etag = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    # Listings don't show flashed messages, they stay for the next page that does
+    if not is_resource_modified(request.environ, etag, last_modified=last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(render())
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+
+    return response
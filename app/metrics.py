@@ -0,0 +1,185 @@
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import threading
+import time
+
+# Per-request instrumentation. Every request records its wall time, the number
+# and total time of the SQL statements it ran and the Redis commands it sent
+# (and in how many round-trips, a pipeline being one). The totals are kept as
+# Prometheus histograms in the process and served in the text format on
+# /metrics. Requests slower than SLOW_REQUEST_THRESHOLD seconds are logged with
+# their slowest statements.
+#
+# The registry lives in the process, so with several gunicorn workers each one
+# only reports the requests it served.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Statements shown for each slow request
+SLOW_STATEMENTS = 5
+
+class Histogram(object):
+    def __init__(self, name, help, buckets, labels):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+
+            series["count"] += 1
+            series["sum"] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                names = ",".join(f'{name}="{escape(value)}"' for name, value in zip(self.labels, labels))
+                prefix = names + "," if names else ""
+
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_count{{{names}}} {series['count']}")
+                lines.append(f"{self.name}_sum{{{names}}} {series['sum']}")
+
+        return "\n".join(lines)
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Request wall time.",
+    LATENCY_BUCKETS, ("endpoint", "method", "status"))
+SQL_QUERIES = Histogram("http_request_sql_queries", "SQL statements run by a request.",
+    COUNT_BUCKETS, ("endpoint",))
+SQL_DURATION = Histogram("http_request_sql_duration_seconds", "Total time spent in SQL statements by a request.",
+    LATENCY_BUCKETS, ("endpoint",))
+REDIS_COMMANDS = Histogram("http_request_redis_commands", "Redis commands sent by a request.",
+    COUNT_BUCKETS, ("endpoint",))
+REDIS_ROUNDTRIPS = Histogram("http_request_redis_roundtrips", "Redis round-trips made by a request.",
+    COUNT_BUCKETS, ("endpoint",))
+
+HISTOGRAMS = (REQUEST_DURATION, SQL_QUERIES, SQL_DURATION, REDIS_COMMANDS, REDIS_ROUNDTRIPS)
+
+def current():
+    # The stats of the request being served, None outside of requests
+    if has_request_context():
+        return g.get("metrics")
+    return None
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_start = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current()
+    if stats is None or context is None or not hasattr(context, "metrics_start"):
+        return
+
+    elapsed = time.perf_counter() - context.metrics_start
+    stats["queries"] += 1
+    stats["query_time"] += elapsed
+
+    if stats["statements"] is not None:
+        stats["statements"].append((elapsed, statement))
+
+def instrument_redis(connection):
+    # Counts the commands sent through connection (scripts included) and the
+    # pipelines it creates. Patched on the instance so rq and fakeredis clients
+    # keep working unchanged.
+    execute_command = connection.execute_command
+    pipeline = connection.pipeline
+
+    def counted_execute_command(*args, **options):
+        stats = current()
+        if stats is not None:
+            stats["redis_commands"] += 1
+            stats["redis_roundtrips"] += 1
+        return execute_command(*args, **options)
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*args, **kwargs):
+            stats = current()
+            if stats is not None and pipe.command_stack:
+                stats["redis_commands"] += len(pipe.command_stack)
+                stats["redis_roundtrips"] += 1
+            return execute(*args, **kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    connection.execute_command = counted_execute_command
+    connection.pipeline = counted_pipeline
+    return connection
+
+def start_request():
+    g.metrics = {
+        "start": time.perf_counter(),
+        "queries": 0,
+        "query_time": 0.0,
+        "statements": [] if current_app.config["SLOW_REQUEST_THRESHOLD"] else None,
+        "redis_commands": 0,
+        "redis_roundtrips": 0
+    }
+
+def finish_request(status):
+    stats = g.pop("metrics", None)
+    if stats is None:
+        return
+
+    elapsed = time.perf_counter() - stats["start"]
+    endpoint = request.endpoint or "none"
+
+    REQUEST_DURATION.observe(elapsed, endpoint, request.method, status)
+    SQL_QUERIES.observe(stats["queries"], endpoint)
+    SQL_DURATION.observe(stats["query_time"], endpoint)
+    REDIS_COMMANDS.observe(stats["redis_commands"], endpoint)
+    REDIS_ROUNDTRIPS.observe(stats["redis_roundtrips"], endpoint)
+
+    threshold = current_app.config["SLOW_REQUEST_THRESHOLD"]
+    if threshold and elapsed >= threshold:
+        slowest = sorted(stats["statements"], key=lambda s: s[0], reverse=True)[:SLOW_STATEMENTS]
+        current_app.logger.warning("Slow request %s %s: %.3fs, %d SQL statements in %.3fs, %d Redis commands in %d round-trips%s",
+            request.method, request.full_path.rstrip("?"), elapsed, stats["queries"], stats["query_time"],
+            stats["redis_commands"], stats["redis_roundtrips"],
+            "".join(f"\n  {duration:.3f}s {' '.join(statement.split())}" for duration, statement in slowest))
+
+def render():
+    return "\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
+
+def init_app(app):
+    # The Redis client is instrumented when it's made, see app.connections
+    @app.before_request
+    def before_request():
+        start_request()
+
+    @app.after_request
+    def after_request(response):
+        finish_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def teardown_request(exception):
+        # Only still pending when the view raised
+        if exception is not None:
+            finish_request(500)
+
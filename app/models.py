@@ -1,11 +1,22 @@
-from app import db, login
+from app import db, passwords, scheduler, verdicts
 from datetime import datetime
 from flask_login import UserMixin
 from flask import current_app
+import json
 import redis
 import rq
+import uuid
+import zlib
 
-from werkzeug.security import generate_password_hash, check_password_hash
+# Text stored zlib compressed, for the large submission payloads
+class CompressedText(db.TypeDecorator):
+    impl = db.LargeBinary
+
+    def process_bind_param(self, value, dialect):
+        return zlib.compress(value.encode("utf-8")) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return zlib.decompress(value).decode("utf-8") if value is not None else None
 
 class Announcement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,19 +39,16 @@ class User(UserMixin, db.Model):
     submissions = db.relationship('Submission', backref='author', lazy='dynamic')
     contests = db.relationship('Registration', backref='contestant', lazy='dynamic')
 
+    # Hashing runs off the request thread, see app.passwords
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.generate(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
-@login.user_loader
-def load_user(id):
-    return User.query.get(int(id))
+        return passwords.check(self.password_hash, password)
 
 class Problem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"))
+    contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"), index=True)
 
     title = db.Column(db.String(64))
     body = db.Column(db.Text)
@@ -51,6 +59,12 @@ class Problem(db.Model):
     time_limit = db.Column(db.Integer)
     memory_limit = db.Column(db.Integer)
 
+    # Bump when the tests change so cached verdicts are no longer reused
+    testcase_version = db.Column(db.Integer, default=1)
+
+    # Part of the version of the problem and contest listings
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
     submissions = db.relationship('Submission', backref='problem', lazy='dynamic')
     sample_cases = db.relationship("SampleCase", backref="problem", lazy="dynamic")
 
@@ -73,10 +87,20 @@ class Contest(db.Model):
     # NOTE: Not sure whether text or link to pdf
     editorial = db.Column(db.String(5000))
 
+    # Submissions allowed per user per problem every submission_period seconds,
+    # falls back to SUBMISSION_PROBLEM_RATE_LIMIT when not set
+    submission_limit = db.Column(db.Integer)
+    submission_period = db.Column(db.Integer)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
     registrations = db.relationship("Registration", backref="contest", lazy="dynamic")
     problems = db.relationship("Problem", backref="contest", lazy="dynamic")
 
 class Registration(db.Model):
+    # Also serves the lookups by (contest_id, user_id) and by contest_id alone
+    __table_args__ = (db.Index("ix_registration_contest_id_user_id", "contest_id", "user_id", unique=True),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"))
@@ -84,7 +108,31 @@ class Registration(db.Model):
     score = db.Column(db.Integer, default=0, index=True)
     last_submission = db.Column(db.DateTime, index=True)
 
+    standings = db.relationship("Standing", backref="registration", lazy="dynamic")
+
+# First accepted submission of a registration for a problem, kept up to date
+# by app.standings so the leaderboard doesn't have to search the submissions.
+class Standing(db.Model):
+    __table_args__ = (db.UniqueConstraint("registration_id", "problem_id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"), index=True)
+    registration_id = db.Column(db.Integer, db.ForeignKey("registration.id"))
+    problem_id = db.Column(db.Integer, db.ForeignKey("problem.id"))
+    submission_id = db.Column(db.Integer, db.ForeignKey("submission.id"))
+
+    solved_at = db.Column(db.DateTime)
+
 class Submission(db.Model):
+    __table_args__ = (
+        # Previous accepted submissions in launch_task
+        db.Index("ix_submission_user_id_problem_id_status", "user_id", "problem_id", "status"),
+        # Listings, newest first
+        db.Index("ix_submission_timestamp_id", "timestamp", "id"),
+        # Per contest listings and standings rebuilds
+        db.Index("ix_submission_problem_id_status_timestamp", "problem_id", "status", "timestamp"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     problem_id = db.Column(db.Integer, db.ForeignKey("problem.id"))
@@ -93,40 +141,109 @@ class Submission(db.Model):
     task_id = db.Column(db.String(64))
 
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    code = db.Column(db.Text)
     language = db.Column(db.String(16))
 
     status = db.Column(db.Integer, default = -2)
-    testcases = db.Column(db.Text)
+
+    # The judge writes the results here, compact() then moves them into the payload.
+    raw_testcases = db.deferred(db.Column("testcases", db.Text))
+
+    # Source code and results live compressed in their own table and are only
+    # loaded by the detail view and the judge.
+    payload = db.relationship("SubmissionPayload", uselist=False, backref="submission", cascade="all, delete-orphan")
 
     # Final progress isn't recorded until the end. 
     progress = db.Column(db.String(16), default = "0/0")
 
+    # Set once the verdict has landed (see app.reconciler), judge_time in ms.
+    # Indexed for app.reconciler.land, which looks for the ones still unset.
+    judged_at = db.Column(db.DateTime, index=True)
+    judge_time = db.Column(db.Integer)
+
+    # One row per testcase, written by the judge as each case finishes
+    results = db.relationship("TestcaseResult", order_by="TestcaseResult.case_no", backref="submission",
+        cascade="all, delete-orphan")
+
+    # Pending entry in the outbox, see app.outbox
+    outbox = db.relationship("SubmissionOutbox", uselist=False, backref="submission", cascade="all, delete-orphan")
+
+    # Similarity index entries of accepted contest submissions, see app.similarity
+    fingerprints = db.relationship("Fingerprint", lazy="dynamic", cascade="all, delete-orphan")
+
     # NOTE: This is to launch the task on the Redis Server
-    
-    # TODO: Rate limiting
+    # Rate limiting happens before the submission is created, see app.ratelimit
 
-    def launch_task(self):
+    def prepare_task(self, rejudge=False):
+        # The registration to credit (if any), the judge's arguments and the scheduling class
         contest = self.problem.contest
 
-        registration = Registration.query.filter_by(contest_id = contest.id, user_id = self.user_id).first()
+        registration = Registration.query.filter_by(contest_id = contest.id, user_id = self.user_id).first() if contest else None
         first_submission = not Submission.query.filter_by(user_id = self.user_id, problem_id = self.problem_id, status = 0).first()
 
         registration_id = None
 
         # Also need to check that the user haven't solved this question before.
-        if registration and self.timestamp <= contest.end_time and first_submission:
+        # Rejudges don't credit anything, app.rejudge rebuilds the standings once they finish.
+        if not rejudge and registration and self.timestamp <= contest.end_time and first_submission:
             registration_id = registration.id
 
-        rq_job = current_app.task_queue.enqueue('server.evaluate_submission', self.id, self.language, self.code,
+        args = [self.id, self.language, self.code,
         self.problem.memory_limit * 1024 ** 2, self.problem.time_limit, 
-        self.problem.id, registration_id, self.problem.points)
+        self.problem.id, registration_id, self.problem.points]
+
+        return registration if registration_id else None, args, scheduler.classify(contest, registration, rejudge)
+
+    def launch_task(self, rejudge=False):
+        # Schedules the submission straight away. Web requests hand it to the
+        # outbox instead so they never wait on Redis.
+        registration, args, klass = self.prepare_task(rejudge)
 
-        self.task_id = rq_job.get_id()
+        # Identical code was judged before under the same limits and tests
+        cached = verdicts.lookup(self)
+        if cached:
+            verdicts.apply(self, cached, registration)
+            return None
+
+        self.task_id = scheduler.schedule(self, args, klass)
         db.session.commit()
         
         return self.task_id
 
+    @property
+    def code(self):
+        return self.payload.code if self.payload else None
+
+    @code.setter
+    def code(self, code):
+        if self.payload is None:
+            self.payload = SubmissionPayload()
+        self.payload.code = code
+
+    @property
+    def testcases(self):
+        if self.raw_testcases is not None:
+            return self.raw_testcases
+        return self.payload.testcases if self.payload else None
+
+    def get_testcases(self):
+        # [{"id", "result", "real_time", "memory"}] from the result rows, or from
+        # the JSON results of submissions judged before they existed.
+        if self.results:
+            return [result.as_dict() for result in self.results]
+
+        try:
+            return json.loads(self.testcases)["data"]
+        except (TypeError, ValueError, KeyError):
+            return None
+
+    def compact(self):
+        # Moves the judge's results into the compressed payload
+        if self.raw_testcases is not None:
+            if self.payload is None:
+                self.payload = SubmissionPayload()
+            self.payload.testcases = self.raw_testcases
+            self.raw_testcases = None
+
     def get_rq_job(self):
         try:
             rq_job = rq.job.Job.fetch(self.task_id, connection=current_app.redis)
@@ -136,5 +253,149 @@ class Submission(db.Model):
         return rq_job
     
     def get_progress(self):
+        # Only pending submissions have anything newer in Redis
+        if self.status != -2:
+            return self.progress
+
         job = self.get_rq_job()
         return job.meta.get("progress", "0/0") if job else self.progress
+
+    @staticmethod
+    def get_progress_many(submissions):
+        # Fetches every job in a single Redis pipeline, {submission id: progress}
+        task_ids = [s.task_id for s in submissions if s.task_id and s.status == -2]
+
+        try:
+            jobs = rq.job.Job.fetch_many(task_ids, connection=current_app.redis) if task_ids else []
+        except redis.exceptions.RedisError:
+            jobs = []
+
+        metas = {job.id: job.meta for job in jobs if job}
+
+        return {
+            s.id: metas[s.task_id].get("progress", "0/0") if s.status == -2 and s.task_id in metas else s.progress
+            for s in submissions
+        }
+
+class SubmissionPayload(db.Model):
+    submission_id = db.Column(db.Integer, db.ForeignKey("submission.id"), primary_key=True)
+
+    code = db.Column(CompressedText)
+    testcases = db.Column(CompressedText)
+
+class TestcaseResult(db.Model):
+    submission_id = db.Column(db.Integer, db.ForeignKey("submission.id"), primary_key=True)
+    case_no = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    # Same codes as Submission.status, real_time in ms and memory in bytes
+    result = db.Column(db.Integer)
+    real_time = db.Column(db.Integer)
+    memory = db.Column(db.BigInteger)
+
+    def as_dict(self):
+        return {"id": self.case_no, "result": self.result, "real_time": self.real_time, "memory": self.memory}
+
+# Submissions waiting to be handed to the scheduler. Written in the same
+# transaction as the submission and drained by app.outbox.relay.
+class SubmissionOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # One pending entry per submission
+    submission_id = db.Column(db.Integer, db.ForeignKey("submission.id"), unique=True)
+    rejudge = db.Column(db.Boolean, default=False)
+    # Part of the job id. Never reused, unlike the id which SQLite hands out again once the row is gone
+    token = db.Column(db.String(32), default=lambda: uuid.uuid4().hex)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Failed entries are retried with backoff
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.String(256))
+
+# Judged submissions of contests that ended long ago, moved out of the
+# submission table by app.archive. Keeps the same id, and the code and results
+# (as JSON) compressed in the row.
+class ArchivedSubmission(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    problem_id = db.Column(db.Integer, db.ForeignKey("problem.id"))
+
+    timestamp = db.Column(db.DateTime)
+    language = db.Column(db.String(16))
+    status = db.Column(db.Integer)
+    progress = db.Column(db.String(16))
+    # Slowest and largest testcase, for the contest statistics
+    max_time = db.Column(db.Integer)
+    max_memory = db.Column(db.BigInteger)
+
+    code = db.deferred(db.Column(CompressedText))
+    testcases = db.deferred(db.Column(CompressedText))
+
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Same names as on Submission so the detail views don't need to tell them apart
+    author = db.relationship("User")
+    problem = db.relationship("Problem")
+
+    def get_testcases(self):
+        return json.loads(self.testcases) if self.testcases else None
+
+    def get_progress(self):
+        return self.progress
+
+# A bulk rejudge of every submission matching the filters that are set, up to
+# max_submission_id. Advanced a batch at a time by app.rejudge.
+class Rejudge(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    problem_id = db.Column(db.Integer, db.ForeignKey("problem.id"))
+    contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"))
+    language = db.Column(db.String(16))
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+
+    # Submissions made after it was created aren't included
+    max_submission_id = db.Column(db.Integer)
+    # Every matching submission up to this id has been queued
+    cursor = db.Column(db.Integer, default=0)
+
+    total = db.Column(db.Integer, default=0)
+    queued = db.Column(db.Integer, default=0)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set once everything is judged and the standings are rebuilt
+    finished_at = db.Column(db.DateTime, index=True)
+
+    problem = db.relationship("Problem")
+    contest = db.relationship("Contest")
+    user = db.relationship("User")
+
+# Inverted index of winnowing fingerprints, see app.similarity
+class Fingerprint(db.Model):
+    __table_args__ = (
+        # Candidate pairs of a problem
+        db.Index("ix_fingerprint_problem_id_hash", "problem_id", "hash"),
+    )
+
+    submission_id = db.Column(db.Integer, db.ForeignKey("submission.id"), primary_key=True)
+    hash = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    problem_id = db.Column(db.Integer, db.ForeignKey("problem.id"))
+
+# Pairs of submissions to the same problem with similar code, written by
+# app.similarity.check for the admin view
+class SimilarityMatch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    contest_id = db.Column(db.Integer, db.ForeignKey("contest.id"), index=True)
+    problem_id = db.Column(db.Integer, db.ForeignKey("problem.id"))
+
+    # Not foreign keys, either submission may be archived later
+    first_id = db.Column(db.Integer)
+    second_id = db.Column(db.Integer)
+
+    # Fingerprints in common, and their share of the smaller submission's
+    shared = db.Column(db.Integer)
+    score = db.Column(db.Float, index=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    contest = db.relationship("Contest")
+    problem = db.relationship("Problem")
@@ -0,0 +1,117 @@
+from app import db, scheduler, verdicts
+from app.models import Submission, SubmissionOutbox
+from flask import current_app
+from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+
+import redis
+
+# Transactional outbox for judging. A web request only adds the submission and
+# its outbox entry in one transaction and returns; relay() then hands the
+# entries to the scheduler in batches, one pipelined Redis round-trip per batch.
+#
+# Each entry is scheduled under the job id "submission:<id>:<entry token>" and
+# the scheduler ignores job ids it has seen, so a batch that reached Redis but
+# wasn't committed is simply replayed. The token is random, every later entry
+# of the submission (rejudges, recoveries) gets a job id of its own. Entries that fail are retried with
+# exponential backoff.
+
+# Longest wait between retries of a failing entry (seconds)
+MAX_BACKOFF = 300
+
+def add(submission, rejudge=False):
+    # Queues the submission for judging as part of the caller's transaction
+    if submission.outbox is None:
+        submission.outbox = SubmissionOutbox(rejudge=rejudge)
+
+def job_id(entry):
+    # Entries from before the token keep the job id they may have been scheduled under
+    return f"submission:{entry.submission_id}:{entry.token or entry.id}"
+
+def failed(entry, error, now):
+    entry.attempts = (entry.attempts or 0) + 1
+    entry.available_at = now + timedelta(seconds=min(2 ** entry.attempts, MAX_BACKOFF))
+    entry.last_error = str(error)[:256]
+
+def relay(batch=100):
+    # Schedules up to batch due entries, returns how many were taken
+    now = datetime.utcnow()
+
+    entries = SubmissionOutbox.query.filter(SubmissionOutbox.available_at <= now) \
+        .order_by(SubmissionOutbox.id).limit(batch) \
+        .options(selectinload(SubmissionOutbox.submission).selectinload(Submission.payload),
+            selectinload(SubmissionOutbox.submission).selectinload(Submission.problem)) \
+        .with_for_update(skip_locked=True).all()
+
+    if not entries:
+        db.session.rollback()
+        return 0
+
+    cached = verdicts.lookup_many([entry.submission for entry in entries])
+
+    tasks = []
+    hits = []
+    for entry in entries:
+        submission = entry.submission
+
+        try:
+            registration, args, klass = submission.prepare_task(entry.rejudge)
+        except Exception as e:
+            current_app.logger.exception("Could not prepare submission %s for judging", submission.id)
+            failed(entry, e, now)
+            continue
+
+        # Rejudges exist to run the tests again
+        if submission.id in cached and not entry.rejudge:
+            hits.append((entry, registration))
+        else:
+            tasks.append((entry, args, klass))
+
+    try:
+        skipped = scheduler.schedule_many([(entry.submission, args, klass, job_id(entry)) for entry, args, klass in tasks])
+    except redis.exceptions.RedisError as e:
+        current_app.logger.warning("Could not schedule %d submissions: %s", len(tasks), e)
+        for entry, args, klass in tasks:
+            failed(entry, e, now)
+        tasks = []
+        skipped = set()
+
+    for entry, args, klass in tasks:
+        if job_id(entry) in skipped:
+            # Only expected when an earlier relay of the entry reached Redis but didn't commit
+            current_app.logger.warning("Submission %s was already scheduled as %s, not scheduling it again",
+                entry.submission_id, job_id(entry))
+
+        entry.submission.task_id = job_id(entry)
+        db.session.delete(entry)
+
+    db.session.commit()
+
+    # Cached verdicts commit one at a time, the entry going in the same commit
+    for entry, registration in hits:
+        submission = entry.submission
+        db.session.delete(entry)
+        verdicts.apply(submission, cached[submission.id], registration)
+
+    return len(entries)
+
+def drain(batch=100):
+    # Relays until nothing is due, returns the number of entries taken
+    count = 0
+
+    while True:
+        taken = relay(batch)
+        count += taken
+
+        if taken < batch:
+            return count
+
+def stats():
+    now = datetime.utcnow()
+    oldest = db.session.query(db.func.min(SubmissionOutbox.created_at)).scalar()
+
+    return {
+        "pending": SubmissionOutbox.query.count(),
+        "retrying": SubmissionOutbox.query.filter(SubmissionOutbox.attempts > 0).count(),
+        "oldest_wait": round((now - oldest).total_seconds(), 3) if oldest else 0
+    }
@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import tuple_
+
+# Keyset (cursor) pagination over a (timestamp, id) ordering. Pages are found
+# by seeking the index to the cursor instead of counting and skipping rows, so
+# page 1000 costs the same as page 1.
+
+CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+
+def encode_cursor(row):
+    return f"{row.timestamp.strftime(CURSOR_FORMAT)}-{row.id}"
+
+def decode_cursor(cursor):
+    try:
+        timestamp, id = cursor.split("-")
+        return datetime.strptime(timestamp, CURSOR_FORMAT), int(id)
+    except (AttributeError, ValueError):
+        return None
+
+def keyset_page(query, timestamp, id, before=None, after=None, per_page=20):
+    # Newest first. Returns the rows along with the cursors of the newer and
+    # older pages, either of which is None when there's nothing there.
+    key = tuple_(timestamp, id)
+
+    before = decode_cursor(before)
+    after = decode_cursor(after)
+
+    if after:
+        rows = query.filter(key > after).order_by(timestamp, id).limit(per_page + 1).all()
+        newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        older = bool(rows)
+    else:
+        if before:
+            query = query.filter(key < before)
+
+        rows = query.order_by(timestamp.desc(), id.desc()).limit(per_page + 1).all()
+        older = len(rows) > per_page
+        rows = rows[:per_page]
+        newer = before is not None and bool(rows)
+
+    return (
+        rows,
+        encode_cursor(rows[0]) if newer else None,
+        encode_cursor(rows[-1]) if older else None
+    )
@@ -0,0 +1,50 @@
+from flask import current_app, has_app_context
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import os
+import sys
+import threading
+
+# Password hashing (pbkdf2, a few hundred milliseconds of CPU) runs on a small
+# pool of native threads shared by the whole process instead of the thread or
+# greenlet serving the request. Under gevent that keeps the event loop free;
+# with threaded workers it bounds how much CPU a login storm can take from the
+# other requests. The request still waits for its own result. Under gevent the
+# hub's native thread pool is used instead.
+
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+def green():
+    # True under gevent workers once the standard library is patched
+    if "gevent.monkey" not in sys.modules:
+        return False
+    return sys.modules["gevent.monkey"].is_module_patched("threading")
+
+def executor():
+    global _executor, _pid
+
+    with _lock:
+        # Threads don't survive fork, a worker forked from a --preload master makes its own pool
+        if _executor is None or _pid != os.getpid():
+            _executor = ThreadPoolExecutor(current_app.config["PASSWORD_HASH_WORKERS"])
+            _pid = os.getpid()
+        return _executor
+
+def run(fn, *args):
+    if not has_app_context():
+        return fn(*args)
+
+    if green():
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args)
+
+    return executor().submit(fn, *args).result()
+
+def generate(password):
+    return run(generate_password_hash, password)
+
+def check(password_hash, password):
+    return run(check_password_hash, password_hash, password)
@@ -0,0 +1,68 @@
+from app import db, archive
+from flask import current_app
+
+import json
+import time
+
+# Submission progress is pushed to the browser over server-sent events. The
+# evaluation worker calls publish() whenever job.meta["progress"] or the
+# status of a submission changes, and every open stream subscribed to that
+# submission forwards the update.
+
+def channel(submission_id):
+    return f"submission:{submission_id}:progress"
+
+def publish(connection, submission_id, progress, status, cases=None):
+    # Takes the connection explicitly as the worker runs outside the app context.
+    # The final verdict must be published after it is committed to the database.
+    # cases are the testcases finished since the last update, as given to
+    # testcases.record().
+    message = {"progress": progress, "status": status}
+    if cases:
+        message["cases"] = cases
+
+    connection.publish(channel(submission_id), json.dumps(message))
+
+def event(data):
+    return f"data: {json.dumps(data)}\n\n"
+
+def get_state(submission_id, cases):
+    submission = archive.find(submission_id)
+
+    state = {"progress": submission.get_progress(), "status": submission.status}
+    if cases:
+        state["cases"] = submission.get_testcases() or []
+    return state
+
+def stream(submission_id, cases=True):
+    # cases says whether the viewer may see the results per testcase
+    pubsub = current_app.redis.pubsub(ignore_subscribe_messages=True)
+
+    # Subscribe before reading the current state so no update is lost in between.
+    pubsub.subscribe(channel(submission_id))
+
+    try:
+        state = get_state(submission_id, cases)
+
+        # Don't hold on to a database connection for the lifetime of the stream.
+        db.session.close()
+
+        yield event(state)
+
+        deadline = time.time() + current_app.config["PROGRESS_STREAM_TIMEOUT"]
+        while state["status"] == -2 and time.time() < deadline:
+            message = pubsub.get_message(timeout=current_app.config["PROGRESS_HEARTBEAT"])
+
+            if message is None:
+                # Nothing was published for a while, check in case the worker
+                # finished without publishing. Also keeps the connection alive.
+                state = get_state(submission_id, cases)
+                db.session.close()
+            else:
+                state = json.loads(message["data"])
+                if not cases:
+                    state.pop("cases", None)
+
+            yield event(state)
+    finally:
+        pubsub.close()
@@ -0,0 +1,99 @@
+from app import scheduler
+from flask import current_app, request
+
+import math
+import time
+import redis
+
+# Token buckets kept in Redis. A limit of "5/60" allows bursts of 5 and refills
+# at 5 tokens per 60 seconds. Several buckets are checked and charged in one
+# script so a request refused by one of them doesn't use up the others.
+
+TAKE = """
+local now = tonumber(ARGV[1])
+local wait = 0
+
+local buckets = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = capacity / tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = math.min(capacity, (tonumber(state[1]) or capacity) + (now - (tonumber(state[2]) or now)) * rate)
+
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    buckets[i] = {tokens, capacity / rate}
+end
+
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        redis.call('HMSET', key, 'tokens', buckets[i][1] - 1, 'ts', now)
+        redis.call('EXPIRE', key, math.ceil(buckets[i][2]) + 1)
+    end
+end
+
+return tostring(wait)
+"""
+
+def parse(limit):
+    # "5/60" -> (5, 60)
+    count, period = str(limit).split("/")
+    return int(count), int(period)
+
+def take(buckets):
+    # buckets is a list of (key, "count/period"), returns the seconds to wait
+    # before trying again or 0 when the request is allowed.
+    buckets = [(key, parse(limit)) for key, limit in buckets if limit]
+    if not buckets:
+        return 0
+
+    args = [time.time()]
+    for _, (count, period) in buckets:
+        args += [count, period]
+
+    try:
+        wait = current_app.redis.register_script(TAKE)(keys=[f"ratelimit:{key}" for key, _ in buckets], args=args)
+    except redis.exceptions.RedisError:
+        # Fail open, a Redis outage shouldn't stop people submitting
+        return 0
+
+    return float(wait)
+
+def client_address():
+    return request.headers.get("X-Real-IP") or request.remote_addr
+
+def limit_auth(action):
+    # Login and registration hash passwords, limit them per address
+    wait = take([(f"{action}:{client_address()}", current_app.config["AUTH_RATE_LIMIT"])])
+    return f"Too many attempts, please try again in {math.ceil(wait)} seconds." if wait else None
+
+def admit_submission(user, problem, registration):
+    # Returns why the submission was refused, or None if it can go ahead
+    contest = problem.contest
+
+    problem_limit = current_app.config["SUBMISSION_PROBLEM_RATE_LIMIT"]
+    if contest and contest.submission_limit and contest.submission_period:
+        problem_limit = f"{contest.submission_limit}/{contest.submission_period}"
+
+    wait = take([
+        (f"submit:{user.id}", current_app.config["SUBMISSION_RATE_LIMIT"]),
+        (f"submit:{user.id}:{problem.id}", problem_limit)
+    ])
+    if wait:
+        return f"You are submitting too quickly, please try again in {math.ceil(wait)} seconds."
+
+    # Live contest submissions are always taken, they just wait their turn in
+    # the scheduler. Everything else is turned away while the judge is swamped.
+    klass = scheduler.classify(contest, registration) if contest else scheduler.PRACTICE
+    if klass != scheduler.CONTEST:
+        try:
+            backlog = scheduler.backlog()
+        except redis.exceptions.RedisError:
+            # Fail open like take(), the outbox holds it until Redis is back
+            return None
+
+        if backlog > current_app.config["ADMISSION_MAX_BACKLOG"]:
+            return "The judge is very busy right now, please try again in a few minutes."
+
+    return None
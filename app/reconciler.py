@@ -0,0 +1,171 @@
+from app import db, scheduler, verdicts, outbox
+from app.models import Submission, SubmissionOutbox
+from flask import current_app
+from datetime import datetime, timedelta
+from rq.job import Job
+from rq.registry import FinishedJobRegistry, FailedJobRegistry
+
+import redis
+
+# Lands and finalises judged submissions. land() runs verdicts.landed() (the
+# standings cell, the verdict cache, the similarity index) for every submission
+# the judge gave a verdict that hasn't landed yet, whether or not anyone is
+# watching it; the scheduler loop calls it on every pass.
+#
+# Finalising is so reads never go back to Redis. sweep() takes
+# the jobs in the finished and failed registries of every evaluation queue in
+# batches, writes the last progress and the judging time into the submission
+# row, runs verdicts.landed() and then deletes the jobs. Failed jobs leave the
+# submission with JUDGE_ERROR.
+#
+# recover() looks for submissions still pending after RECONCILE_STUCK_AFTER
+# seconds with no outbox entry, no held job in the scheduler and no rq job, i.e.
+# whose job vanished (Redis flushed, worker killed mid-pipeline), and puts them
+# back in the outbox. A job caught between being released by the scheduler and
+# enqueued looks vanished for an instant; requeuing it only judges it twice.
+
+# Shown as "Something went horribly wrong"
+JUDGE_ERROR = -4
+
+def members(job):
+    # [(submission id, job)] of an rq job, a batch unpacked to the jobs of its submissions
+    if job.func_name == "server.evaluate_batch":
+        jobs = Job.fetch_many(job.args[0], connection=current_app.redis)
+        return [(member.args[0], member) for member in jobs if member is not None]
+
+    return [(job.args[0], job)]
+
+def finalise(submission, job, run):
+    # run is the job rq ran, the same as job unless it was part of a batch
+    progress = job.meta.get("progress")
+    if progress:
+        submission.progress = progress
+
+    if run.started_at and run.ended_at:
+        submission.judge_time = int((run.ended_at - run.started_at).total_seconds() * 1000)
+    submission.judged_at = run.ended_at or datetime.utcnow()
+
+    if submission.status == -2:
+        # The judge never wrote a verdict
+        submission.status = JUDGE_ERROR
+
+def sweep_registry(registry, batch):
+    # Finalises the submissions of up to batch jobs of one registry, returns how many jobs were taken
+    job_ids = registry.get_job_ids(0, batch - 1)
+    if not job_ids:
+        return 0
+
+    jobs = Job.fetch_many(job_ids, connection=current_app.redis)
+    runs = {}
+    for job in jobs:
+        if job is not None:
+            for submission_id, member in members(job):
+                runs[submission_id] = (member, job)
+
+    submissions = Submission.query.filter(Submission.id.in_(runs)).all() if runs else []
+    landed = []
+
+    for submission in submissions:
+        member, job = runs[submission.id]
+
+        # A job left over from before a rejudge says nothing about the current run
+        if submission.task_id != member.id:
+            continue
+
+        if job.is_failed:
+            current_app.logger.warning("Judging submission %s failed in job %s", submission.id, job.id)
+
+        finalise(submission, member, job)
+        landed.append(submission)
+
+    db.session.commit()
+
+    for submission in landed:
+        verdicts.landed(submission)
+
+    with current_app.redis.pipeline() as pipe:
+        for job_id, job in zip(job_ids, jobs):
+            registry.remove(job_id, pipeline=pipe)
+            if job is not None:
+                pipe.delete(job.key)
+                if job.func_name == "server.evaluate_batch":
+                    pipe.delete(*[Job.key_for(id) for id in job.args[0]])
+        pipe.execute()
+
+    return len(job_ids)
+
+def sweep(batch=200):
+    # Finalises every finished and failed job, returns the number of jobs
+    count = 0
+
+    for queue in current_app.task_queues.values():
+        for registry in (FinishedJobRegistry(queue=queue), FailedJobRegistry(queue=queue)):
+            while True:
+                taken = sweep_registry(registry, batch)
+                count += taken
+
+                if taken < batch:
+                    break
+
+    return count
+
+def vanished(submissions):
+    # The submissions with neither a held nor an rq job, in one round-trip
+    checks = []
+
+    with current_app.redis.pipeline(transaction=False) as pipe:
+        for submission in submissions:
+            if submission.task_id:
+                pipe.exists(Job.key_for(submission.task_id))
+            for klass in scheduler.CLASSES:
+                pipe.hexists(scheduler.keys(klass, scheduler.toolchain(submission.language))["jobs"], submission.id)
+            checks.append(len(scheduler.CLASSES) + (1 if submission.task_id else 0))
+
+        found = iter(pipe.execute())
+
+    return [submission for submission, n in zip(submissions, checks) if not any([next(found) for _ in range(n)])]
+
+def recover(batch=200):
+    # Requeues pending submissions whose job vanished, returns how many
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config["RECONCILE_STUCK_AFTER"])
+    after = 0
+    count = 0
+
+    while True:
+        submissions = Submission.query.outerjoin(SubmissionOutbox) \
+            .filter(Submission.status == -2, Submission.timestamp < cutoff, Submission.id > after,
+                SubmissionOutbox.id.is_(None)) \
+            .order_by(Submission.id).limit(batch).all()
+        if not submissions:
+            db.session.rollback()
+            return count
+
+        for submission in vanished(submissions):
+            current_app.logger.warning("Submission %s lost its job %s, queueing it again", submission.id, submission.task_id)
+            outbox.add(submission)
+            count += 1
+
+        db.session.commit()
+        after = submissions[-1].id
+
+def land(batch=200):
+    # Lands up to batch judged submissions, newest first, returns how many
+    submissions = Submission.query.filter(Submission.judged_at.is_(None), Submission.status != -2) \
+        .order_by(Submission.id.desc()).limit(batch).all()
+
+    for submission in submissions:
+        verdicts.landed(submission)
+
+    db.session.rollback()
+    return len(submissions)
+
+def reconcile(batch=200):
+    try:
+        counts = {"finalised": sweep(batch), "recovered": recover(batch)}
+    except redis.exceptions.RedisError as e:
+        db.session.rollback()
+        current_app.logger.warning("Could not reconcile submissions: %s", e)
+        counts = {"finalised": 0, "recovered": 0}
+
+    counts["landed"] = land(batch)
+    return counts
@@ -0,0 +1,149 @@
+from app import db, cache, standings, testcases
+from app.models import Contest, Problem, Rejudge, Submission, SubmissionOutbox, SubmissionPayload
+from flask import current_app
+from datetime import datetime
+
+# Bulk rejudges, for when a problem's tests or limits are fixed after people
+# have submitted. create() records the filters; advance(), run by the
+# scheduler loop, then walks the matching submission ids in order and queues
+# them REJUDGE_RATE per second: each batch resets the submissions and adds
+# their outbox entries in one transaction, and the relay schedules the batch
+# in one pipelined round-trip on the low priority rejudge queues.
+#
+# Rejudged submissions don't credit scores as they land. Once every queued
+# submission has a verdict again the standings, scores and last submission
+# times of the affected contests are rebuilt, each in a single transaction.
+# A rejudge of a problem or contest also bumps the testcase version of its
+# problems, so identical resubmissions aren't given the old cached verdicts.
+# Archived submissions are not rejudged.
+
+def matching(rejudge):
+    query = Submission.query.filter(Submission.id <= rejudge.max_submission_id)
+
+    if rejudge.problem_id is not None:
+        query = query.filter(Submission.problem_id == rejudge.problem_id)
+    if rejudge.contest_id is not None:
+        query = query.join(Problem, Problem.id == Submission.problem_id).filter(Problem.contest_id == rejudge.contest_id)
+    if rejudge.language:
+        query = query.filter(Submission.language == rejudge.language)
+    if rejudge.user_id is not None:
+        query = query.filter(Submission.user_id == rejudge.user_id)
+
+    return query
+
+def prepare(rejudge):
+    # Fixes the set of submissions a new rejudge covers
+    rejudge.max_submission_id = db.session.query(db.func.max(Submission.id)).scalar() or 0
+    rejudge.total = matching(rejudge).count()
+
+    # New tests or limits, so the verdicts cached under the old ones may not be reused
+    problems = Problem.query
+    if rejudge.problem_id is not None:
+        problems = problems.filter(Problem.id == rejudge.problem_id)
+    if rejudge.contest_id is not None:
+        problems = problems.filter(Problem.contest_id == rejudge.contest_id)
+    if rejudge.problem_id is not None or rejudge.contest_id is not None:
+        for problem in problems:
+            problem.testcase_version = (problem.testcase_version or 1) + 1
+
+def create(problem_id=None, contest_id=None, language=None, user_id=None):
+    rejudge = Rejudge(problem_id=problem_id, contest_id=contest_id, language=language or None, user_id=user_id)
+    prepare(rejudge)
+
+    db.session.add(rejudge)
+    db.session.commit()
+
+    return rejudge
+
+def queue(rejudge, limit):
+    # Queues the next limit matching submissions, returns how many
+    ids = [id for id, in matching(rejudge).filter(Submission.id > rejudge.cursor)
+        .with_entities(Submission.id).order_by(Submission.id).limit(limit)]
+
+    if ids:
+        # Nothing of the earlier run may show while they wait, nor count as landed
+        Submission.query.filter(Submission.id.in_(ids)).update({
+            Submission.status: -2,
+            Submission.progress: "0/0",
+            Submission.task_id: None,
+            Submission.raw_testcases: None,
+            Submission.judged_at: None,
+            Submission.judge_time: None
+        }, synchronize_session=False)
+        SubmissionPayload.query.filter(SubmissionPayload.submission_id.in_(ids)) \
+            .update({SubmissionPayload.testcases: None}, synchronize_session=False)
+        testcases.reset(db.session, *ids)
+
+        # Submissions still waiting in the outbox are judged with the current tests anyway
+        waiting = {id for id, in db.session.query(SubmissionOutbox.submission_id)
+            .filter(SubmissionOutbox.submission_id.in_(ids))}
+        db.session.bulk_insert_mappings(SubmissionOutbox, [
+            {"submission_id": id, "rejudge": True} for id in ids if id not in waiting])
+
+        rejudge.cursor = ids[-1]
+        rejudge.queued += len(ids)
+
+    rejudge.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    return len(ids)
+
+def pending(rejudge):
+    return matching(rejudge).filter(Submission.id <= rejudge.cursor, Submission.status == -2).count()
+
+def contests(rejudge):
+    if rejudge.contest_id is not None:
+        return [Contest.query.get(rejudge.contest_id)]
+
+    problems = matching(rejudge).with_entities(Submission.problem_id).distinct().subquery()
+    return Contest.query.join(Problem, Problem.contest_id == Contest.id) \
+        .filter(Problem.id.in_(problems)).distinct().all()
+
+def finish(rejudge):
+    for contest in contests(rejudge):
+        standings.rebuild(contest)
+        cache.invalidate(*cache.contest_keys(contest.id))
+
+    rejudge.finished_at = datetime.utcnow()
+    db.session.commit()
+
+def advance():
+    # One step of every unfinished rejudge, returns the number of submissions queued
+    now = datetime.utcnow()
+    count = 0
+
+    for rejudge in Rejudge.query.filter(Rejudge.finished_at.is_(None)).order_by(Rejudge.id).all():
+        if rejudge.queued < rejudge.total and rejudge.cursor < rejudge.max_submission_id:
+            # Whatever the rate allows since the last step
+            elapsed = (now - rejudge.updated_at).total_seconds()
+            limit = min(int(current_app.config["REJUDGE_RATE"] * elapsed), current_app.config["REJUDGE_BATCH"])
+
+            if limit >= 1:
+                queued = queue(rejudge, limit)
+                count += queued
+
+                if queued == limit:
+                    continue
+            else:
+                continue
+
+        if pending(rejudge) == 0:
+            finish(rejudge)
+
+    return count
+
+def progress(rejudge):
+    waiting = pending(rejudge)
+
+    return {
+        "id": rejudge.id,
+        "problem": rejudge.problem_id,
+        "contest": rejudge.contest_id,
+        "language": rejudge.language,
+        "user": rejudge.user_id,
+        "total": rejudge.total,
+        "queued": rejudge.queued,
+        "judged": rejudge.queued - waiting,
+        "created_at": rejudge.created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "finished_at": rejudge.finished_at.strftime("%Y-%m-%dT%H:%M:%SZ") if rejudge.finished_at else None
+    }
@@ -1,9 +1,10 @@
-from flask import render_template, flash, redirect, url_for, request, jsonify
+from flask import Blueprint, current_app, render_template, flash, redirect, url_for, request, jsonify, abort, Response, stream_with_context
 from flask_login import current_user, login_user, logout_user, login_required
 from werkzeug.urls import url_parse
+from sqlalchemy.orm import joinedload, load_only, defer
 
-from app import app, db
-from app.models import User, Submission, Problem, Announcement, Contest, Registration
+from app import db, cache, standings, progress, pagination, scheduler, ratelimit, metrics, outbox, testcases, archive, analytics, rejudge, listings
+from app.models import User, Submission, Problem, Announcement, Contest, Registration, Rejudge
 from app.forms import LoginForm, SubmissionForm, RegistrationForm, ContestForm
 from datetime import datetime
 
@@ -11,20 +12,33 @@ from redis import Redis
 import json
 import sys
 
+bp = Blueprint("main", __name__)
+
 def get_kwargs():
     return {"login_form": LoginForm(), "registration_form": RegistrationForm(), "current_time": datetime.utcnow()}
 
-@app.route('/')
-@app.route('/index')
+def shows_cases(submission):
+    # Results per testcase stay with the author until the contest ends
+    contest = submission.problem.contest
+    return contest is None or datetime.utcnow() > contest.end_time or \
+        (current_user.is_authenticated and current_user.id == submission.user_id)
+
+@bp.route('/')
+@bp.route('/index')
 def index():
-    posts = Announcement.query.order_by(Announcement.timestamp.desc()).all()
-    return render_template("index.html", posts=posts, **get_kwargs())
+    announcements = cache.fragment(cache.announcements_key(), lambda: render_template("fragments/announcements.html",
+        posts=Announcement.query.order_by(Announcement.timestamp.desc()).all()))
+
+    return render_template("index.html", announcements=announcements, **get_kwargs())
 
-@app.route('/register', methods=['POST'])
+@bp.route('/register', methods=['POST'])
 def register():
     form = RegistrationForm()
 
-    if form.validate_on_submit():
+    refused = ratelimit.limit_auth("register")
+    if refused:
+        flash(refused)
+    elif form.validate_on_submit():
         user = User(username=form.username.data.lower(), email=form.email.data)
         user.set_password(form.password.data)
         db.session.add(user)
@@ -32,13 +46,16 @@ def register():
 
         flash("Congratulations! You have succesfully registered.")
     
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def login():
     form = LoginForm()
 
-    if form.validate_on_submit():
+    refused = ratelimit.limit_auth("login")
+    if refused:
+        flash(refused)
+    elif form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data.lower()).first()
 
         if user is None or not user.check_password(form.password.data):
@@ -47,9 +64,9 @@ def login():
             login_user(user, remember=form.remember_me.data)
             flash(f"Welcome back {form.username.data.lower().capitalize()}!")
 
-    return redirect(url_for("index"))
+    return redirect(url_for("main.index"))
 
-@app.route("/contest/<int:id>", methods = ["GET", "POST"])
+@bp.route("/contest/<int:id>", methods = ["GET", "POST"])
 def contest(id):
     c = Contest.query.get(id)
     form = ContestForm()
@@ -64,7 +81,7 @@ def contest(id):
                 registration = None
                 flash("You are now unregistered for this contest.")
             else:
-                registration = Registration(contestant=current_user, contest=c)
+                registration = Registration(user_id=current_user.id, contest=c)
                 db.session.add(registration)
                 flash("You are now registered for this contest.")
         
@@ -72,16 +89,21 @@ def contest(id):
     else:
         flash("You must be logged in to register for this contest.")
 
-    return render_template("contest.html", contest=c, form=form, registration=registration, **get_kwargs())
+    started = datetime.utcnow() >= c.start_time
+    problems = cache.fragment(cache.contest_keys(id)[0 if started else 1], lambda: render_template(
+        "fragments/contest_problems.html", contest=c, started=started))
 
+    return render_template("contest.html", contest=c, form=form, registration=registration, problems=problems, **get_kwargs())
 
-@app.route('/problem/<int:id>', methods = ["GET", "POST"])
+
+@bp.route('/problem/<int:id>', methods = ["GET", "POST"])
 def problem(id):
-    p = Problem.query.get(id)
+    # The statement is only loaded when it isn't cached
+    p = Problem.query.options(defer("body")).get(id)
 
     if (p.contest and p.contest.start_time >= datetime.utcnow()) and (not current_user.is_authenticated or current_user.is_admin):
         flash("This question cannot be accessed before the contest starts!")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     form = SubmissionForm()
 
@@ -94,98 +116,204 @@ def problem(id):
         elif sys.getsizeof(form.code.data) > 512000:
             flash("File size limit exceeded. The source code must be at most 512 kb.")
         else:
-            submission = Submission(        
-                author = current_user,
-                problem = Problem.query.get(id),
-                code = form.code.data,
-                language = form.language.data
-            )
+            registration = Registration.query.filter_by(contest_id=p.contest_id, user_id=current_user.id).first()
+            refused = ratelimit.admit_submission(current_user, p, registration)
+
+            if refused:
+                flash(refused)
+            else:
+                submission = Submission(        
+                    user_id = current_user.id,
+                    problem = p,
+                    code = form.code.data,
+                    language = form.language.data
+                )
 
-            db.session.add(submission)
-            db.session.commit()
+                # Judging is queued in the same transaction, the relay schedules it
+                outbox.add(submission)
+                db.session.add(submission)
+                db.session.commit()
 
-            submission.launch_task()        
+    statement = cache.fragment(cache.problem_key(id), lambda: render_template(
+        "fragments/problem_statement.html", problem=p))
 
-    return render_template("problem.html", problem=p, form=form, submission=submission, **get_kwargs())
+    return render_template("problem.html", problem=p, form=form, submission=submission, statement=statement, **get_kwargs())
 
-@app.route("/submission/<int:id>", methods = ["GET"])
+@bp.route("/submission/<int:id>", methods = ["GET"])
 def submission(id):
-    s = Submission.query.get(id)
+    s = archive.find(id)
+    if s is None:
+        abort(404)
 
-    if datetime.utcnow() <= s.problem.contest.end_time and current_user != s.author:
+    if not shows_cases(s):
         flash("You can only view this submission when the contest ends!")
-        return redirect(url_for("index"))
-
-    try:
-        testcases = json.loads(s.testcases)
-    except:
-        testcases = None
+        return redirect(url_for("main.index"))
 
-    return render_template("submission.html", submission=s, testcases=testcases, **get_kwargs())
+    return render_template("submission.html", submission=s, testcases=s.get_testcases(), **get_kwargs())
 
-@app.route("/contest/<int:id>/leaderboard")
+@bp.route("/contest/<int:id>/leaderboard")
 def leaderboard(id):
-    registrations = Registration.query.filter_by(contest_id=id).order_by(Registration.score.desc(), Registration.last_submission)
     contest = Contest.query.get(id)
+    registrations = Registration.query.filter_by(contest_id=id).options(joinedload(Registration.contestant)) \
+        .order_by(Registration.score.desc(), Registration.last_submission).all()
 
+    cells = standings.get_standings(id)
     problems = []
 
-    for problem in contest.problems:
-        data = {
+    for problem in contest.problems.order_by(Problem.points, Problem.id):
+        problems.append({
             "id": problem.id,
             "score": problem.points,
-            "users": {}
-        }
+            "users": cells.get(problem.id, {})
+        })
 
-        for registration in registrations:
-            submission = Submission.query.filter_by(status=0, author=registration.contestant, problem_id=problem.id).order_by(Submission.timestamp).first()
+    return render_template("leaderboard.html", problems=problems, registrations=registrations, contest=contest, **get_kwargs())
 
-            if submission and contest.start_time <= submission.timestamp <= contest.end_time:
-                data["users"][registration.user_id] = submission
+def get_contest_stats(id):
+    # Organisers can watch them during the contest, everyone else once it ends
+    contest = Contest.query.get(id)
+    if contest is None:
+        abort(404)
 
-        problems.append(data)
+    if datetime.utcnow() <= contest.end_time and not (current_user.is_authenticated and current_user.is_admin):
+        abort(403)
 
-    problems.sort(key=lambda x: x["score"])
+    return contest, analytics.contest_stats(contest)
 
-    return render_template("leaderboard.html", problems=problems, registrations=registrations, contest=contest, **get_kwargs())
+@bp.route("/contest/<int:id>/statistics")
+def contest_statistics(id):
+    contest, stats = get_contest_stats(id)
+    return render_template("contest_statistics.html", contest=contest, stats=stats, **get_kwargs())
 
+@bp.route("/api/contest/<int:id>/statistics")
+def get_contest_statistics(id):
+    contest, stats = get_contest_stats(id)
+    return jsonify(stats)
 
-@app.route("/problems", methods = ["GET"])
+
+@bp.route("/problems", methods = ["GET"])
 def problem_list():
-    problems = Problem.query.all()
+    difficulty = request.args.get("difficulty")
+    sort = request.args.get("sort", "id")
+    page = request.args.get("page", 1, type=int)
 
-    return render_template("problem_list.html", problems=problems, **get_kwargs())
+    return listings.respond("problems", (Problem, Contest), lambda: render_template("problem_list.html",
+        problems=listings.problems(difficulty, sort, page), difficulty=difficulty, sort=sort,
+        difficulties=listings.DIFFICULTIES, **get_kwargs()))
 
-@app.route("/contests", methods = ["GET"])
+@bp.route("/contests", methods = ["GET"])
 def contest_list():
-    contests = Contest.query.all()
+    status = request.args.get("status")
+    page = request.args.get("page", 1, type=int)
 
-    return render_template("contest_list.html", contests=contests, **get_kwargs())
+    return listings.respond("contests", (Contest,), lambda: render_template("contest_list.html",
+        contests=listings.contests(status, page), status=status, statuses=listings.CONTEST_STATUSES, **get_kwargs()))
 
-@app.route("/submissions", methods = ["GET"])
+@bp.route("/submissions", methods = ["GET"])
 def submission_list():
-    contest_id = request.args.get("contest")
-    page = request.args.get("page", 1, type=int)
-
+    contest_id = request.args.get("contest", type=int)
+
+    # Only the columns the listing shows, the code and testcases stay in the database
+    submissions = db.session.query(
+        Submission.id,
+        Submission.timestamp,
+        Submission.problem_id,
+        Submission.language,
+        Submission.status,
+        User.username,
+        Problem.title.label("problem_title")
+    ).outerjoin(User, User.id == Submission.user_id).join(Problem, Problem.id == Submission.problem_id)
 
     if contest_id:
-        contest = Contest.query.get(contest_id)
-        submissions = Submission.query.filter(Submission.problem.has(contest=contest)).order_by(Submission.timestamp.desc())
-    else:
-        submissions = Submission.query.order_by(Submission.timestamp.desc())
+        submissions = submissions.filter(Problem.contest_id == contest_id)
 
-    return render_template("submission_list.html", submissions=submissions.paginate(page, 20).items, **get_kwargs())
+    submissions, newer, older = pagination.keyset_page(submissions, Submission.timestamp, Submission.id,
+        before=request.args.get("before"), after=request.args.get("after"))
 
-@app.route('/api/submission/<int:id>')
+    return render_template("submission_list.html", submissions=submissions, newer=newer, older=older, **get_kwargs())
+
+@bp.route('/api/submission/<int:id>')
 def get_submission(id):
-    submission = Submission.query.get(id)
+    submission = archive.find(id)
+    if submission is None:
+        abort(404)
+
+    state = {"progress": submission.get_progress(), "status": submission.status}
+    if shows_cases(submission):
+        state["cases"] = submission.get_testcases() or []
+
+    return jsonify(state)
+
+@bp.route('/api/submissions/status')
+def get_submissions_status():
+    ids = [int(i) for i in request.args.get("ids", "").split(",") if i.isdigit()]
+    ids = ids[:current_app.config["STATUS_BATCH_LIMIT"]]
+
+    submissions = Submission.query.filter(Submission.id.in_(ids)).options(
+        load_only("id", "task_id", "status", "progress")).all() if ids else []
+
+    progress = Submission.get_progress_many(submissions)
 
     return jsonify({
-        "progress": submission.get_progress(),
-        "status": submission.status
+        str(s.id): {
+            "progress": progress[s.id],
+            "status": s.status
+        } for s in submissions
+    })
+
+@bp.route('/api/submission/<int:id>/stream')
+def stream_submission(id):
+    # Server-sent events, /api/submission/<id> stays around for clients without EventSource.
+    # Unknown ids get their 404 here, once the stream starts the status is sent.
+    submission = archive.find(id)
+    if submission is None:
+        abort(404)
+
+    return Response(stream_with_context(progress.stream(id, shows_cases(submission))), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
     })
 
-@app.route('/logout')
+@bp.route('/api/scheduler/stats')
+@login_required
+def get_scheduler_stats():
+    if not current_user.is_admin:
+        abort(403)
+
+    return jsonify(scheduler.stats())
+
+@bp.route('/api/rejudge/<int:id>')
+@login_required
+def get_rejudge(id):
+    if not current_user.is_admin:
+        abort(403)
+
+    job = Rejudge.query.get(id)
+    if job is None:
+        abort(404)
+
+    return jsonify(rejudge.progress(job))
+
+@bp.route('/api/problem/<int:id>/testcases')
+@login_required
+def get_testcase_stats(id):
+    if not current_user.is_admin:
+        abort(403)
+
+    return jsonify({"cases": testcases.case_stats(id), "slowest": testcases.slowest(id)})
+
+@bp.route('/metrics')
+def get_metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            abort(403)
+    elif not (current_user.is_authenticated and current_user.is_admin):
+        abort(403)
+
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@bp.route('/logout')
 def logout():
     logout_user()
-    return redirect(url_for('index'))
\ No newline at end of file
+    return redirect(url_for('main.index'))
\ No newline at end of file
@@ -0,0 +1,315 @@
+from flask import current_app
+from datetime import datetime
+
+import json
+import rq
+import time
+import uuid
+
+# Submissions are judged in three classes and routed by the toolchain of their
+# language, each (class, toolchain) pair having its own rq queue named
+# evaluation-<class>-<toolchain>. Workers specialise in one toolchain, keeping
+# its compiler or JVM warm, and listen on its queues in priority order
+# (rq worker $(flask scheduler queues gcc)) so live contests are always served
+# first.
+#
+# Within a queue, jobs are held in Redis and only released to rq a few at a
+# time, ordered by start-time fair queuing: each job is stamped with a virtual
+# start time of max(clock, the user's last virtual finish) and the lowest stamp
+# is released first. A user with 50 pending submissions therefore gets one job
+# through for every job of each other waiting user instead of 50 in a row.
+
+CONTEST = "contest"
+PRACTICE = "practice"
+REJUDGE = "rejudge"
+
+# Highest priority first
+CLASSES = (CONTEST, PRACTICE, REJUDGE)
+
+# Toolchain of every language in SubmissionForm.language
+LANGUAGES = {
+    "cpp": "gcc",
+    "c": "gcc",
+    "java": "java",
+    "python3": "python3",
+    "python2": "python2"
+}
+TOOLCHAINS = ("gcc", "java", "python3", "python2")
+
+SCHEDULE = """
+if not redis.call('SET', KEYS[6], '1', 'NX', 'EX', ARGV[5]) then
+    return false
+end
+
+local clock = tonumber(redis.call('GET', KEYS[4]) or '0')
+local finish = tonumber(redis.call('HGET', KEYS[3], ARGV[2]) or '0')
+local start = math.max(clock, finish)
+
+redis.call('HSET', KEYS[3], ARGV[2], start + 1)
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[1], start, ARGV[1])
+redis.call('ZADD', KEYS[5], ARGV[4], ARGV[1])
+
+return tostring(start)
+"""
+
+# Seconds a job id is remembered, scheduling it again within that is a no-op
+SCHEDULED_TTL = 86400
+
+# Pops the ARGV[1] lowest stamped jobs
+RELEASE = """
+local popped = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+local payloads = {}
+
+for i = 1, #popped, 2 do
+    redis.call('ZREM', KEYS[1], popped[i])
+    redis.call('SET', KEYS[3], popped[i + 1])
+    table.insert(payloads, redis.call('HGET', KEYS[2], popped[i]))
+    redis.call('HDEL', KEYS[2], popped[i])
+    redis.call('ZREM', KEYS[4], popped[i])
+end
+
+return payloads
+"""
+
+# Releases the jobs in ARGV that are still held, for batching
+RELEASE_MEMBERS = """
+local payloads = {}
+local clock = nil
+
+for i, member in ipairs(ARGV) do
+    local score = redis.call('ZSCORE', KEYS[1], member)
+    if score then
+        redis.call('ZREM', KEYS[1], member)
+        table.insert(payloads, redis.call('HGET', KEYS[2], member))
+        redis.call('HDEL', KEYS[2], member)
+        redis.call('ZREM', KEYS[4], member)
+        if not clock or tonumber(score) > clock then
+            clock = tonumber(score)
+        end
+    end
+end
+
+if clock then
+    redis.call('SET', KEYS[3], tostring(clock))
+end
+
+return payloads
+"""
+
+def toolchain(language):
+    return LANGUAGES.get(language, TOOLCHAINS[0])
+
+def queue_name(klass, toolchain):
+    return f"evaluation-{klass}-{toolchain}"
+
+def worker_queues(toolchain):
+    # The queues a worker for the toolchain listens on, highest priority first
+    return [queue_name(klass, toolchain) for klass in CLASSES]
+
+def create_queues(connection):
+    return {
+        (klass, toolchain): rq.Queue(queue_name(klass, toolchain), connection=connection)
+        for klass in CLASSES for toolchain in TOOLCHAINS
+    }
+
+def get_queue(klass, toolchain):
+    return current_app.task_queues[(klass, toolchain)]
+
+def keys(klass, toolchain):
+    prefix = f"scheduler:{klass}:{toolchain}"
+    return {
+        "pending": f"{prefix}:pending",
+        "jobs": f"{prefix}:jobs",
+        "finish": f"{prefix}:finish",
+        "clock": f"{prefix}:clock",
+        "since": f"{prefix}:since"
+    }
+
+def scheduled_key(job_id):
+    return f"scheduler:scheduled:{job_id}"
+
+def classify(contest, registration, rejudge=False):
+    if rejudge:
+        return REJUDGE
+
+    if registration and contest.start_time <= datetime.utcnow() <= contest.end_time:
+        return CONTEST
+
+    return PRACTICE
+
+def schedule(submission, args, klass):
+    # Holds the job for dispatch and returns the rq job id it'll run under
+    job_id = str(uuid.uuid4())
+    schedule_many([(submission, args, klass, job_id)])
+    return job_id
+
+def schedule_many(tasks):
+    # Holds a list of (submission, args, class, job id) in one pipelined
+    # round-trip. A job id that was scheduled before is skipped, so a batch
+    # that failed halfway can be retried as is. Returns the skipped job ids.
+    script = current_app.redis.register_script(SCHEDULE)
+    queues = set()
+
+    with current_app.redis.pipeline() as pipe:
+        for submission, args, klass, job_id in tasks:
+            queues.add((klass, toolchain(submission.language)))
+            k = keys(klass, toolchain(submission.language))
+            payload = json.dumps({"job_id": job_id, "args": args, "scheduled_at": time.time()})
+
+            script(
+                keys=[k["pending"], k["jobs"], k["finish"], k["clock"], k["since"], scheduled_key(job_id)],
+                args=[submission.id, submission.user_id, payload, time.time(), SCHEDULED_TTL],
+                client=pipe
+            )
+
+        results = pipe.execute()
+
+    for klass, chain in queues:
+        dispatch(klass, chain)
+
+    return {task[3] for task, result in zip(tasks, results) if result is None}
+
+def plan(members, payloads, room, size):
+    # Groups held jobs, lowest stamp first, into at most room batches of up to
+    # size jobs for the same problem and language.
+    groups = []
+    open_groups = {}
+
+    for member, payload in zip(members, payloads):
+        if payload is None:
+            continue
+
+        args = json.loads(payload)["args"]
+        group = open_groups.get((args[5], args[1]))
+
+        if group is None:
+            if len(groups) == room:
+                continue
+
+            group = []
+            groups.append(group)
+            open_groups[(args[5], args[1])] = group
+
+        group.append(member)
+        if len(group) == size:
+            del open_groups[(args[5], args[1])]
+
+    return groups
+
+def release(klass, toolchain, room):
+    # The held jobs to hand to rq, as lists of payloads run in one worker pull
+    k = keys(klass, toolchain)
+    size = current_app.config["SCHEDULER_BATCH_SIZE"]
+
+    if size <= 1:
+        payloads = current_app.redis.register_script(RELEASE)(
+            keys=[k["pending"], k["jobs"], k["clock"], k["since"]],
+            args=[room]
+        )
+        return [[json.loads(payload)] for payload in payloads]
+
+    members = [int(m) for m in current_app.redis.zrange(k["pending"], 0, room * size - 1)]
+    if not members:
+        return []
+
+    groups = plan(members, current_app.redis.hmget(k["jobs"], members), room, size)
+
+    # Another dispatcher may have released some of them in the meantime
+    released = current_app.redis.register_script(RELEASE_MEMBERS)(
+        keys=[k["pending"], k["jobs"], k["clock"], k["since"]],
+        args=[member for group in groups for member in group]
+    )
+    released = {payload["args"][0]: payload for payload in map(json.loads, released)}
+
+    batches = [[released[member] for member in group if member in released] for group in groups]
+    return [batch for batch in batches if batch]
+
+def dispatch(klass, toolchain):
+    # Tops the rq queue up to SCHEDULER_QUEUE_DEPTH pulls. Batches run through
+    # the judge's server.evaluate_batch, with the job of every submission saved
+    # alongside for its progress.
+    queue = get_queue(klass, toolchain)
+    room = current_app.config["SCHEDULER_QUEUE_DEPTH"] - queue.count
+
+    if room <= 0:
+        return 0
+
+    batches = release(klass, toolchain, room)
+
+    with current_app.redis.pipeline() as pipe:
+        for batch in batches:
+            jobs = [
+                queue.create_job("server.evaluate_submission", args=payload["args"], job_id=payload["job_id"],
+                    meta={"scheduled_at": payload["scheduled_at"]})
+                for payload in batch
+            ]
+
+            if len(jobs) == 1:
+                queue.enqueue_job(jobs[0], pipeline=pipe)
+                continue
+
+            for job in jobs:
+                job.save(pipeline=pipe)
+                pipe.expire(job.key, SCHEDULED_TTL)
+
+            queue.enqueue_job(queue.create_job("server.evaluate_batch", args=[[job.id for job in jobs]],
+                job_id=f"batch:{jobs[0].id}", meta={"scheduled_at": batch[0]["scheduled_at"]}), pipeline=pipe)
+
+        pipe.execute()
+
+    return sum(len(batch) for batch in batches)
+
+def dispatch_all():
+    return {queue_name(klass, chain): dispatch(klass, chain) for klass, chain in current_app.task_queues}
+
+def backlog():
+    # Submissions waiting across all queues, held or queued, in one round-trip
+    with current_app.redis.pipeline() as pipe:
+        for (klass, chain), queue in current_app.task_queues.items():
+            pipe.zcard(keys(klass, chain)["pending"])
+            pipe.llen(queue.key)
+
+        return sum(pipe.execute())
+
+def stats():
+    # Depth and oldest wait of every queue, and the totals of every toolchain
+    now = time.time()
+    queues = list(current_app.task_queues.items())
+
+    with current_app.redis.pipeline() as pipe:
+        for (klass, chain), queue in queues:
+            k = keys(klass, chain)
+            pipe.zcard(k["pending"])
+            pipe.llen(queue.key)
+            pipe.zrange(k["since"], 0, 0, withscores=True)
+            pipe.lindex(queue.key, 0)
+        replies = pipe.execute()
+
+    result = {"queues": {}, "toolchains": {}}
+
+    for i, ((klass, chain), queue) in enumerate(queues):
+        held, queued, oldest, front = replies[4 * i:4 * i + 4]
+
+        if oldest:
+            oldest = oldest[0][1]
+        else:
+            # Nothing held back, so the oldest job is the one at the front of the rq queue
+            job = queue.fetch_job(front.decode("utf-8")) if front else None
+            oldest = job.meta.get("scheduled_at") if job else None
+
+        wait = round(now - oldest, 3) if oldest else 0
+        result["queues"][queue_name(klass, chain)] = {
+            "class": klass,
+            "toolchain": chain,
+            "held": held,
+            "queued": queued,
+            "oldest_wait": wait
+        }
+
+        total = result["toolchains"].setdefault(chain, {"held": 0, "queued": 0, "oldest_wait": 0})
+        total["held"] += held
+        total["queued"] += queued
+        total["oldest_wait"] = max(total["oldest_wait"], wait)
+
+    return result
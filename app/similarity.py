@@ -0,0 +1,240 @@
+from app import db
+from app.models import Fingerprint, Problem, SimilarityMatch, Submission, SubmissionPayload
+from flask import current_app
+from sqlalchemy import and_, func
+from sqlalchemy.orm import aliased
+
+import re
+import zlib
+
+# Code similarity of accepted contest submissions, by winnowing (Schleimer et
+# al., the scheme behind MOSS). Code is reduced to a token stream with names,
+# numbers and strings replaced by placeholders and comments dropped, every K
+# token run is hashed, and the smallest hash of every WINDOW consecutive ones
+# is kept as a fingerprint. Any copied run of K + WINDOW - 1 tokens or more
+# shares at least one fingerprint whatever was renamed around it.
+#
+# Fingerprints go into an inverted index (problem, hash) -> submission as
+# verdicts land. check() then finds the candidate pairs of a contest with one
+# self-join of the index per problem, skipping hashes most submissions share
+# (templates, fast IO boilerplate), instead of comparing every pair.
+
+K = 8
+WINDOW = 8
+
+# Language of SubmissionForm.language -> tokeniser family
+FAMILIES = {
+    "cpp": "c",
+    "c": "c",
+    "java": "java",
+    "python3": "python",
+    "python2": "python"
+}
+
+KEYWORDS = {
+    "c": {
+        "auto", "bool", "break", "case", "char", "class", "const", "continue", "default", "delete", "do",
+        "double", "else", "enum", "extern", "false", "float", "for", "goto", "if", "inline", "int", "long",
+        "namespace", "new", "nullptr", "operator", "private", "public", "return", "short", "signed", "sizeof",
+        "static", "struct", "switch", "template", "this", "true", "typedef", "typename", "union", "unsigned",
+        "using", "void", "volatile", "while"
+    },
+    "java": {
+        "abstract", "boolean", "break", "byte", "case", "catch", "char", "class", "continue", "default", "do",
+        "double", "else", "extends", "false", "final", "finally", "float", "for", "if", "implements", "import",
+        "instanceof", "int", "interface", "long", "new", "null", "package", "private", "protected", "public",
+        "return", "short", "static", "super", "switch", "this", "throw", "throws", "true", "try", "void", "while"
+    },
+    "python": {
+        "False", "None", "True", "and", "as", "assert", "break", "class", "continue", "def", "del", "elif",
+        "else", "except", "finally", "for", "from", "global", "if", "import", "in", "is", "lambda", "nonlocal",
+        "not", "or", "pass", "print", "raise", "return", "try", "while", "with", "yield"
+    }
+}
+
+TOKENS = {
+    "c": re.compile(r"""
+        (?P<skip>//[^\n]*|/\*.*?\*/|^[ \t]*\#[^\n]*)
+        |(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+        |(?P<number>\d[\w.]*)
+        |(?P<name>[A-Za-z_]\w*)
+        |(?P<op>\S)
+    """, re.X | re.S | re.M),
+    "java": re.compile(r"""
+        (?P<skip>//[^\n]*|/\*.*?\*/|^[ \t]*(?:import|package)\b[^\n]*)
+        |(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+        |(?P<number>\d[\w.]*)
+        |(?P<name>[A-Za-z_]\w*)
+        |(?P<op>\S)
+    """, re.X | re.S | re.M),
+    "python": re.compile(r"""
+        (?P<skip>\#[^\n]*|^[ \t]*(?:import|from)\b[^\n]*)
+        |(?P<string>\"\"\".*?\"\"\"|'''.*?'''|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+        |(?P<number>\d[\w.]*)
+        |(?P<name>[A-Za-z_]\w*)
+        |(?P<op>\S)
+    """, re.X | re.S | re.M)
+}
+
+PLACEHOLDERS = {"string": "S", "number": "N", "name": "V"}
+
+def tokenise(language, code):
+    family = FAMILIES.get(language)
+    if family is None or not code:
+        return []
+
+    keywords = KEYWORDS[family]
+    tokens = []
+
+    for match in TOKENS[family].finditer(code):
+        kind = match.lastgroup
+        if kind == "skip":
+            continue
+
+        text = match.group()
+        if kind == "op" or (kind == "name" and text in keywords):
+            tokens.append(text)
+        else:
+            tokens.append(PLACEHOLDERS[kind])
+
+    return tokens
+
+def fingerprint(language, code):
+    # The winnowed hashes of a submission, as a set
+    tokens = tokenise(language, code)
+    if not tokens:
+        return set()
+
+    hashes = [zlib.crc32("\0".join(tokens[i:i + K]).encode("utf-8")) for i in range(max(len(tokens) - K + 1, 1))]
+    if len(hashes) <= WINDOW:
+        return {min(hashes)}
+
+    selected = set()
+    last = -1
+
+    for start in range(len(hashes) - WINDOW + 1):
+        window = hashes[start:start + WINDOW]
+        # Rightmost minimum, so a position is picked again only when it has to be
+        position = start + max(i for i, h in enumerate(window) if h == min(window))
+
+        if position != last:
+            selected.add(hashes[position])
+            last = position
+
+    return selected
+
+def eligible(submission):
+    return submission.status == 0 and submission.problem.contest_id is not None
+
+def rows(submission_id, problem_id, hashes):
+    return [{"submission_id": submission_id, "problem_id": problem_id, "hash": h} for h in hashes]
+
+def index(submission):
+    # Brings the fingerprints of a submission in line with its verdict, as part
+    # of the caller's transaction. Rejudged submissions that no longer pass drop out.
+    Fingerprint.query.filter_by(submission_id=submission.id).delete(synchronize_session=False)
+
+    if eligible(submission):
+        db.session.bulk_insert_mappings(Fingerprint,
+            rows(submission.id, submission.problem_id, fingerprint(submission.language, submission.code)))
+
+def job(row):
+    # Runs in the backfill worker processes
+    submission_id, problem_id, language, code = row
+    return rows(submission_id, problem_id, fingerprint(language, code))
+
+def backfill(contest_id=None, processes=None, batch=500):
+    # Indexes accepted contest submissions that have no fingerprints yet,
+    # fingerprinting in a pool of processes. Returns how many were indexed.
+    from multiprocessing import Pool
+
+    # The children only fingerprint, none of them may inherit a database connection
+    db.session.commit()
+    db.engine.dispose()
+    pool = Pool(processes)
+
+    query = db.session.query(Submission.id, Submission.problem_id, Submission.language, SubmissionPayload.code) \
+        .join(SubmissionPayload, SubmissionPayload.submission_id == Submission.id) \
+        .join(Problem, Problem.id == Submission.problem_id) \
+        .filter(Submission.status == 0, Problem.contest_id.isnot(None)) \
+        .filter(~Submission.id.in_(db.session.query(Fingerprint.submission_id)))
+
+    if contest_id is not None:
+        query = query.filter(Problem.contest_id == contest_id)
+
+    count = 0
+    after = 0
+
+    try:
+        while True:
+            chunk = query.filter(Submission.id > after).order_by(Submission.id).limit(batch).all()
+            if not chunk:
+                return count
+
+            for fingerprints in pool.imap_unordered(job, chunk, chunksize=16):
+                db.session.bulk_insert_mappings(Fingerprint, fingerprints)
+
+            db.session.commit()
+            after = chunk[-1][0]
+            count += len(chunk)
+    finally:
+        pool.close()
+        pool.join()
+
+def candidates(problem_id):
+    # [(first id, second id, shared fingerprints)] of submissions by different
+    # users to a problem sharing at least SIMILARITY_MIN_SHARED uncommon fingerprints
+    submissions = db.session.query(func.count(func.distinct(Fingerprint.submission_id))) \
+        .filter(Fingerprint.problem_id == problem_id).scalar()
+    limit = max(2, int(submissions * current_app.config["SIMILARITY_COMMON"]))
+
+    common = db.session.query(Fingerprint.hash).filter(Fingerprint.problem_id == problem_id) \
+        .group_by(Fingerprint.hash).having(func.count() > limit)
+
+    first, second = aliased(Fingerprint), aliased(Fingerprint)
+    first_submission, second_submission = aliased(Submission), aliased(Submission)
+
+    return db.session.query(first.submission_id, second.submission_id, func.count()) \
+        .join(second, and_(
+            second.problem_id == first.problem_id,
+            second.hash == first.hash,
+            second.submission_id > first.submission_id
+        )) \
+        .join(first_submission, first_submission.id == first.submission_id) \
+        .join(second_submission, second_submission.id == second.submission_id) \
+        .filter(first.problem_id == problem_id, ~first.hash.in_(common),
+            first_submission.user_id != second_submission.user_id) \
+        .group_by(first.submission_id, second.submission_id) \
+        .having(func.count() >= current_app.config["SIMILARITY_MIN_SHARED"]).all()
+
+def check(contest):
+    # Replaces the stored matches of a contest, returns how many there are
+    threshold = current_app.config["SIMILARITY_THRESHOLD"]
+    matches = []
+
+    for problem_id, in db.session.query(Problem.id).filter_by(contest_id=contest.id):
+        pairs = candidates(problem_id)
+        if not pairs:
+            continue
+
+        ids = {id for pair in pairs for id in pair[:2]}
+        sizes = dict(db.session.query(Fingerprint.submission_id, func.count())
+            .filter(Fingerprint.submission_id.in_(ids)).group_by(Fingerprint.submission_id))
+
+        for first_id, second_id, shared in pairs:
+            score = shared / min(sizes[first_id], sizes[second_id])
+            if score >= threshold:
+                matches.append({
+                    "contest_id": contest.id,
+                    "problem_id": problem_id,
+                    "first_id": first_id,
+                    "second_id": second_id,
+                    "shared": shared,
+                    "score": round(min(score, 1.0), 4)
+                })
+
+    SimilarityMatch.query.filter_by(contest_id=contest.id).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(SimilarityMatch, matches)
+    db.session.commit()
+
+    return len(matches)
@@ -0,0 +1,112 @@
+from app import db
+from app.models import Contest, Problem, Registration, Standing, Submission
+
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+
+# Standings hold the first accepted submission of every registration for every
+# problem. They are updated one verdict at a time through record_verdict and can
+# be recomputed from the submission table with rebuild.
+
+def record_verdict(submission):
+    if submission.status != 0:
+        return None
+
+    problem = submission.problem
+    contest = problem.contest
+
+    if not contest or not contest.start_time <= submission.timestamp <= contest.end_time:
+        return None
+
+    registration = Registration.query.filter_by(contest_id=contest.id, user_id=submission.user_id).first()
+    if not registration:
+        return None
+
+    standing = Standing.query.filter_by(registration_id=registration.id, problem_id=problem.id).first()
+
+    if standing is None:
+        standing = Standing(contest_id=contest.id, registration_id=registration.id, problem_id=problem.id)
+        db.session.add(standing)
+    elif (standing.solved_at, standing.submission_id) <= (submission.timestamp, submission.id):
+        return standing
+
+    standing.submission_id = submission.id
+    standing.solved_at = submission.timestamp
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request recorded the same cell first, keep theirs.
+        db.session.rollback()
+        standing = Standing.query.filter_by(registration_id=registration.id, problem_id=problem.id).first()
+
+    return standing
+
+def get_standings(contest_id):
+    # {problem_id: {registration_id: standing}} in a single query
+    cells = {}
+
+    for standing in Standing.query.filter_by(contest_id=contest_id):
+        cells.setdefault(standing.problem_id, {})[standing.registration_id] = standing
+
+    return cells
+
+def rebuild(contest):
+    # First accepted timestamp per (user, problem) in one grouped pass, joined
+    # back to the submission table to pick the submission that produced it.
+    first = db.session.query(
+        Submission.user_id,
+        Submission.problem_id,
+        func.min(Submission.timestamp).label("solved_at")
+    ).join(Problem, Problem.id == Submission.problem_id).filter(
+        Problem.contest_id == contest.id,
+        Submission.status == 0,
+        Submission.timestamp >= contest.start_time,
+        Submission.timestamp <= contest.end_time
+    ).group_by(Submission.user_id, Submission.problem_id).subquery()
+
+    rows = db.session.query(
+        first.c.user_id,
+        first.c.problem_id,
+        first.c.solved_at,
+        func.min(Submission.id)
+    ).join(Submission, and_(
+        Submission.user_id == first.c.user_id,
+        Submission.problem_id == first.c.problem_id,
+        Submission.timestamp == first.c.solved_at,
+        Submission.status == 0
+    )).group_by(first.c.user_id, first.c.problem_id, first.c.solved_at)
+
+    registrations = {r.user_id: r for r in Registration.query.filter_by(contest_id=contest.id)}
+    points = dict(db.session.query(Problem.id, Problem.points).filter_by(contest_id=contest.id))
+
+    standings = []
+    for registration in registrations.values():
+        registration.score = 0
+        registration.last_submission = None
+
+    for user_id, problem_id, solved_at, submission_id in rows:
+        registration = registrations.get(user_id)
+        if not registration:
+            continue
+
+        standings.append({
+            "contest_id": contest.id,
+            "registration_id": registration.id,
+            "problem_id": problem_id,
+            "submission_id": submission_id,
+            "solved_at": solved_at
+        })
+
+        registration.score += points.get(problem_id) or 0
+        if not registration.last_submission or registration.last_submission < solved_at:
+            registration.last_submission = solved_at
+
+    Standing.query.filter_by(contest_id=contest.id).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(Standing, standings)
+    db.session.commit()
+
+    return len(standings)
+
+def rebuild_all():
+    return sum(rebuild(contest) for contest in Contest.query.all())
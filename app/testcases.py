@@ -0,0 +1,82 @@
+from app import db
+from app.models import Submission, TestcaseResult
+
+from sqlalchemy import and_, case, func
+
+# Per testcase results. The judge calls record() with the cases that finished
+# since its last call, so partial results are visible while a submission is
+# being judged, and publishes the same cases on the progress channel for open
+# submission pages.
+#
+# record() and reset() take anything with execute() (a Connection or the
+# session) and leave committing to the caller, so the judge can use them
+# outside the app context.
+
+table = TestcaseResult.__table__
+
+def rows(submission_id, cases):
+    return [{
+        "submission_id": submission_id,
+        "case_no": testcase["id"],
+        "result": testcase["result"],
+        "real_time": testcase.get("real_time", 0),
+        "memory": testcase.get("memory", 0)
+    } for testcase in cases]
+
+def record(conn, submission_id, cases):
+    # Inserts cases ({"id", "result", "real_time", "memory"}) in one statement,
+    # replacing any earlier rows for the same case numbers so retries are safe.
+    if not cases:
+        return
+
+    conn.execute(table.delete().where(and_(
+        table.c.submission_id == submission_id,
+        table.c.case_no.in_([testcase["id"] for testcase in cases])
+    )))
+    conn.execute(table.insert(), rows(submission_id, cases))
+
+def reset(conn, *submission_ids):
+    # Drops the results of an earlier run before the submissions are judged again
+    conn.execute(table.delete().where(table.c.submission_id.in_(submission_ids)))
+
+def case_stats(problem_id):
+    # Runs, failures, mean and worst time and worst memory of every testcase of a problem
+    query = db.session.query(
+        TestcaseResult.case_no,
+        func.count(),
+        func.sum(case([(TestcaseResult.result != 0, 1)], else_=0)),
+        func.avg(TestcaseResult.real_time),
+        func.max(TestcaseResult.real_time),
+        func.max(TestcaseResult.memory)
+    ).join(Submission, Submission.id == TestcaseResult.submission_id) \
+        .filter(Submission.problem_id == problem_id) \
+        .group_by(TestcaseResult.case_no).order_by(TestcaseResult.case_no)
+
+    return [{
+        "case": case_no,
+        "runs": runs,
+        "failures": int(failures or 0),
+        "avg_time": round(float(avg_time or 0), 2),
+        "max_time": max_time,
+        "max_memory": max_memory
+    } for case_no, runs, failures, avg_time, max_time, max_memory in query]
+
+def slowest(problem_id, limit=10):
+    # The slowest single runs on a problem's testcases
+    query = db.session.query(
+        TestcaseResult.submission_id,
+        TestcaseResult.case_no,
+        TestcaseResult.result,
+        TestcaseResult.real_time,
+        TestcaseResult.memory
+    ).join(Submission, Submission.id == TestcaseResult.submission_id) \
+        .filter(Submission.problem_id == problem_id) \
+        .order_by(TestcaseResult.real_time.desc()).limit(limit)
+
+    return [{
+        "submission": submission_id,
+        "case": case_no,
+        "result": result,
+        "real_time": real_time,
+        "memory": memory
+    } for submission_id, case_no, result, real_time, memory in query]
@@ -0,0 +1,101 @@
+from app import db
+from flask import current_app
+from datetime import datetime
+
+import hashlib
+import json
+import redis
+
+# Byte-identical resubmissions reuse the verdict of the earlier copy instead of
+# being judged again. Verdicts are cached under the problem, language, code
+# hash, limits and testcase version, so changing any of those (or bumping
+# Problem.testcase_version when the tests change) invalidates them.
+
+# Only verdicts that don't depend on how busy the judge was are reused
+CACHEABLE = (0, -1, -3)
+
+def normalise(code):
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+def key(submission):
+    problem = submission.problem
+    digest = hashlib.sha256(normalise(submission.code).encode("utf-8")).hexdigest()
+
+    return f"verdict:{problem.id}:{submission.language}:{digest}:" \
+        f"{problem.time_limit}:{problem.memory_limit}:{problem.testcase_version}"
+
+def pending_key(submission_id):
+    return f"verdict:pending:{submission_id}"
+
+def lookup(submission):
+    # Returns the cached verdict, or remembers which key the verdict of this
+    # submission should be stored under once it is judged.
+    return lookup_many([submission]).get(submission.id)
+
+def lookup_many(submissions):
+    # lookup() for a batch in two pipelined round-trips, {submission id: verdict} of the hits
+    keys = {submission.id: key(submission) for submission in submissions}
+
+    try:
+        with current_app.redis.pipeline(transaction=False) as pipe:
+            for k in keys.values():
+                pipe.get(k)
+            cached = dict(zip(keys, pipe.execute()))
+
+            for submission_id, value in cached.items():
+                if value is None:
+                    pipe.set(pending_key(submission_id), keys[submission_id], ex=current_app.config["VERDICT_CACHE_TTL"])
+            pipe.execute()
+    except redis.exceptions.RedisError:
+        return {}
+
+    return {submission_id: json.loads(value) for submission_id, value in cached.items() if value is not None}
+
+def apply(submission, cached, registration):
+    # Does what the judge would have done with the verdict
+    from app import testcases
+
+    submission.status = cached["status"]
+    submission.progress = cached["progress"]
+    # Entries cached before the testcase table hold the judge's JSON instead
+    cases = cached["cases"] if "cases" in cached else json.loads(cached["testcases"] or "{}").get("data", [])
+    testcases.reset(db.session, submission.id)
+    testcases.record(db.session, submission.id, cases)
+
+    if registration and submission.status == 0:
+        registration.score = (registration.score or 0) + submission.problem.points
+        registration.last_submission = submission.timestamp
+
+    db.session.commit()
+    landed(submission)
+
+def store(submission):
+    if submission.status not in CACHEABLE:
+        return
+
+    try:
+        k = current_app.redis.get(pending_key(submission.id))
+        if k is None:
+            return
+
+        current_app.redis.set(k, json.dumps({
+            "status": submission.status,
+            "progress": submission.progress,
+            "cases": submission.get_testcases() or []
+        }), ex=current_app.config["VERDICT_CACHE_TTL"])
+        current_app.redis.delete(pending_key(submission.id))
+    except redis.exceptions.RedisError:
+        pass
+
+def landed(submission):
+    # Everything that follows a verdict, safe to call more than once
+    from app import standings, similarity
+
+    store(submission)
+    standings.record_verdict(submission)
+
+    if submission.judged_at is None:
+        submission.judged_at = datetime.utcnow()
+    similarity.index(submission)
+    db.session.commit()
@@ -0,0 +1,138 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from app import db
+
+LANGUAGES = ["cpp", "c", "java", "python3", "python2"]
+
+# Statuses roughly in the proportions seen during contests
+STATUSES = [0] * 30 + [-1] * 40 + [-3] * 10 + [1] * 10 + [3] * 3 + [4] * 7
+
+def create_schema(engine):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+
+def seed(engine, submissions=1000000, users=5000, contests=50, problems=8, registrations=300,
+        code_size=0, inline=False, batch=10000, seed=0):
+    # inline stores the code and results in the submission table itself, as
+    # it was before the submission_payload table
+    rng = random.Random(seed)
+    tables = db.metadata.tables
+    start = datetime(2020, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(tables["user"].insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": ""}
+            for i in range(1, users + 1)
+        ])
+
+        conn.execute(tables["contest"].insert(), [
+            {"id": i, "title": f"Contest {i}",
+            "start_time": start + timedelta(days=7 * i), "end_time": start + timedelta(days=7 * i, hours=3)}
+            for i in range(1, contests + 1)
+        ])
+
+        conn.execute(tables["problem"].insert(), [
+            {"id": (c - 1) * problems + p, "contest_id": c, "title": f"Problem {p}", "body": "",
+            "points": 100 * p, "difficulty": "Easy", "time_limit": 1000, "memory_limit": 256}
+            for c in range(1, contests + 1) for p in range(1, problems + 1)
+        ])
+
+        entrants = {c: rng.sample(range(1, users + 1), min(registrations, users)) for c in range(1, contests + 1)}
+        conn.execute(tables["registration"].insert(), [
+            {"user_id": u, "contest_id": c, "score": 0} for c, us in entrants.items() for u in us
+        ])
+
+    if inline:
+        submission = sa.Table("submission", sa.MetaData(), autoload_with=engine)
+    else:
+        submission = tables["submission"]
+
+    for rows in submission_rows(rng, submissions, entrants, problems, start, batch):
+        payloads = [
+            {"submission_id": row["id"], "code": source_code(rng, code_size), "testcases": testcases(rng)}
+            for row in rows
+        ] if code_size else []
+
+        if inline:
+            for row, payload in zip(rows, payloads):
+                row.update(code=payload["code"], testcases=payload["testcases"])
+
+        with engine.begin() as conn:
+            conn.execute(submission.insert(), rows)
+
+            if payloads and not inline:
+                conn.execute(tables["submission_payload"].insert(), payloads)
+
+def submission_rows(rng, submissions, entrants, problems, start, batch):
+    contests = len(entrants)
+    per_contest = max(submissions // contests, 1)
+
+    for offset in range(0, submissions, batch):
+        rows = []
+
+        for i in range(offset, min(offset + batch, submissions)):
+            contest = min(i // per_contest + 1, contests)
+            rows.append({
+                "id": i + 1,
+                "user_id": rng.choice(entrants[contest]),
+                "problem_id": (contest - 1) * problems + rng.randint(1, problems),
+                "timestamp": start + timedelta(days=7 * contest, seconds=i % per_contest * 10800 // per_contest),
+                "language": rng.choice(LANGUAGES),
+                "status": rng.choice(STATUSES),
+                "progress": "10/10"
+            })
+
+        yield rows
+
+def source_code(rng, size):
+    # Program-like text so compression ratios are realistic
+    lines = []
+    length = 0
+
+    while length < size:
+        name = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 8)))
+        line = rng.choice([
+            f"    long long {name} = {rng.randint(0, 10 ** 9)};",
+            f"    for (int i = 0; i < {name}.size(); i++) {{",
+            f"        {name}[i] = max({name}[i - 1], {rng.randint(0, 100)});",
+            f"    }}",
+            f"    cout << {name} << endl;",
+            f"vector<int> {name}(int n) {{",
+        ])
+        lines.append(line)
+        length += len(line) + 1
+
+    return "\n".join(lines)[:size]
+
+def testcases(rng, cases=20):
+    return json.dumps({"data": [
+        {"id": i, "result": rng.choice(STATUSES), "real_time": rng.randint(0, 1000), "memory": rng.randint(0, 2 ** 28)}
+        for i in range(1, cases + 1)
+    ]})
+
+def timed(fn, repeat=10):
+    samples = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    return samples
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * p / 100), len(samples) - 1)]
+
+def explain(engine, statement, params):
+    if engine.dialect.name == "postgresql":
+        rows = engine.execute(sa.text("EXPLAIN ANALYZE " + statement), params)
+        return [row[0] for row in rows]
+
+    rows = engine.execute(sa.text("EXPLAIN QUERY PLAN " + statement), params)
+    return [row[-1] for row in rows]
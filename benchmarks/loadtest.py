@@ -0,0 +1,338 @@
+"""Replays a contest against the site and reports latency per route.
+
+    python -m benchmarks.loadtest [--users 300] [--fakeredis] [--output run.json] [--compare base.json]
+
+The script seeds a contest in DATABASE_URL, serves the app in process from
+--threads threads (or uses --url to target a running deployment sharing the
+same database and Redis) and judges with the stand-in judge from
+benchmarks.standin. The contest runs in four phases:
+
+    1. registration wave: every user registers, logs in and joins the contest
+    2. the contest starts: everyone opens the contest page and every problem
+    3. submission storm: everyone submits and polls their submissions until
+       judged, refreshing the leaderboard in between
+    4. final leaderboard refreshes
+
+The target database is wiped. Rate limits are disabled for the run.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import http.cookiejar
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///loadtest.db")
+os.environ["SUBMISSION_RATE_LIMIT"] = os.environ["SUBMISSION_PROBLEM_RATE_LIMIT"] = ""
+os.environ["AUTH_RATE_LIMIT"] = ""
+os.environ.setdefault("ADMISSION_MAX_BACKLOG", "1000000")
+
+from benchmarks.common import percentile
+
+CSRF = re.compile(r'id="csrf_token" name="csrf_token" type="hidden" value="([^"]+)"')
+SUBMISSION = re.compile(r'/api/submission/(\d+)/stream')
+
+# Every submission differs so the verdict cache doesn't short-circuit the judge
+PROGRAM = "#include <cstdio>\nint main() {{ long long a, b; scanf(\"%lld %lld\", &a, &b); printf(\"%lld\\n\", a + b + 0 * {}); }}\n"
+
+class Recorder(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, elapsed, ok):
+        with self.lock:
+            self.samples[route].append(elapsed)
+            if not ok:
+                self.errors[route] += 1
+
+    def summary(self, duration):
+        return {
+            route: {
+                "requests": len(samples),
+                "errors": self.errors[route],
+                "throughput": round(len(samples) / duration, 2),
+                "p50": round(percentile(samples, 50) * 1000, 2),
+                "p95": round(percentile(samples, 95) * 1000, 2),
+                "p99": round(percentile(samples, 99) * 1000, 2)
+            } for route, samples in sorted(self.samples.items())
+        }
+
+class User(object):
+    def __init__(self, base, recorder, name):
+        self.base = base
+        self.recorder = recorder
+        self.name = name
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.token = None
+
+    def request(self, method, path, data=None):
+        route = method + " " + re.sub(r"/\d+", "/<id>", path.split("?")[0])
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(self.base + path, data=body, timeout=60) as response:
+                page = response.read().decode("utf-8")
+            ok = True
+        except Exception:
+            page = ""
+            ok = False
+
+        self.recorder.record(route, time.perf_counter() - start, ok)
+
+        match = CSRF.search(page)
+        if match:
+            self.token = match.group(1)
+
+        return page
+
+    def post(self, path, data):
+        if self.token is None:
+            self.request("GET", "/index")
+
+        return self.request("POST", path, dict(data, csrf_token=self.token))
+
+def register(user, contest_id):
+    password = "password"
+    user.post("/register", {"username": user.name, "email": f"{user.name}@example.com",
+        "password": password, "password_confirm": password})
+    user.post("/login", {"username": user.name, "password": password})
+    user.request("GET", f"/contest/{contest_id}")
+    user.post(f"/contest/{contest_id}", {"register": "Register"})
+
+def open_contest(user, contest_id, problem_ids):
+    user.request("GET", f"/contest/{contest_id}")
+    for problem_id in problem_ids:
+        user.request("GET", f"/problem/{problem_id}")
+
+def storm(user, contest_id, problem_ids, submissions, poll_interval, rng):
+    for i in range(submissions):
+        problem_id = rng.choice(problem_ids)
+        page = user.post(f"/problem/{problem_id}", {"language": "cpp", "code": PROGRAM.format(rng.randint(0, 10 ** 9))})
+
+        match = SUBMISSION.search(page)
+        if match:
+            deadline = time.time() + 120
+            while time.time() < deadline:
+                time.sleep(poll_interval)
+                status = user.request("GET", f"/api/submission/{match.group(1)}")
+                if status and json.loads(status)["status"] != -2:
+                    break
+
+        if rng.random() < 0.5:
+            user.request("GET", f"/contest/{contest_id}/leaderboard")
+
+def seed(app, problems):
+    from app import db
+    from app.models import Contest, Problem
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        now = datetime.utcnow()
+        contest = Contest(title="Load test", start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=3))
+        db.session.add(contest)
+
+        for i in range(1, problems + 1):
+            db.session.add(Problem(contest=contest, title=f"Problem {i}", body="<p>Add two numbers.</p>" * 200,
+                points=100 * i, difficulty="Easy", time_limit=1000, memory_limit=256))
+
+        db.session.commit()
+        return contest.id, [p.id for p in contest.problems]
+
+def start_contest(app, contest_id):
+    from app import db
+    from app.models import Contest
+
+    with app.app_context():
+        contest = Contest.query.get(contest_id)
+        contest.start_time = datetime.utcnow()
+        contest.end_time = contest.start_time + timedelta(hours=3)
+        db.session.commit()
+
+def use_redis(app, connection):
+    from app import metrics, scheduler
+
+    app.redis = metrics.instrument_redis(connection)
+    app.task_queues = scheduler.create_queues(connection)
+
+def relay(app, stop):
+    # In process stand-in for flask scheduler run
+    from app import outbox, scheduler, reconciler
+
+    with app.app_context():
+        reconciled = 0
+
+        while not stop.is_set():
+            outbox.drain()
+            scheduler.dispatch_all()
+
+            if time.time() - reconciled >= 1:
+                reconciler.reconcile()
+                reconciled = time.time()
+
+            time.sleep(0.05)
+
+def judge(app, stop):
+    # In process stand-in for the rq workers
+    import rq
+    from app import scheduler
+    from benchmarks.standin import server
+
+    with app.app_context():
+        # Every judge serves every toolchain, classes in priority order
+        queues = [app.task_queues[(klass, chain)] for klass in scheduler.CLASSES for chain in scheduler.TOOLCHAINS]
+
+        while not stop.is_set():
+            scheduler.dispatch_all()
+
+            result = rq.Queue.dequeue_any(queues, None, connection=app.redis)
+            if result is None:
+                time.sleep(0.05)
+                continue
+
+            job, queue = result
+            job.started_at = datetime.utcnow()
+            server.run(job, app.redis)
+
+            # Filed like an rq worker would, for the reconciler
+            job.ended_at = datetime.utcnow()
+            job.set_status(rq.job.JobStatus.FINISHED)
+            with app.redis.pipeline() as pipe:
+                job.save(pipeline=pipe, include_meta=False)
+                rq.registry.FinishedJobRegistry(queue=queue).add(job, job.get_result_ttl(500), pipeline=pipe)
+                pipe.execute()
+
+def serve(app, threads):
+    # Serves from a fixed pool of threads like a gunicorn gthread worker, one
+    # thread behaving like a sync worker
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledServer(BaseWSGIServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+        def process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = PooledServer("127.0.0.1", 0, app)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def phase(name, executor, fn, users, timings):
+    start = time.perf_counter()
+    list(executor.map(fn, users))
+    timings[name] = round(time.perf_counter() - start, 2)
+    print(f"{name}: {timings[name]} s")
+
+def report(summary, baseline):
+    print(f"\n{'route':<40} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    for route, row in summary.items():
+        line = f"{route:<40} {row['requests']:>9} {row['errors']:>7} {row['throughput']:>8} " \
+            f"{row['p50']:>9} {row['p95']:>9} {row['p99']:>9}"
+
+        if baseline and route in baseline:
+            before = baseline[route]
+            line += f"   p95 {before['p95']} -> {row['p95']} ms"
+
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--problems", type=int, default=8)
+    parser.add_argument("--submissions", type=int, default=3, help="Submissions per user.")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--judges", type=int, default=4, help="In process stand-in judges, 0 to use rq workers and flask scheduler run.")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--url", help="Target a running deployment instead of serving in process.")
+    parser.add_argument("--threads", type=int, default=32, help="Serving threads in process, 1 to act like a sync worker.")
+    parser.add_argument("--fakeredis", action="store_true", help="Use an in-memory Redis (needs fakeredis).")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare against results written by an earlier run.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+
+    if args.fakeredis:
+        import fakeredis
+        use_redis(app, fakeredis.FakeStrictRedis())
+
+    app.redis.flushdb()
+    contest_id, problem_ids = seed(app, args.problems)
+
+    stop = threading.Event()
+    judges = [threading.Thread(target=judge, args=(app, stop), daemon=True) for _ in range(args.judges)]
+    if args.judges:
+        judges.append(threading.Thread(target=relay, args=(app, stop), daemon=True))
+    for thread in judges:
+        thread.start()
+
+    server = None
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        server, base = serve(app, args.threads)
+
+    recorder = Recorder()
+    users = [User(base, recorder, f"loadtest{i}") for i in range(args.users)]
+    rngs = {user.name: random.Random(f"{args.seed}-{user.name}") for user in users}
+    timings = {}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        phase("registration wave", executor, lambda user: register(user, contest_id), users, timings)
+
+        start_contest(app, contest_id)
+        phase("contest start", executor, lambda user: open_contest(user, contest_id, problem_ids), users, timings)
+
+        phase("submission storm", executor, lambda user: storm(user, contest_id, problem_ids,
+            args.submissions, args.poll_interval, rngs[user.name]), users, timings)
+
+        phase("leaderboard", executor, lambda user: user.request("GET", f"/contest/{contest_id}/leaderboard"),
+            users, timings)
+    duration = time.perf_counter() - start
+
+    stop.set()
+    if server:
+        server.shutdown()
+
+    summary = recorder.summary(duration)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["routes"]
+
+    report(summary, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "phases": timings, "duration": round(duration, 2), "routes": summary}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Times the hot submission and registration lookups with and without the
+composite indexes and prints their query plans.
+
+    python -m benchmarks.query_plans [--url sqlite:///bench.db] [--submissions 1000000]
+
+The target database is wiped and reseeded.
+"""
+import argparse
+
+import sqlalchemy as sa
+
+from app import db
+from benchmarks.common import create_schema, seed, timed, percentile, explain
+
+# The indexes added for these queries, dropped for the "before" run
+INDEXES = [
+    "ix_problem_contest_id",
+    "ix_registration_contest_id_user_id",
+    "ix_submission_user_id_problem_id_status",
+    "ix_submission_timestamp_id",
+    "ix_submission_problem_id_status_timestamp",
+]
+
+QUERIES = {
+    "launch_task: previous accepted": (
+        "SELECT id FROM submission WHERE user_id = :user_id AND problem_id = :problem_id AND status = 0 LIMIT 1",
+        {"user_id": 42, "problem_id": 3}
+    ),
+    "launch_task/contest: registration": (
+        "SELECT id FROM registration WHERE contest_id = :contest_id AND user_id = :user_id LIMIT 1",
+        {"contest_id": 7, "user_id": 42}
+    ),
+    "submission_list: newest": (
+        "SELECT id, timestamp FROM submission ORDER BY timestamp DESC, id DESC LIMIT 20",
+        {}
+    ),
+    "submission_list: contest": (
+        "SELECT submission.id, submission.timestamp FROM submission JOIN problem ON problem.id = submission.problem_id "
+        "WHERE problem.contest_id = :contest_id ORDER BY submission.timestamp DESC, submission.id DESC LIMIT 20",
+        {"contest_id": 7}
+    ),
+    "standings: rebuild": (
+        "SELECT submission.user_id, submission.problem_id, MIN(submission.timestamp) FROM submission "
+        "JOIN problem ON problem.id = submission.problem_id WHERE problem.contest_id = :contest_id "
+        "AND submission.status = 0 GROUP BY submission.user_id, submission.problem_id",
+        {"contest_id": 7}
+    ),
+}
+
+def indexes():
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in INDEXES:
+                yield index
+
+def run(engine, label, repeat):
+    print(f"\n=== {label}")
+
+    for name, (statement, params) in QUERIES.items():
+        samples = timed(lambda: engine.execute(sa.text(statement), params).fetchall(), repeat)
+
+        print(f"\n{name}: p50 {percentile(samples, 50) * 1000:.2f} ms, max {max(samples) * 1000:.2f} ms")
+        for line in explain(engine, statement, params):
+            print(f"    {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="sqlite:///bench.db")
+    parser.add_argument("--submissions", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = sa.create_engine(args.url)
+
+    create_schema(engine)
+    for index in indexes():
+        index.drop(engine)
+
+    print(f"Seeding {args.submissions} submissions...")
+    seed(engine, submissions=args.submissions)
+
+    run(engine, "before", args.repeat)
+
+    for index in indexes():
+        index.create(engine)
+    engine.execute("ANALYZE")
+
+    run(engine, "after", args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Stand-in for the judge's server.evaluate_submission, for load tests.
+
+Records and publishes every testcase as it finishes like the real judge,
+sleeps instead of compiling and running anything, and writes a random (but
+per submission deterministic) verdict to the database.
+Run it in rq workers with
+
+    PYTHONPATH=benchmarks/standin rq worker $(flask scheduler queues gcc)
+
+or let benchmarks.loadtest run it in process.
+
+    STANDIN_CASES         testcases per submission (10)
+    STANDIN_CASE_LATENCY  average seconds per testcase (0.05)
+    STANDIN_ACCEPT        fraction of submissions accepted (0.5)
+"""
+import os
+import random
+import time
+from datetime import datetime
+
+import rq
+import sqlalchemy as sa
+
+from app import db, progress, testcases
+
+CASES = int(os.environ.get("STANDIN_CASES") or 10)
+CASE_LATENCY = float(os.environ.get("STANDIN_CASE_LATENCY") or 0.05)
+ACCEPT = float(os.environ.get("STANDIN_ACCEPT") or 0.5)
+
+_engine = None
+
+def engine():
+    global _engine
+    if _engine is None:
+        _engine = sa.create_engine(os.environ.get("DATABASE_URL") or db.engine.url)
+    return _engine
+
+def evaluate_submission(submission_id, language, code, memory_limit, time_limit, problem_id, registration_id, points):
+    job = rq.get_current_job()
+    evaluate(job, job.connection, submission_id, memory_limit, time_limit, registration_id, points)
+
+def evaluate_batch(job_ids):
+    job = rq.get_current_job()
+    evaluate_many(job_ids, job.connection)
+
+def evaluate_many(job_ids, connection):
+    # The jobs of a batch are saved but never queued, run them one by one
+    for member in rq.job.Job.fetch_many(job_ids, connection=connection):
+        if member is not None:
+            run(member, connection)
+
+def run(job, connection):
+    # Runs a job pulled from a queue in process, for benchmarks.loadtest
+    if job.func_name == "server.evaluate_batch":
+        evaluate_many(job.args[0], connection)
+        return
+
+    job.set_status(rq.job.JobStatus.STARTED)
+    args = job.args
+    evaluate(job, connection, args[0], args[3], args[4], args[6], args[7])
+    job.set_status(rq.job.JobStatus.FINISHED)
+
+def evaluate(job, connection, submission_id, memory_limit, time_limit, registration_id, points):
+    rng = random.Random(submission_id)
+    accepted = rng.random() < ACCEPT
+    failing = rng.randint(1, CASES)
+
+    with engine().begin() as conn:
+        testcases.reset(conn, submission_id)
+
+    for i in range(1, CASES + 1):
+        time.sleep(CASE_LATENCY * rng.uniform(0.5, 1.5))
+
+        result = -1 if not accepted and i == failing else 0
+        case = {
+            "id": i,
+            "result": result,
+            "real_time": rng.randint(1, time_limit),
+            "memory": rng.randint(2 ** 20, memory_limit)
+        }
+
+        with engine().begin() as conn:
+            testcases.record(conn, submission_id, [case])
+
+        job.meta["progress"] = f"{i}/{CASES}"
+        job.save_meta()
+        progress.publish(connection, submission_id, job.meta["progress"], -2, [case])
+
+        if result != 0:
+            break
+
+    status = 0 if accepted else -1
+    tables = db.metadata.tables
+
+    with engine().begin() as conn:
+        conn.execute(tables["submission"].update().where(tables["submission"].c.id == submission_id).values(
+            status=status, progress=job.meta["progress"]))
+
+        if accepted and registration_id:
+            registration = tables["registration"]
+            conn.execute(registration.update().where(registration.c.id == registration_id).values(
+                score=sa.func.coalesce(registration.c.score, 0) + points, last_submission=datetime.utcnow()))
+
+    progress.publish(connection, submission_id, job.meta["progress"], status)
@@ -0,0 +1,101 @@
+"""Measures how long a fresh process takes to import the app and to serve its
+first request, with and without the administrators page.
+
+    python -m benchmarks.startup [--runs 10] [--path /problems] [--output run.json] [--compare base.json]
+
+Every run is a new interpreter, like a gunicorn worker without --preload or a
+CLI call: "import" covers importing onlinejudge (the app factory included) and
+"first request" the first request through the test client after that, which
+opens the database connection. The database is a temporary SQLite file with
+the schema created, Redis isn't touched unless the path needs it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import percentile
+
+# Runs in the child, prints the timings in milliseconds as JSON
+CHILD = """
+import json, time
+start = time.perf_counter()
+from onlinejudge import app
+imported = time.perf_counter()
+response = app.test_client().get({path!r})
+served = time.perf_counter()
+assert response.status_code < 500, response.status_code
+print(json.dumps({{"import": (imported - start) * 1000, "first_request": (served - imported) * 1000}}))
+"""
+
+SETUP = """
+from onlinejudge import app
+from app import db
+with app.app_context():
+    db.create_all()
+"""
+
+VARIANTS = {
+    "admin": {"ADMIN_ENABLED": "true"},
+    "no admin": {"ADMIN_ENABLED": "false"}
+}
+
+def run(code, env):
+    output = subprocess.run([sys.executable, "-c", code], env=env, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1]) if output.strip() else None
+
+def measure(runs, path, env):
+    samples = {"import": [], "first_request": []}
+
+    for _ in range(runs):
+        timings = run(CHILD.format(path=path), env)
+        for name, value in timings.items():
+            samples[name].append(value)
+
+    return {
+        name: {"p50": round(percentile(values, 50), 1), "p90": round(percentile(values, 90), 1)}
+        for name, values in samples.items()
+    }
+
+def report(summary, baseline):
+    print(f"\n{'variant':<12} {'import p50':>11} {'import p90':>11} {'request p50':>12} {'request p90':>12}")
+
+    for variant, row in summary.items():
+        line = f"{variant:<12} {row['import']['p50']:>11} {row['import']['p90']:>11} " \
+            f"{row['first_request']['p50']:>12} {row['first_request']['p90']:>12}"
+
+        if baseline and variant in baseline:
+            before = baseline[variant]
+            line += f"   import p50 {before['import']['p50']} -> {row['import']['p50']} ms"
+
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/problems", help="The first request.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare against results written by an earlier run.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(directory, "startup.db"))
+        run(SETUP, env)
+
+        summary = {variant: measure(args.runs, args.path, dict(env, **overrides)) for variant, overrides in VARIANTS.items()}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report(summary, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compares submission storage with the source code and results inline in the
+submission table against the compressed submission_payload side table.
+
+    python -m benchmarks.submission_storage [--submissions 100000] [--code-size 4000]
+
+Builds two SQLite databases in a temporary directory and reports their size
+and the latency of the listing queries.
+"""
+import argparse
+import os
+import tempfile
+
+import sqlalchemy as sa
+
+from app import db
+from benchmarks.common import create_schema, seed, timed, percentile
+
+# The submission table before the payload was split out, with the indexes
+# it has now so only the layout differs
+legacy = sa.MetaData()
+sa.Table("submission", legacy,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer),
+    sa.Column("problem_id", sa.Integer),
+    sa.Column("task_id", sa.String(64)),
+    sa.Column("timestamp", sa.DateTime),
+    sa.Column("code", sa.Text),
+    sa.Column("language", sa.String(16)),
+    sa.Column("status", sa.Integer),
+    sa.Column("testcases", sa.Text),
+    sa.Column("progress", sa.String(16)),
+    sa.Index("ix_submission_timestamp_id", "timestamp", "id"),
+    sa.Index("ix_submission_problem_id_status_timestamp", "problem_id", "status", "timestamp"),
+    sa.Index("ix_submission_user_id_problem_id_status", "user_id", "problem_id", "status")
+)
+
+QUERIES = {
+    # What the ORM loads for Submission.query listings and Flask-Admin
+    "listing, 20 newest rows": "SELECT * FROM submission ORDER BY timestamp DESC LIMIT 20",
+    "listing, 20 rows deep": "SELECT * FROM submission ORDER BY timestamp DESC LIMIT 20 OFFSET 10000",
+    # Every accepted submission, as the old leaderboard and rebuilds read them
+    "accepted submissions": "SELECT * FROM submission WHERE status = 0",
+}
+
+def build(path, submissions, code_size, inline):
+    engine = sa.create_engine(f"sqlite:///{path}")
+    create_schema(engine)
+
+    if inline:
+        db.metadata.tables["submission_payload"].drop(engine)
+        db.metadata.tables["submission"].drop(engine)
+        legacy.create_all(engine)
+
+    seed(engine, submissions=submissions, code_size=code_size, inline=inline)
+
+    engine.execute("VACUUM")
+    return engine
+
+def report(label, engine, path, repeat):
+    print(f"\n=== {label}: {os.path.getsize(path) / 2 ** 20:.1f} MB on disk")
+
+    for name, statement in QUERIES.items():
+        rows = engine.execute(statement).fetchall()
+        size = sum(len(str(value)) for row in rows for value in row if value is not None)
+        samples = timed(lambda: engine.execute(statement).fetchall(), repeat)
+
+        print(f"{name}: {len(rows)} rows, {size / 2 ** 10:.0f} KB, "
+            f"p50 {percentile(samples, 50) * 1000:.2f} ms, max {max(samples) * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--submissions", type=int, default=100000)
+    parser.add_argument("--code-size", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "legacy.db")
+        report("inline", build(path, args.submissions, args.code_size, True), path, args.repeat)
+
+        path = os.path.join(directory, "payload.db")
+        report("compressed payload table", build(path, args.submissions, args.code_size, False), path, args.repeat)
+
+if __name__ == "__main__":
+    main()
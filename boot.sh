@@ -1,6 +1,13 @@
 #!/bin/sh
 
 source venv/bin/activate
-flask db init
-flask db upgrade
-exec gunicorn -b :5000 onlinejudge:app
\ No newline at end of file
+# Migrations run once per deploy as their own step, see the migrate service in docker-compose.yml
+if [ "$1" = "migrate" ]; then
+    exec flask db upgrade
+fi
+# The outbox relay, dispatch, reconciler and rejudges, one per deployment next to the web workers
+if [ "$1" = "scheduler" ]; then
+    exec flask scheduler run
+fi
+# Serving mode and pool sizes are set in gunicorn.conf.py
+exec gunicorn onlinejudge:app
\ No newline at end of file
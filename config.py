@@ -7,5 +7,96 @@ class Config(object):
     # Using SQLite as default database when one isn't defined
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database connection pool, size it to the threads (or greenlets) of a worker
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": (os.environ.get('DB_POOL_PRE_PING') or 'true').lower() == 'true',
+        "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    }
+    # SQLite doesn't use a queue pool
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            "pool_size": int(os.environ.get('DB_POOL_SIZE') or 10),
+            "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+            "pool_timeout": int(os.environ.get('DB_POOL_TIMEOUT') or 10)
+        })
+
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://'
+    # Redis connection pool, every open progress stream holds one connection
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS') or 64)
+    REDIS_POOL_TIMEOUT = int(os.environ.get('REDIS_POOL_TIMEOUT') or 5)
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT') or 5)
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL') or 30)
+
+    # Threads hashing and checking passwords for the whole process
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+
+    # Submission progress streams (seconds)
+    PROGRESS_STREAM_TIMEOUT = int(os.environ.get('PROGRESS_STREAM_TIMEOUT') or 300)
+    PROGRESS_HEARTBEAT = int(os.environ.get('PROGRESS_HEARTBEAT') or 15)
+
+    # Most submissions /api/submissions/status answers for in one request
+    STATUS_BATCH_LIMIT = int(os.environ.get('STATUS_BATCH_LIMIT') or 100)
+
+    # Jobs released to each evaluation queue at a time, the rest are held for fair-share ordering
+    SCHEDULER_QUEUE_DEPTH = int(os.environ.get('SCHEDULER_QUEUE_DEPTH') or 4)
+    SCHEDULER_INTERVAL = float(os.environ.get('SCHEDULER_INTERVAL') or 0.5)
+    # Jobs for the same problem and language handed to a worker in one pull, needs server.evaluate_batch in the judge
+    SCHEDULER_BATCH_SIZE = int(os.environ.get('SCHEDULER_BATCH_SIZE') or 1)
+    # Outbox entries scheduled per pipelined batch
+    OUTBOX_BATCH = int(os.environ.get('OUTBOX_BATCH') or 100)
+
+    # Submissions a bulk rejudge queues per second, and at most per step
+    REJUDGE_RATE = float(os.environ.get('REJUDGE_RATE') or 20)
+    REJUDGE_BATCH = int(os.environ.get('REJUDGE_BATCH') or 200)
+
+    # Seconds between sweeps of finished rq jobs, and how long a submission may wait before its job counts as lost
+    RECONCILE_INTERVAL = float(os.environ.get('RECONCILE_INTERVAL') or 30)
+    RECONCILE_STUCK_AFTER = int(os.environ.get('RECONCILE_STUCK_AFTER') or 600)
+    RECONCILE_BATCH = int(os.environ.get('RECONCILE_BATCH') or 200)
+
+    # Seconds a verdict is reused for identical resubmissions
+    VERDICT_CACHE_TTL = int(os.environ.get('VERDICT_CACHE_TTL') or 86400)
+
+    # Rate limits as "count/seconds", empty to disable. Contests can override the per problem limit.
+    SUBMISSION_RATE_LIMIT = os.environ.get('SUBMISSION_RATE_LIMIT', '20/60')
+    SUBMISSION_PROBLEM_RATE_LIMIT = os.environ.get('SUBMISSION_PROBLEM_RATE_LIMIT', '5/60')
+    AUTH_RATE_LIMIT = os.environ.get('AUTH_RATE_LIMIT', '10/60')
+
+    # Pending submissions above which only live contest submissions are accepted
+    ADMISSION_MAX_BACKLOG = int(os.environ.get('ADMISSION_MAX_BACKLOG') or 500)
+
+    # Rendered page fragments: "redis", "memory" (per process) or "none"
+    FRAGMENT_CACHE = os.environ.get('FRAGMENT_CACHE') or 'redis'
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL') or 300)
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE') or 256)
+
+    # Identity of logged in users, same backends as FRAGMENT_CACHE
+    USER_CACHE = os.environ.get('USER_CACHE') or 'redis'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 4096)
+
+    # Requests slower than this many seconds are logged with their slowest SQL, 0 to disable
+    SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD') or 0)
+    # Bearer token /metrics requires when set, otherwise only administrators may read it
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Judged submissions of contests that ended this many days ago move to the archive table
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 90)
+    ARCHIVE_BATCH = int(os.environ.get('ARCHIVE_BATCH') or 500)
+
+    # Rows per page of the problem and contest listings
+    LISTING_PER_PAGE = int(os.environ.get('LISTING_PER_PAGE') or 50)
+
+    # Statistics of a contest are cached this long once it has ended and nothing is left to judge
+    CONTEST_STATS_TTL = int(os.environ.get('CONTEST_STATS_TTL') or 7 * 86400)
+
+    # Pairs sharing this share of the smaller submission's fingerprints are reported, fingerprints
+    # more than SIMILARITY_COMMON of a problem's submissions have are ignored
+    SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD') or 0.6)
+    SIMILARITY_MIN_SHARED = int(os.environ.get('SIMILARITY_MIN_SHARED') or 5)
+    SIMILARITY_COMMON = float(os.environ.get('SIMILARITY_COMMON') or 0.5)
+
+    # Serve the administrators page, the scheduler loop and one-off commands can do without
+    ADMIN_ENABLED = (os.environ.get('ADMIN_ENABLED') or 'true').lower() == 'true'
     FLASK_ADMIN_SWATCH = "flatly"
@@ -0,0 +1,35 @@
+# Read by gunicorn from the working directory. GUNICORN_WORKER_CLASS picks the
+# serving mode:
+#
+#   gthread  threads per worker (default), needs no extra packages
+#   gevent   greenlets per worker, needs pip install gevent psycogreen
+#   sync     one request at a time per worker, progress streams hold a whole
+#            worker so only for comparison
+#
+# Keep DB_POOL_SIZE + DB_MAX_OVERFLOW and REDIS_MAX_CONNECTIONS at or above the
+# requests a worker serves at once (threads or worker_connections).
+import os
+
+from config import Config
+
+bind = os.environ.get("GUNICORN_BIND") or ":5000"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS") or "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS") or 1)
+threads = int(os.environ.get("GUNICORN_THREADS") or 32)
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS") or 256)
+# Progress streams stay open for up to PROGRESS_STREAM_TIMEOUT, plus a heartbeat
+# interval for the last wait. A worker timeout shorter than that would have a
+# sync worker killed mid-stream, so GUNICORN_TIMEOUT can only raise it.
+stream_timeout = Config.PROGRESS_STREAM_TIMEOUT + Config.PROGRESS_HEARTBEAT + 15
+timeout = max(int(os.environ.get("GUNICORN_TIMEOUT") or 0), stream_timeout)
+keepalive = 5
+# Import the app once in the master and fork the workers from it, so they start
+# (and restart) without importing anything. Connections are made per process,
+# see app.connections. Off for gevent, whose patching has to come before the import.
+preload_app = (os.environ.get("GUNICORN_PRELOAD") or ("false" if worker_class == "gevent" else "true")).lower() == "true"
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        # Let psycopg2 wait on the database cooperatively
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
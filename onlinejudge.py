@@ -1,6 +1,7 @@
-from app import app
-from app import app, db
-from app.models import User, Problem, Announcement, SampleCase, Contest, Registration, Submission
+from app import create_app, db
+from app.models import User, Problem, Announcement, SampleCase, Contest, Registration, Submission, Standing
+
+app = create_app()
 
 # Useful for debugging database objects
 @app.shell_context_processor
@@ -13,5 +14,6 @@ def make_shell_context():
         "SampleCase": SampleCase,
         "Contest": Contest,
         "Registration": Registration,
-        "Submission": Submission
+        "Submission": Submission,
+        "Standing": Standing
         }
\ No newline at end of file
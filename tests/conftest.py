@@ -0,0 +1,73 @@
+from app import create_app, db
+from app.models import Contest, Problem, Registration, Submission, User
+from config import Config
+from datetime import datetime, timedelta
+
+import fakeredis
+import json
+import pytest
+
+# Every test gets an app on an in-memory SQLite database and its own fakeredis
+# (with lupa for the scheduler's Lua scripts), see requirements-dev.txt.
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    WTF_CSRF_ENABLED = False
+    FRAGMENT_CACHE = "memory"
+    USER_CACHE = "none"
+    SUBMISSION_RATE_LIMIT = SUBMISSION_PROBLEM_RATE_LIMIT = AUTH_RATE_LIMIT = ""
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    app.redis = fakeredis.FakeStrictRedis()
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def contest(app):
+    # Live for another two hours, with three problems
+    now = datetime.utcnow()
+    contest = Contest(title="Contest", start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=2))
+    for i in range(1, 4):
+        contest.problems.append(Problem(title=f"Problem {i}", body="Add two numbers.", points=100 * i,
+            difficulty="Easy", time_limit=1000, memory_limit=256))
+
+    db.session.add(contest)
+    db.session.commit()
+    return contest
+
+def make_user(username, admin=False, contest=None):
+    user = User(username=username, email=f"{username}@example.com", is_admin=admin)
+    user.set_password("password")
+    db.session.add(user)
+    db.session.commit()
+
+    if contest is not None:
+        db.session.add(Registration(user_id=user.id, contest_id=contest.id))
+        db.session.commit()
+
+    return user
+
+def make_submission(user, problem, code="print(1)", language="python3", **fields):
+    submission = Submission(user_id=user.id, problem=problem, code=code, language=language, **fields)
+    db.session.add(submission)
+    db.session.commit()
+    return submission
+
+def login(client, username):
+    return client.post("/login", data={"username": username, "password": "password"})
+
+def events(response):
+    # The data of every server-sent event in a streamed response
+    return [json.loads(line[len("data: "):]) for line in response.get_data(as_text=True).split("\n\n") if line]
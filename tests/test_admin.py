@@ -0,0 +1,37 @@
+from app.models import Rejudge
+from tests.conftest import login, make_user
+
+import pytest
+
+@pytest.mark.parametrize("view, field", [("problem", "problem_id"), ("contest", "contest_id")])
+def test_only_admins_can_start_rejudges(client, contest, view, field):
+    make_user("alice")
+    make_user("root", admin=True)
+    problem_id = contest.problems.first().id
+    id = problem_id if view == "problem" else contest.id
+
+    login(client, "alice")
+    client.post(f"/admin/{view}/action/", data={"action": "rejudge", "rowid": [id]})
+    assert Rejudge.query.count() == 0
+
+    client.get("/logout")
+    login(client, "root")
+    client.post(f"/admin/{view}/action/", data={"action": "rejudge", "rowid": [id]})
+    assert [getattr(rejudge, field) for rejudge in Rejudge.query] == [id]
+
+def test_only_admins_can_run_similarity_checks(client, contest, monkeypatch):
+    from app import similarity
+
+    checked = []
+    monkeypatch.setattr(similarity, "check", lambda contest: checked.append(contest.id) or 0)
+    make_user("alice")
+    make_user("root", admin=True)
+
+    login(client, "alice")
+    client.post("/admin/contest/action/", data={"action": "similarity", "rowid": [contest.id]})
+    assert checked == []
+
+    client.get("/logout")
+    login(client, "root")
+    client.post("/admin/contest/action/", data={"action": "similarity", "rowid": [contest.id]})
+    assert checked == [contest.id]
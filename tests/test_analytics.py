@@ -0,0 +1,65 @@
+from app import analytics, db, testcases
+from app.models import ArchivedSubmission
+from datetime import datetime, timedelta
+from tests.conftest import login, make_submission, make_user
+
+def at(contest, minutes):
+    return contest.start_time + timedelta(minutes=minutes)
+
+def judged(user, problem, status, minutes, language="python3", real_time=None):
+    submission = make_submission(user, problem, status=status, language=language, timestamp=at(problem.contest, minutes))
+    if real_time is not None:
+        testcases.record(db.session, submission.id, [{"id": 1, "result": status, "real_time": real_time, "memory": 2 ** 20}])
+        db.session.commit()
+    return submission
+
+def test_statistics_of_every_problem_and_language(app, contest):
+    alice, bob = make_user("alice"), make_user("bob")
+    first, second, third = contest.problems.all()
+    judged(alice, first, -1, 5, real_time=900)
+    judged(alice, first, 0, 10, real_time=40)
+    judged(bob, first, -1, 12, language="cpp")
+    judged(bob, first, 0, 20, language="cpp", real_time=5)
+    db.session.add(ArchivedSubmission(id=100, contest_id=contest.id, user_id=bob.id, problem_id=second.id,
+        timestamp=at(contest, 30), language="cpp", status=0, max_time=300, max_memory=40 * 2 ** 20))
+    # Made outside the contest
+    judged(alice, second, 0, -10)
+    db.session.commit()
+
+    stats = analytics.compute(contest)
+
+    assert [(p["title"], p["attempts"], p["accepted"]) for p in stats["problems"]] == [
+        (first.title, 4, 2), (second.title, 1, 1), (third.title, 0, 0)]
+    one = stats["problems"][0]
+    assert (one["acceptance_rate"], one["first_solve"]) == (0.5, 600)
+    assert (one["time"]["max"], one["time"]["avg"]) == (40, 22.5)
+    assert [b["count"] for b in one["time"]["buckets"]] == [1, 1, 0, 0, 0, 0, 0, 0]
+    assert sorted(one["languages"]) == ["cpp", "python3"]
+    assert stats["languages"]["cpp"]["accepted"] == 2
+    assert stats["problems"][1]["memory"]["buckets"][2]["count"] == 1
+    assert stats["overall"]["attempts"] == 5
+    assert stats["final"] is False
+
+def test_statistics_are_for_organisers_until_the_end(app, client, contest):
+    make_user("alice")
+    make_user("admin", admin=True)
+    path = f"/api/contest/{contest.id}/statistics"
+
+    login(client, "alice")
+    assert client.get(path).status_code == 403
+
+    client.get("/logout")
+    login(client, "admin")
+    assert client.get(path).status_code == 200
+
+def test_final_statistics_are_cached(app, client, contest):
+    contest.end_time = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+    user = make_user("alice")
+    judged(user, contest.problems.first(), 0, 10)
+    path = f"/api/contest/{contest.id}/statistics"
+
+    assert client.get(path).get_json()["overall"]["attempts"] == 1
+
+    judged(user, contest.problems.first(), -1, 20)
+    assert client.get(path).get_json()["overall"]["attempts"] == 1
@@ -0,0 +1,43 @@
+from app import create_app, connections
+from tests.conftest import TestConfig
+
+import os
+import sqlalchemy as sa
+
+class NoAdmin(TestConfig):
+    ADMIN_ENABLED = False
+    # Nothing listens here, connecting would fail
+    REDIS_URL = "redis://127.0.0.1:1/0"
+
+def test_building_the_app_connects_to_nothing():
+    app = create_app(NoAdmin)
+
+    assert app._redis is None and app._task_queues is None
+
+def test_admin_is_left_out_when_disabled():
+    assert not any(rule.rule.startswith("/admin") for rule in create_app(NoAdmin).url_map.iter_rules())
+    assert any(rule.rule.startswith("/admin") for rule in create_app(TestConfig).url_map.iter_rules())
+
+def test_connections_are_made_once_per_process(monkeypatch):
+    app = create_app(NoAdmin)
+    first = app.redis
+    assert app.redis is first
+    assert app.task_queues[("contest", "gcc")].connection is first
+
+    # A worker forked from the master
+    pid = os.getpid()
+    monkeypatch.setattr(connections.os, "getpid", lambda: pid + 1)
+    assert app.redis is not first
+    assert app.task_queues[("contest", "gcc")].connection is app.redis
+
+def test_database_connections_dont_cross_a_fork(tmp_path, monkeypatch):
+    engine = sa.create_engine("sqlite:///" + str(tmp_path / "fork.db"), poolclass=sa.pool.QueuePool)
+    with engine.connect() as connection:
+        inherited = connection.connection.connection
+
+    pid = os.getpid()
+    monkeypatch.setattr(connections.os, "getpid", lambda: pid + 1)
+
+    with engine.connect() as connection:
+        assert connection.connection.connection is not inherited
+        assert connection.scalar("SELECT 1") == 1
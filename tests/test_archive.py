@@ -0,0 +1,60 @@
+from app import archive, db, standings, testcases
+from app.models import ArchivedSubmission, Registration, Standing, Submission, SubmissionPayload
+from datetime import timedelta
+from tests.conftest import make_submission, make_user
+
+import pytest
+
+@pytest.fixture
+def ended(contest):
+    # Ended 40 days ago
+    contest.start_time -= timedelta(days=40)
+    contest.end_time -= timedelta(days=40)
+    db.session.commit()
+    return contest
+
+def during(contest, minutes=10):
+    return contest.start_time + timedelta(minutes=minutes)
+
+def test_judged_submissions_of_old_contests_are_moved(app, ended):
+    user = make_user("alice", contest=ended)
+    problem = ended.problems.first()
+    solved = make_submission(user, problem, status=0, timestamp=during(ended))
+    standings.rebuild(ended)
+    wrong = [make_submission(user, problem, code=f"print({i})", status=-1, timestamp=during(ended, 20 + i))
+        for i in range(3)]
+    pending = make_submission(user, problem, status=-2, timestamp=during(ended, 30))
+    testcases.record(db.session, wrong[0].id, [{"id": 1, "result": -1, "real_time": 30, "memory": 2048}])
+    db.session.commit()
+    kept, moved = [solved.id, pending.id], [s.id for s in wrong]
+
+    assert archive.run(30, batch=2) == 3
+
+    assert [s.id for s in Submission.query.order_by(Submission.id)] == kept
+    assert SubmissionPayload.query.count() == 2
+    assert [s.id for s in ArchivedSubmission.query.order_by(ArchivedSubmission.id)] == moved
+    moved = archive.find(moved[0])
+    assert isinstance(moved, ArchivedSubmission)
+    assert (moved.code, moved.status, moved.max_time, moved.contest_id) == ("print(0)", -1, 30, ended.id)
+    assert moved.get_testcases() == [{"id": 1, "result": -1, "real_time": 30, "memory": 2048}]
+
+    # The standings still rebuild from what stayed
+    standings.rebuild(ended)
+    assert Standing.query.one().submission_id == solved.id
+    assert Registration.query.one().score == problem.points
+
+def test_recent_contests_stay(app, contest):
+    make_submission(make_user("alice"), contest.problems.first(), status=-1)
+
+    assert archive.run(30) == 0
+
+def test_archived_submissions_are_still_served(app, client, ended):
+    user = make_user("alice", contest=ended)
+    submission = make_submission(user, ended.problems.first(), code="print(42)", status=-1, progress="1/3",
+        timestamp=during(ended)).id
+    archive.run(30)
+
+    assert client.get(f"/api/submission/{submission}").get_json() == {"progress": "1/3", "status": -1, "cases": []}
+    page = client.get(f"/submission/{submission}")
+    assert page.status_code == 200
+    assert b"print(42)" in page.data
@@ -0,0 +1,63 @@
+from app import cache, db
+from app.models import Contest
+from datetime import datetime, timedelta
+
+import pytest
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(app, request):
+    app.extensions["fragment_cache"] = cache.create_backend(request.param, "fragment", 100)
+    return app.extensions["fragment_cache"]
+
+def test_fragments_render_once(backend):
+    renders = []
+    render = lambda: renders.append(1) or "<p>Statement</p>"
+
+    assert cache.fragment("problem:1", render) == "<p>Statement</p>"
+    assert cache.fragment("problem:1", render) == "<p>Statement</p>"
+    assert len(renders) == 1
+
+    cache.invalidate("problem:1")
+    cache.fragment("problem:1", render)
+    assert len(renders) == 2
+
+def test_memory_backend_drops_the_least_recently_used(app):
+    backend = cache.create_backend("memory", "fragment", 2)
+    backend.set("a", "A", 60)
+    backend.set("b", "B", 60)
+    backend.get("a")
+    backend.set("c", "C", 60)
+
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == ("A", None, "C")
+
+    backend.set("d", "D", -1)
+    assert backend.get("d") is None
+
+def test_moving_a_problem_clears_both_contests(backend, contest):
+    other = Contest(title="Other", start_time=datetime.utcnow(), end_time=datetime.utcnow() + timedelta(hours=1))
+    db.session.add(other)
+    db.session.commit()
+
+    keys = cache.contest_keys(contest.id) + cache.contest_keys(other.id)
+    for key in keys:
+        backend.set(key, "cached", 60)
+
+    assert [backend.get(key) for key in keys] == ["cached"] * len(keys)
+
+    problem = contest.problems.first()
+    problem.contest_id = other.id
+    cache.invalidate_model(problem)
+
+    assert [backend.get(key) for key in keys] == [None] * len(keys)
+
+def test_problem_page_shows_the_edit_once_invalidated(app, client, contest):
+    app.extensions["fragment_cache"] = cache.create_backend("memory", "fragment", 10)
+    problem = contest.problems.first()
+    assert b"Add two numbers." in client.get(f"/problem/{problem.id}").data
+
+    problem.body = "Multiply two numbers."
+    db.session.commit()
+    assert b"Add two numbers." in client.get(f"/problem/{problem.id}").data
+
+    cache.invalidate_model(problem)
+    assert b"Multiply two numbers." in client.get(f"/problem/{problem.id}").data
@@ -0,0 +1,21 @@
+import os
+import runpy
+
+from config import Config
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(__file__)), "gunicorn.conf.py")
+
+def load(monkeypatch, gunicorn_timeout=None, **config):
+    if gunicorn_timeout:
+        monkeypatch.setenv("GUNICORN_TIMEOUT", gunicorn_timeout)
+    for name, value in config.items():
+        monkeypatch.setattr(Config, name, value)
+    return runpy.run_path(CONF)
+
+def test_worker_timeout_outlasts_progress_streams(monkeypatch):
+    conf = load(monkeypatch, PROGRESS_STREAM_TIMEOUT=600, PROGRESS_HEARTBEAT=20)
+    assert conf["timeout"] > 600 + 20
+
+def test_gunicorn_timeout_cannot_cut_streams_short(monkeypatch):
+    assert load(monkeypatch, "60", PROGRESS_STREAM_TIMEOUT=300)["timeout"] > 300
+    assert load(monkeypatch, "900", PROGRESS_STREAM_TIMEOUT=300)["timeout"] == 900
@@ -0,0 +1,60 @@
+from app import cache, db, identity
+from tests.conftest import login, make_user
+
+import pytest
+
+@pytest.fixture(params=["memory", "redis"])
+def cached(app, request):
+    app.extensions["user_cache"] = cache.create_backend(request.param, "user", 100)
+
+def test_identity_is_loaded_once(cached, app):
+    user = make_user("alice")
+    assert identity.load(user.id).username == "alice"
+
+    # Behind the session's back, so nothing is invalidated
+    db.session.execute("UPDATE user SET username = 'mallory' WHERE id = :id", {"id": user.id})
+    db.session.commit()
+
+    assert identity.load(user.id).username == "alice"
+
+def test_committed_changes_drop_the_cached_identity(cached, app):
+    user = make_user("alice", admin=True)
+    assert identity.load(user.id).is_admin
+
+    user.is_admin = False
+    db.session.commit()
+
+    assert not identity.load(user.id).is_admin
+
+def test_deleted_users_are_logged_out(cached, app):
+    user = make_user("alice")
+    identity.load(user.id)
+
+    db.session.delete(user)
+    db.session.commit()
+
+    assert identity.load(user.id) is None
+
+def test_rolled_back_changes_keep_the_identity(cached, app):
+    user = make_user("alice")
+    identity.load(user.id)
+
+    user.username = "bob"
+    db.session.flush()
+    db.session.rollback()
+    db.session.execute("UPDATE user SET username = 'mallory' WHERE id = :id", {"id": user.id})
+    db.session.commit()
+
+    assert identity.load(user.id).username == "alice"
+
+def test_requests_take_current_user_from_the_cache(cached, app, client):
+    user = make_user("alice")
+    login(client, "alice")
+    client.get("/")
+
+    db.session.execute("UPDATE user SET username = 'mallory' WHERE id = :id", {"id": user.id})
+    db.session.commit()
+
+    page = client.get("/").get_data(as_text=True)
+    assert ">alice</button>" in page
+    assert "mallory" not in page
@@ -0,0 +1,108 @@
+from app import db, importer
+from app.models import Contest, Problem, SampleCase
+
+import pytest
+import shutil
+
+CONTEST = """title: Spring Round
+start_time: 2026-04-01 10:00:00
+end_time: 2026-04-01 13:00:00
+"""
+
+PROBLEM = """title: {title}
+points: {points}
+difficulty: Easy
+time_limit: 1000
+memory_limit: 256
+"""
+
+def write(root, files):
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
+
+@pytest.fixture
+def problem_set(tmp_path):
+    return write(tmp_path / "set", {
+        "contest.yaml": CONTEST,
+        "a/problem.yaml": PROBLEM.format(title="Sum", points=100),
+        "a/statement.md": "Add *two* numbers.",
+        "a/samples/1.in": "1 2\n",
+        "a/samples/1.out": "3\n",
+        "a/samples/2.in": "5 5\n",
+        "a/samples/2.out": "10\n",
+        "a/samples/2.md": "Five and five.",
+        "b/problem.yaml": PROBLEM.format(title="Product", points=200),
+        "b/statement.html": "<p>Multiply two numbers.</p>"
+    })
+
+def test_import_creates_the_contest_problems_and_samples(app, problem_set):
+    assert importer.run(str(problem_set), batch=1) == 2
+
+    contest = Contest.query.one()
+    assert contest.title == "Spring Round"
+    assert sorted((p.title, p.points, p.contest_id) for p in Problem.query) == [
+        ("Product", 200, contest.id), ("Sum", 100, contest.id)]
+
+    problem = Problem.query.filter_by(title="Sum").one()
+    assert problem.body == "<p>Add <em>two</em> numbers.</p>"
+    samples = SampleCase.query.filter_by(problem_id=problem.id).order_by(SampleCase.title).all()
+    assert [(s.title, s.input_text, s.output_text) for s in samples] == [("1", "1 2\n", "3\n"), ("2", "5 5\n", "10\n")]
+    assert samples[1].body == "<p>Five and five.</p>"
+
+def test_reimport_updates_in_place(app, problem_set):
+    importer.run(str(problem_set))
+    ids = {p.title: p.id for p in Problem.query}
+
+    (problem_set / "a/samples/1.out").write_text("4\n")
+    (problem_set / "a/samples/2.in").unlink()
+    (problem_set / "a/samples/2.out").unlink()
+    changes = []
+    importer.run(str(problem_set), echo=lambda sign, text: changes.append((sign, text)))
+
+    assert {p.title: p.id for p in Problem.query} == ids
+    assert [s.output_text for s in SampleCase.query] == ["4\n"]
+    assert changes == [("=", "problem Sum"), ("~", "sample Sum/1 (output_text)"), ("-", "sample Sum/2"),
+        ("=", "problem Product")]
+
+def test_dry_run_writes_nothing(app, problem_set):
+    changes = []
+    assert importer.run(str(problem_set), dry_run=True, echo=lambda sign, text: changes.append(sign)) == 2
+
+    assert Contest.query.count() == Problem.query.count() == 0
+    assert changes.count("+") == 5
+
+def test_zip_archives_import_like_directories(app, problem_set, tmp_path):
+    archive = shutil.make_archive(str(tmp_path / "set"), "zip", str(problem_set))
+
+    assert importer.run(archive) == 2
+    assert SampleCase.query.count() == 2
+
+def test_broken_archives_are_refused_by_the_command(app, problem_set):
+    (problem_set / "a/samples/1.out").unlink()
+
+    result = app.test_cli_runner().invoke(args=["problems", "import", str(problem_set)])
+
+    assert result.exit_code != 0
+    assert "1.in has no 1.out" in result.output
+    assert Problem.query.count() == 0
+
+def test_reimport_keeps_fields_the_files_leave_out(app, problem_set):
+    importer.run(str(problem_set))
+    contest = Contest.query.one()
+    contest.editorial, contest.submission_limit, contest.submission_period = "<p>Solutions</p>", 3, 60
+    Problem.query.filter_by(title="Sum").one().difficulty = "Hard"
+    db.session.commit()
+
+    (problem_set / "a/problem.yaml").write_text(PROBLEM.format(title="Sum", points=150).replace("difficulty: Easy\n", ""))
+    changes = []
+    importer.run(str(problem_set), echo=lambda sign, text: changes.append((sign, text)))
+
+    contest = Contest.query.one()
+    assert (contest.editorial, contest.submission_limit, contest.submission_period) == ("<p>Solutions</p>", 3, 60)
+    problem = Problem.query.filter_by(title="Sum").one()
+    assert (problem.points, problem.difficulty) == (150, "Hard")
+    assert ("~", "problem Sum (points)") in changes
+    assert not any(text.startswith("contest") for sign, text in changes)
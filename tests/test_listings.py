@@ -0,0 +1,65 @@
+from app import db, listings
+from app.models import Contest, Problem
+from datetime import datetime, timedelta
+from tests.conftest import login, make_user
+
+def problem(title, points, difficulty="Easy", contest=None):
+    return Problem(title=title, body="", points=points, difficulty=difficulty, time_limit=1000, memory_limit=256,
+        contest=contest)
+
+def test_problems_of_upcoming_contests_are_hidden(app, contest):
+    upcoming = Contest(title="Upcoming", start_time=datetime.utcnow() + timedelta(days=1),
+        end_time=datetime.utcnow() + timedelta(days=1, hours=3))
+    db.session.add_all([problem("Secret", 500, contest=upcoming), problem("Practice", 50, "Hard")])
+    db.session.commit()
+
+    with app.test_request_context():
+        titles = [p.title for p in listings.problems().items]
+        assert "Secret" not in titles and "Practice" in titles
+        assert [p.title for p in listings.problems(difficulty="Hard").items] == ["Practice"]
+        assert [p.points for p in listings.problems(sort="-points").items] == [300, 200, 100, 50]
+        assert [p.title for p in listings.problems(sort="difficulty").items][-1] == "Practice"
+
+def test_listings_paginate(app, contest):
+    app.config["LISTING_PER_PAGE"] = 2
+
+    with app.test_request_context():
+        pages = [listings.problems(page=page) for page in (1, 2)]
+        assert [len(page.items) for page in pages] == [2, 1]
+        assert pages[1].total == 3
+
+def test_contests_by_status(app, contest):
+    now = datetime.utcnow()
+    db.session.add(Contest(title="Past", start_time=now - timedelta(days=2), end_time=now - timedelta(days=1)))
+    db.session.commit()
+
+    with app.test_request_context():
+        assert [c.title for c in listings.contests("ongoing").items] == ["Contest"]
+        assert [c.title for c in listings.contests("ended").items] == ["Past"]
+        assert listings.contests("upcoming").items == []
+
+def test_repeat_visits_get_a_304_until_something_changes(app, client, contest):
+    first = client.get("/problems")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert "private" in first.headers["Cache-Control"]
+
+    assert client.get("/problems", headers={"If-None-Match": etag}).status_code == 304
+
+    edited = contest.problems.first()
+    edited.points = 150
+    db.session.commit()
+
+    changed = client.get("/problems", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_tags_are_per_user(app, client, contest):
+    anonymous = client.get("/contests").headers["ETag"]
+
+    make_user("alice")
+    # The welcome message waits for the index, the listing is still tagged
+    login(client, "alice")
+
+    assert client.get("/contests").headers["ETag"] != anonymous
+    assert client.get("/contests", headers={"If-None-Match": anonymous}).status_code == 200
@@ -0,0 +1,63 @@
+from app import metrics
+from flask import g
+from tests.conftest import login, make_user
+
+import fakeredis
+import re
+
+def count(text, name, endpoint):
+    match = re.search(rf'^{name}_count{{endpoint="{endpoint}"[^}}]*}} (\d+)$', text, re.M)
+    return int(match.group(1)) if match else 0
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", (0.1, 1), ("endpoint",))
+    histogram.observe(0.5, "a")
+    histogram.observe(2, "a")
+
+    assert histogram.render().split("\n")[2:] == [
+        'test_seconds_bucket{endpoint="a",le="0.1"} 0',
+        'test_seconds_bucket{endpoint="a",le="1"} 1',
+        'test_seconds_bucket{endpoint="a",le="+Inf"} 2',
+        'test_seconds_count{endpoint="a"} 2',
+        'test_seconds_sum{endpoint="a"} 2.5'
+    ]
+
+def test_requests_are_recorded_per_endpoint(app, client, contest):
+    make_user("admin", admin=True)
+    login(client, "admin")
+    before = metrics.render()
+    client.get("/problems")
+    after = client.get("/metrics").get_data(as_text=True)
+
+    for name in ("http_request_sql_queries", "http_request_redis_commands"):
+        assert count(after, name, "main.problem_list") == count(before, name, "main.problem_list") + 1
+    assert re.search(r'http_request_sql_queries_sum{endpoint="main.problem_list"} [1-9]', after)
+
+def test_metrics_are_for_administrators_without_a_token(client):
+    assert client.get("/metrics").status_code == 403
+
+    make_user("alice")
+    login(client, "alice")
+    assert client.get("/metrics").status_code == 403
+
+    make_user("admin", admin=True)
+    login(client, "admin")
+    assert client.get("/metrics").status_code == 200
+
+def test_metrics_need_the_token_when_one_is_set(app, client):
+    app.config["METRICS_TOKEN"] = "secret"
+
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
+
+def test_a_pipeline_is_one_round_trip(app):
+    connection = metrics.instrument_redis(fakeredis.FakeStrictRedis())
+
+    with app.test_request_context():
+        metrics.start_request()
+        with connection.pipeline() as pipe:
+            pipe.set("a", 1).set("b", 2).get("a")
+            pipe.execute()
+        connection.get("b")
+
+        assert (g.metrics["redis_commands"], g.metrics["redis_roundtrips"]) == (4, 2)
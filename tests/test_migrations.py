@@ -0,0 +1,78 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from app import create_app, db
+from flask_migrate import upgrade
+from tests.conftest import TestConfig
+
+import logging.config
+import os
+import pytest
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # A database built by the migrations alone
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + str(tmp_path / "migrated.db")
+
+    # migrations/env.py would reset the loggers the other tests capture
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *args, **kwargs: None)
+
+    app = create_app(Config)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def test_migrations_build_the_models_schema(database):
+    upgrade(directory=MIGRATIONS)
+
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"compare_type": False})
+        assert compare_metadata(context, db.metadata) == []
+
+def test_duplicate_registrations_are_dropped_before_the_unique_index(database):
+    upgrade(directory=MIGRATIONS, revision="5b2e9c7a41d8")
+    db.session.execute("INSERT INTO user (id, username) VALUES (1, 'alice')")
+    db.session.execute("INSERT INTO contest (id, title) VALUES (1, 'Contest')")
+    for id in (1, 2, 3):
+        db.session.execute(f"INSERT INTO registration (id, user_id, contest_id) VALUES ({id}, 1, 1)")
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS, revision="8c41f0d2b9a3")
+
+    assert [row[0] for row in db.session.execute("SELECT id FROM registration")] == [1]
+
+def test_verdicts_judged_before_judged_at_existed_arent_landed_again(database):
+    upgrade(directory=MIGRATIONS, revision="bfc260accbe8")
+    db.session.execute("INSERT INTO submission (id, status, timestamp) VALUES (1, 0, '2026-01-01 10:00:00')")
+    db.session.execute("INSERT INTO submission (id, status, timestamp) VALUES (2, -2, '2026-01-01 10:05:00')")
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS, revision="ea5f2232804e")
+
+    assert list(db.session.execute("SELECT id, judged_at FROM submission ORDER BY id")) == [
+        (1, "2026-01-01 10:00:00"), (2, None)]
+
+def test_standings_are_filled_from_existing_submissions(database):
+    upgrade(directory=MIGRATIONS, revision="1d003844659f")
+    for statement in (
+        "INSERT INTO user (id, username) VALUES (1, 'alice'), (2, 'bob')",
+        "INSERT INTO contest (id, title, start_time, end_time) "
+            "VALUES (1, 'Contest', '2026-01-01 10:00:00', '2026-01-01 13:00:00')",
+        "INSERT INTO problem (id, contest_id, title, points) VALUES (1, 1, 'Sum', 100), (2, 1, 'Product', 200)",
+        "INSERT INTO registration (id, user_id, contest_id) VALUES (1, 1, 1)",
+        "INSERT INTO submission (id, user_id, problem_id, status, timestamp) VALUES "
+            "(1, 1, 1, -1, '2026-01-01 10:05:00'), (2, 1, 1, 0, '2026-01-01 10:10:00'), "
+            "(3, 1, 1, 0, '2026-01-01 10:20:00'), (4, 1, 2, 0, '2026-01-01 14:00:00'), "
+            "(5, 2, 2, 0, '2026-01-01 10:30:00')"
+    ):
+        db.session.execute(statement)
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS, revision="5b2e9c7a41d8")
+
+    assert list(db.session.execute(
+        "SELECT contest_id, registration_id, problem_id, submission_id, solved_at FROM standing")) == [
+        (1, 1, 1, 2, "2026-01-01 10:10:00")]
@@ -0,0 +1,71 @@
+from app import db, outbox, rejudge, scheduler
+from app.models import Submission, SubmissionOutbox
+from tests.conftest import make_user
+
+def submit(user, problem, code="print(1)"):
+    submission = Submission(user_id=user.id, problem=problem, code=code, language="python3")
+    outbox.add(submission)
+    db.session.add(submission)
+    db.session.commit()
+    return submission
+
+def waiting(app, klass):
+    # Held by the scheduler or queued in rq
+    return app.redis.zcard(scheduler.keys(klass, "python3")["pending"]) + app.task_queues[(klass, "python3")].count
+
+def test_relay_schedules_and_deletes_the_entry(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = submit(user, contest.problems.first())
+
+    assert outbox.drain() == 1
+    assert SubmissionOutbox.query.count() == 0
+    assert submission.task_id.startswith(f"submission:{submission.id}:")
+    assert waiting(app, scheduler.CONTEST) == 1
+
+def test_every_entry_of_a_submission_gets_its_own_job(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = submit(user, contest.problems.first())
+    outbox.drain()
+    first = submission.task_id
+
+    submission.status = 0
+    db.session.commit()
+
+    # SQLite hands the deleted entry's id to the rejudge's entry
+    rejudge.queue(rejudge.create(problem_id=submission.problem_id), 10)
+    outbox.drain()
+
+    assert submission.task_id != first
+    assert waiting(app, scheduler.REJUDGE) == 1
+
+def test_replayed_entry_is_scheduled_once(app, contest, caplog):
+    user = make_user("alice", contest=contest)
+    submission = submit(user, contest.problems.first())
+    entry = submission.outbox
+    registration, args, klass = submission.prepare_task()
+
+    # The relay reached Redis but its commit was lost
+    assert scheduler.schedule_many([(submission, args, klass, outbox.job_id(entry))]) == set()
+    outbox.drain()
+
+    assert SubmissionOutbox.query.count() == 0
+    assert submission.task_id == outbox.job_id(entry)
+    assert waiting(app, klass) == 1
+    assert "already scheduled" in caplog.text
+
+def test_redis_failure_backs_off(app, contest, monkeypatch):
+    import redis
+
+    user = make_user("alice", contest=contest)
+    submission = submit(user, contest.problems.first())
+
+    def down(tasks):
+        raise redis.exceptions.ConnectionError("down")
+    monkeypatch.setattr(scheduler, "schedule_many", down)
+
+    assert outbox.relay() == 1
+    entry = SubmissionOutbox.query.one()
+    assert entry.attempts == 1 and entry.last_error == "down"
+    assert entry.available_at > entry.created_at
+    # Not due again until the backoff has passed
+    assert outbox.relay() == 0
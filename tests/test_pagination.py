@@ -0,0 +1,65 @@
+from app import db, pagination
+from app.models import Submission
+from datetime import datetime, timedelta
+from tests.conftest import make_user
+
+import pytest
+import re
+
+@pytest.fixture
+def submissions(contest):
+    # 45 submissions, in pairs sharing a timestamp
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+    start = datetime(2026, 1, 1)
+
+    for i in range(45):
+        db.session.add(Submission(user_id=user.id, problem=problem, code="print(1)", language="python3",
+            status=0, timestamp=start + timedelta(seconds=i // 2)))
+    db.session.commit()
+
+    # Newest first
+    return [s.id for s in Submission.query.order_by(Submission.timestamp.desc(), Submission.id.desc())]
+
+def page(before=None, after=None):
+    rows, newer, older = pagination.keyset_page(Submission.query, Submission.timestamp, Submission.id,
+        before=before, after=after)
+    return [row.id for row in rows], newer, older
+
+def test_pages_walk_every_row_once_in_both_directions(submissions):
+    pages, cursor = [], None
+    while True:
+        ids, newer, cursor = page(before=cursor)
+        pages.append((ids, newer))
+        if cursor is None:
+            break
+
+    assert [len(ids) for ids, _ in pages] == [20, 20, 5]
+    assert sum((ids for ids, _ in pages), []) == submissions
+    assert pages[0][1] is None
+
+    # And back up from the last page
+    ids, cursor, _ = page(after=pages[-1][1])
+    assert ids == pages[1][0]
+    ids, cursor, _ = page(after=cursor)
+    assert ids == pages[0][0]
+    assert cursor is None
+
+def test_cursors_round_trip_and_bad_ones_start_over(submissions):
+    row = Submission.query.get(submissions[0])
+    assert pagination.decode_cursor(pagination.encode_cursor(row)) == (row.timestamp, row.id)
+
+    assert pagination.decode_cursor("nonsense") is None
+    assert page(before="nonsense")[0] == submissions[:20]
+
+def shown(response):
+    return [int(id) for id in re.findall(r'id="(\d+)_status"', response.get_data(as_text=True))]
+
+def test_submission_list_pages(client, submissions):
+    first = client.get("/submissions")
+    assert first.status_code == 200
+    assert shown(first) == submissions[:20]
+
+    _, _, older = page()
+    second = client.get(f"/submissions?before={older}")
+    assert shown(second) == submissions[20:40]
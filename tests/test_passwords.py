@@ -0,0 +1,24 @@
+from app import passwords
+from tests.conftest import make_user
+
+import threading
+
+def test_hashing_runs_on_the_pool(app, monkeypatch):
+    threads = []
+    monkeypatch.setattr(passwords, "generate_password_hash", lambda password: threads.append(threading.get_ident()) or "hash")
+
+    assert passwords.generate("password") == "hash"
+    assert threads != [threading.get_ident()]
+
+def test_hashing_outside_the_app_runs_inline(monkeypatch):
+    threads = []
+    monkeypatch.setattr(passwords, "generate_password_hash", lambda password: threads.append(threading.get_ident()) or "hash")
+
+    passwords.generate("password")
+    assert threads == [threading.get_ident()]
+
+def test_passwords_check_through_the_pool(app):
+    user = make_user("alice")
+
+    assert user.check_password("password")
+    assert not user.check_password("wrong")
@@ -0,0 +1,39 @@
+from app import db
+from app.models import Submission, SubmissionPayload
+from tests.conftest import make_submission, make_user
+
+import json
+import zlib
+
+def test_code_is_stored_compressed_in_the_payload(contest):
+    code = "print(sum(map(int, input().split())))\n" * 200
+    submission = make_submission(make_user("alice"), contest.problems.first(), code=code)
+
+    stored = db.session.execute("SELECT code FROM submission_payload WHERE submission_id = :id",
+        {"id": submission.id}).scalar()
+    assert zlib.decompress(stored).decode("utf-8") == code
+    assert len(stored) < len(code) / 10
+
+    db.session.expire_all()
+    assert Submission.query.get(submission.id).code == code
+
+def test_listing_a_submission_leaves_the_payload_alone(app, contest):
+    submission = make_submission(make_user("alice"), contest.problems.first())
+    db.session.expire_all()
+
+    loaded = Submission.query.get(submission.id)
+    assert "payload" not in loaded.__dict__
+    assert "raw_testcases" not in loaded.__dict__
+
+def test_compact_moves_the_judges_results_into_the_payload(contest):
+    results = json.dumps({"data": [{"id": 1, "result": 0, "real_time": 12, "memory": 1024}]})
+    submission = make_submission(make_user("alice"), contest.problems.first(), status=0, raw_testcases=results)
+
+    submission.compact()
+    db.session.commit()
+    db.session.expire_all()
+
+    submission = Submission.query.get(submission.id)
+    assert submission.raw_testcases is None
+    assert SubmissionPayload.query.get(submission.id).testcases == results
+    assert submission.get_testcases() == [{"id": 1, "result": 0, "real_time": 12, "memory": 1024}]
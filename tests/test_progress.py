@@ -0,0 +1,53 @@
+import json
+
+from app import progress
+from app.models import Submission
+from tests.conftest import events, make_submission, make_user
+
+def test_stream_of_unknown_submission_is_404(client):
+    assert client.get("/api/submission/999/stream").status_code == 404
+
+def test_stream_of_judged_submission_sends_the_verdict_and_ends(app, client, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=0, progress="3/3")
+
+    response = client.get(f"/api/submission/{submission.id}/stream")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert [(event["status"], event["progress"]) for event in events(response)] == [(0, "3/3")]
+    # Landing is the scheduler's job, watching doesn't write
+    assert Submission.query.get(submission.id).judged_at is None
+
+def data(event):
+    return json.loads(event[len("data: "):])
+
+def published(updates):
+    # The next update from Redis, skipping the heartbeats that re-read the unchanged row
+    for event in updates:
+        if data(event)["progress"] != "0/0":
+            return data(event)
+
+def test_stream_forwards_published_updates(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=-2)
+
+    updates = progress.stream(submission.id)
+    assert data(next(updates))["status"] == -2
+
+    progress.publish(app.redis, submission.id, "1/3", -2, [{"case": 1}])
+    assert published(updates) == {"progress": "1/3", "status": -2, "cases": [{"case": 1}]}
+
+    progress.publish(app.redis, submission.id, "3/3", 0)
+    assert data(next(updates))["status"] == 0
+    assert list(updates) == []
+
+def test_stream_hides_cases_from_other_viewers(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=-2)
+
+    updates = progress.stream(submission.id, cases=False)
+    assert "cases" not in data(next(updates))
+
+    progress.publish(app.redis, submission.id, "1/3", -2, [{"case": 1}])
+    assert published(updates) == {"progress": "1/3", "status": -2}
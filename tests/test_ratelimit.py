@@ -0,0 +1,46 @@
+from app import ratelimit
+from tests.conftest import make_user
+
+import redis
+
+def test_bucket_allows_a_burst_then_refuses(app):
+    assert [ratelimit.take([("a", "3/60")]) for _ in range(3)] == [0, 0, 0]
+
+    wait = ratelimit.take([("a", "3/60")])
+    assert 0 < wait <= 20
+
+def test_a_refusal_doesnt_charge_the_other_buckets(app):
+    ratelimit.take([("narrow", "1/60")])
+
+    assert ratelimit.take([("wide", "2/60"), ("narrow", "1/60")]) > 0
+    assert ratelimit.take([("wide", "2/60")]) == 0
+    assert ratelimit.take([("wide", "2/60")]) == 0
+
+def test_unset_limits_allow_everything(app):
+    assert all(ratelimit.take([("a", "")]) == 0 for _ in range(10))
+
+def test_submissions_are_limited_per_problem(app, contest):
+    app.config["SUBMISSION_PROBLEM_RATE_LIMIT"] = "2/60"
+    user = make_user("alice")
+    first, second, _ = contest.problems.all()
+
+    assert ratelimit.admit_submission(user, first, None) is None
+    assert ratelimit.admit_submission(user, first, None) is None
+    assert "too quickly" in ratelimit.admit_submission(user, first, None)
+    assert ratelimit.admit_submission(user, second, None) is None
+
+def test_only_live_contest_submissions_are_taken_when_the_judge_is_swamped(app, contest, monkeypatch):
+    app.config["ADMISSION_MAX_BACKLOG"] = 10
+    monkeypatch.setattr(ratelimit.scheduler, "backlog", lambda: 11)
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+
+    assert ratelimit.admit_submission(user, problem, user.contests.first()) is None
+    assert "very busy" in ratelimit.admit_submission(user, problem, None)
+
+def test_submissions_are_admitted_while_redis_is_down(app, contest, monkeypatch):
+    def down():
+        raise redis.exceptions.ConnectionError("down")
+    monkeypatch.setattr(ratelimit.scheduler, "backlog", down)
+
+    assert ratelimit.admit_submission(make_user("alice"), contest.problems.first(), None) is None
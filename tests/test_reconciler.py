@@ -0,0 +1,125 @@
+from app import db, reconciler, scheduler
+from app.models import Standing, Submission, SubmissionOutbox
+from datetime import datetime, timedelta
+from rq.job import Job, JobStatus
+from rq.registry import FailedJobRegistry, FinishedJobRegistry
+from tests.conftest import make_submission, make_user
+
+import redis
+
+def judge(app, submission, progress="3/3", failed=False):
+    # What a worker leaves behind: the job in the finished or failed registry
+    job = Job.create("server.evaluate", args=(submission.id,), id=submission.task_id, connection=app.redis)
+    job.meta["progress"] = progress
+    job.started_at = datetime.utcnow() - timedelta(seconds=2)
+    job.ended_at = datetime.utcnow()
+    job.set_status(JobStatus.FAILED if failed else JobStatus.FINISHED, pipeline=app.redis.pipeline())
+    job.save()
+
+    queue = app.task_queues[(scheduler.CONTEST, "python3")]
+    registry = (FailedJobRegistry if failed else FinishedJobRegistry)(queue=queue)
+    registry.add(job, -1)
+    return registry
+
+def test_land_records_verdicts_nobody_looked_at(app, client, contest):
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+    # The judge writes the verdict straight into the row
+    submission = make_submission(user, problem, status=0, progress="3/3")
+
+    assert reconciler.land() == 1
+    assert Standing.query.filter_by(problem_id=problem.id).one().submission_id == submission.id
+    assert Submission.query.get(submission.id).judged_at is not None
+    assert reconciler.land() == 0
+
+def test_land_takes_the_newest_verdicts_first(contest):
+    user = make_user("alice", contest=contest)
+    older, newer = [make_submission(user, contest.problems.first(), status=-1) for _ in range(2)]
+
+    assert reconciler.land(batch=1) == 1
+    assert [s.id for s in Submission.query.filter(Submission.judged_at.isnot(None))] == [newer.id]
+
+def test_land_leaves_pending_submissions(contest):
+    user = make_user("alice", contest=contest)
+    make_submission(user, contest.problems.first(), status=-2)
+
+    assert reconciler.land() == 0
+
+def test_reading_a_submission_writes_nothing(client, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=0, progress="3/3")
+
+    assert client.get(f"/api/submission/{submission.id}").status_code == 200
+    assert Submission.query.get(submission.id).judged_at is None
+    assert Standing.query.count() == 0
+
+def test_sweep_finalises_finished_jobs(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=0, task_id="submission:1:a")
+    registry = judge(app, submission, progress="5/5")
+
+    assert reconciler.sweep() == 1
+    submission = Submission.query.get(submission.id)
+    assert submission.progress == "5/5"
+    assert submission.judged_at is not None
+    assert 1000 <= submission.judge_time <= 3000
+    assert registry.get_job_ids() == []
+    assert not app.redis.exists(Job.key_for("submission:1:a"))
+
+def test_sweep_marks_failed_jobs_as_judge_errors(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=-2, task_id="submission:1:a")
+    judge(app, submission, failed=True)
+
+    assert reconciler.sweep() == 1
+    assert Submission.query.get(submission.id).status == reconciler.JUDGE_ERROR
+
+def test_sweep_ignores_jobs_from_before_a_rejudge(app, contest):
+    user = make_user("alice", contest=contest)
+    submission = make_submission(user, contest.problems.first(), status=-2, task_id="submission:1:a")
+    judge(app, submission)
+
+    submission.task_id = "submission:1:b"
+    db.session.commit()
+
+    assert reconciler.sweep() == 1
+    submission = Submission.query.get(submission.id)
+    assert submission.status == -2
+    assert submission.judged_at is None
+
+def test_recover_requeues_submissions_whose_job_vanished(app, contest):
+    user = make_user("alice", contest=contest)
+    stuck = datetime.utcnow() - timedelta(seconds=app.config["RECONCILE_STUCK_AFTER"] + 60)
+    lost = make_submission(user, contest.problems.first(), status=-2, timestamp=stuck, task_id="submission:1:a")
+    held = make_submission(user, contest.problems.first(), status=-2, timestamp=stuck, task_id="submission:2:a")
+    make_submission(user, contest.problems.first(), status=-2, task_id="submission:3:a")
+    judge(app, held)
+
+    assert reconciler.recover() == 1
+    assert [entry.submission_id for entry in SubmissionOutbox.query] == [lost.id]
+
+def test_sweep_finalises_every_submission_of_a_batch(app, contest):
+    user = make_user("alice", contest=contest)
+    submissions = [make_submission(user, contest.problems.first(), status=0, task_id=f"submission:{i}:a")
+        for i in range(1, 3)]
+    for submission in submissions:
+        Job.create("server.evaluate_submission", args=(submission.id,), id=submission.task_id,
+            meta={"progress": "4/4"}, connection=app.redis).save()
+
+    batch = Job.create("server.evaluate_batch", args=([s.task_id for s in submissions],), id="batch:1",
+        connection=app.redis)
+    batch.ended_at = datetime.utcnow()
+    batch.save()
+    FinishedJobRegistry(queue=app.task_queues[(scheduler.CONTEST, "python3")]).add(batch, -1)
+
+    assert reconciler.sweep() == 1
+    assert [(s.progress, s.judged_at is not None) for s in Submission.query] == [("4/4", True)] * 2
+    assert not any(app.redis.exists(Job.key_for(s.task_id)) for s in submissions)
+
+def test_reconcile_still_lands_verdicts_while_redis_is_down(app, contest, monkeypatch):
+    def down(*args, **kwargs):
+        raise redis.exceptions.ConnectionError("down")
+    monkeypatch.setattr(reconciler, "sweep", down)
+    make_submission(make_user("alice", contest=contest), contest.problems.first(), status=0)
+
+    assert reconciler.reconcile() == {"finalised": 0, "recovered": 0, "landed": 1}
@@ -0,0 +1,114 @@
+from app import db, rejudge, testcases, verdicts
+from app.models import Registration, Rejudge, Standing, Submission, SubmissionOutbox
+from datetime import datetime, timedelta
+from tests.conftest import login, make_submission, make_user
+
+import json
+
+def judged(user, problem, status, **fields):
+    return make_submission(user, problem, status=status, progress="1/1", judged_at=datetime.utcnow(),
+        judge_time=40, **fields)
+
+def test_create_fixes_the_matching_submissions(contest):
+    alice, bob = make_user("alice", contest=contest), make_user("bob", contest=contest)
+    first, second = contest.problems.order_by("id").limit(2)
+    judged(alice, first, 0)
+    judged(bob, first, -1, language="cpp")
+    judged(alice, second, 0)
+
+    assert rejudge.create(problem_id=first.id).total == 2
+    assert rejudge.create(contest_id=contest.id, language="cpp").total == 1
+    assert rejudge.create(user_id=alice.id).total == 2
+
+    # Later submissions aren't part of it
+    r = rejudge.create(problem_id=first.id)
+    judged(bob, first, 0)
+    assert rejudge.matching(r).count() == 2
+
+def test_problem_rejudges_stop_reusing_cached_verdicts(app, contest):
+    user = make_user("alice", contest=contest)
+    first, second = contest.problems.order_by("id").limit(2)
+    for problem in (first, second):
+        submission = make_submission(user, problem, code="print(1)")
+        assert verdicts.lookup(submission) is None
+        submission.status, submission.progress = 0, "3/3"
+        db.session.commit()
+        verdicts.landed(submission)
+
+    rejudge.create(problem_id=first.id)
+    assert verdicts.lookup(make_submission(user, first, code="print(1)")) is None
+    assert verdicts.lookup(make_submission(user, second, code="print(1)")) is not None
+
+    # Filtering by language or user alone leaves the tests as they were
+    rejudge.create(language="python3")
+    assert verdicts.lookup(make_submission(user, second, code="print(1)")) is not None
+
+    rejudge.create(contest_id=contest.id)
+    assert verdicts.lookup(make_submission(user, second, code="print(1)")) is None
+
+def test_queue_resets_every_trace_of_the_earlier_run(contest):
+    user = make_user("alice", contest=contest)
+    submission = judged(user, contest.problems.first(), 0)
+    submission.payload.testcases = json.dumps({"data": [{"id": 1, "result": 0}]})
+    testcases.record(db.session, submission.id, [{"id": 1, "result": 0}])
+    db.session.commit()
+
+    r = rejudge.create(problem_id=submission.problem_id)
+    assert rejudge.queue(r, 10) == 1
+
+    submission = Submission.query.get(submission.id)
+    assert (submission.status, submission.progress, submission.judged_at, submission.judge_time) == (-2, "0/0", None, None)
+    assert submission.get_testcases() is None
+    assert SubmissionOutbox.query.filter_by(submission_id=submission.id, rejudge=True).count() == 1
+    assert (r.cursor, r.queued) == (submission.id, 1)
+
+def test_advance_queues_at_the_configured_rate(app, contest):
+    user = make_user("alice", contest=contest)
+    for _ in range(5):
+        judged(user, contest.problems.first(), 0)
+
+    app.config["REJUDGE_RATE"] = 2
+    r = rejudge.create(contest_id=contest.id)
+    r.updated_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert rejudge.advance() == 2
+    # Right after a step the rate allows nothing
+    assert rejudge.advance() == 0
+    assert Rejudge.query.get(r.id).queued == 2
+
+def test_finished_rejudge_rebuilds_the_standings(contest):
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+    submission = judged(user, problem, -1)
+
+    r = rejudge.create(problem_id=problem.id)
+    rejudge.queue(r, 10)
+    assert rejudge.advance() == 0
+    assert Rejudge.query.get(r.id).finished_at is None
+
+    # The new tests accept it
+    Submission.query.get(submission.id).status = 0
+    db.session.commit()
+    rejudge.advance()
+
+    assert Rejudge.query.get(r.id).finished_at is not None
+    assert Standing.query.filter_by(problem_id=problem.id).one().submission_id == submission.id
+    assert Registration.query.filter_by(user_id=user.id).one().score == problem.points
+    assert rejudge.progress(Rejudge.query.get(r.id))["judged"] == 1
+
+def test_progress_is_for_administrators(client, contest):
+    user = make_user("alice", contest=contest)
+    make_user("admin", admin=True)
+    judged(user, contest.problems.first(), 0)
+    r = rejudge.create(contest_id=contest.id)
+    rejudge.queue(r, 10)
+
+    login(client, "alice")
+    assert client.get(f"/api/rejudge/{r.id}").status_code == 403
+
+    client.get("/logout")
+    login(client, "admin")
+    progress = client.get(f"/api/rejudge/{r.id}").get_json()
+    assert (progress["total"], progress["queued"], progress["judged"], progress["finished_at"]) == (1, 1, 0, None)
+    assert client.get("/api/rejudge/999").status_code == 404
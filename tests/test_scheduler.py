@@ -0,0 +1,101 @@
+from app import scheduler
+from datetime import datetime, timedelta
+from tests.conftest import make_submission, make_user
+
+def hold(app, submissions, klass=scheduler.PRACTICE):
+    # Schedules without letting anything through to rq
+    app.config["SCHEDULER_QUEUE_DEPTH"] = 0
+    scheduler.schedule_many([
+        (s, [s.id, s.language, s.code, 256, 1000, s.problem_id, None, 100], klass, f"submission:{s.id}:a")
+        for s in submissions
+    ])
+
+def released(klass, chain, room=100):
+    return [[payload["args"][0] for payload in batch] for batch in scheduler.release(klass, chain, room)]
+
+def test_a_flood_of_submissions_is_interleaved_with_other_users(app, contest):
+    alice, bob = make_user("alice"), make_user("bob")
+    problem = contest.problems.first()
+    flood = [make_submission(alice, problem) for _ in range(4)]
+    hold(app, flood)
+    others = [make_submission(bob, problem) for _ in range(2)]
+    hold(app, others)
+
+    order = [id for (id,) in released(scheduler.PRACTICE, "python3")]
+
+    assert order == [flood[0].id, others[0].id, flood[1].id, others[1].id, flood[2].id, flood[3].id]
+
+def test_latecomers_dont_get_credit_for_time_they_werent_waiting(app, contest):
+    alice, bob = make_user("alice"), make_user("bob")
+    problem = contest.problems.first()
+    flood = [make_submission(alice, problem) for _ in range(3)]
+    hold(app, flood)
+    assert len(released(scheduler.PRACTICE, "python3", room=2)) == 2
+
+    # Stamped from the clock rather than zero, bob's second job waits behind alice's last one
+    late = [make_submission(bob, problem) for _ in range(2)]
+    hold(app, late)
+
+    assert [id for (id,) in released(scheduler.PRACTICE, "python3")] == [late[0].id, flood[2].id, late[1].id]
+
+def test_rescheduling_a_job_id_is_a_no_op(app, contest):
+    submission = make_submission(make_user("alice"), contest.problems.first())
+    hold(app, [submission])
+    hold(app, [submission])
+
+    assert released(scheduler.PRACTICE, "python3") == [[submission.id]]
+
+def test_dispatch_tops_up_to_the_queue_depth(app, contest):
+    user = make_user("alice")
+    hold(app, [make_submission(user, contest.problems.first()) for _ in range(5)])
+    app.config["SCHEDULER_QUEUE_DEPTH"] = 3
+
+    assert scheduler.dispatch(scheduler.PRACTICE, "python3") == 3
+    assert scheduler.dispatch(scheduler.PRACTICE, "python3") == 0
+
+    stats = scheduler.stats()["queues"]["evaluation-practice-python3"]
+    assert (stats["held"], stats["queued"]) == (2, 3)
+
+def test_contest_jobs_come_first(app, contest):
+    registration = make_user("alice", contest=contest).contests.first()
+
+    assert scheduler.classify(contest, registration) == scheduler.CONTEST
+    assert scheduler.classify(contest, None) == scheduler.PRACTICE
+    assert scheduler.classify(contest, registration, rejudge=True) == scheduler.REJUDGE
+
+    contest.end_time = datetime.utcnow() - timedelta(minutes=1)
+    assert scheduler.classify(contest, registration) == scheduler.PRACTICE
+
+    assert scheduler.worker_queues("gcc") == [
+        "evaluation-contest-gcc", "evaluation-practice-gcc", "evaluation-rejudge-gcc"]
+
+def test_languages_are_routed_to_their_toolchain(app, contest):
+    user = make_user("alice")
+    hold(app, [make_submission(user, contest.problems.first(), language=language) for language in ("c", "cpp", "java")])
+
+    assert [len(released(scheduler.PRACTICE, chain)) for chain in ("gcc", "java", "python3")] == [2, 1, 0]
+
+def test_small_jobs_of_one_problem_and_language_are_batched(app, contest):
+    app.config["SCHEDULER_BATCH_SIZE"] = 2
+    user = make_user("alice")
+    first, second, _ = contest.problems.all()
+    submissions = [make_submission(user, problem) for problem in (first, second, first, first)]
+    hold(app, submissions)
+
+    ids = [s.id for s in submissions]
+    assert released(scheduler.PRACTICE, "python3") == [[ids[0], ids[2]], [ids[1]], [ids[3]]]
+
+def test_a_batch_is_one_rq_job_with_a_job_per_submission(app, contest):
+    app.config["SCHEDULER_BATCH_SIZE"] = 3
+    user = make_user("alice")
+    submissions = [make_submission(user, contest.problems.first()) for _ in range(3)]
+    hold(app, submissions)
+
+    app.config["SCHEDULER_QUEUE_DEPTH"] = 1
+    assert scheduler.dispatch(scheduler.PRACTICE, "python3") == 3
+
+    queue = app.task_queues[(scheduler.PRACTICE, "python3")]
+    batch = queue.jobs
+    assert [job.func_name for job in batch] == ["server.evaluate_batch"]
+    assert batch[0].args[0] == [f"submission:{s.id}:a" for s in submissions]
+    assert all(queue.fetch_job(id).args[0] == s.id for id, s in zip(batch[0].args[0], submissions))
@@ -0,0 +1,128 @@
+from app import db, similarity
+from app.models import Fingerprint, SimilarityMatch
+from tests.conftest import make_submission, make_user
+
+ORIGINAL = '''
+import sys
+
+def read_graph(lines):
+    n, m = map(int, lines[0].split())
+    graph = [[] for _ in range(n + 1)]
+    for line in lines[1:m + 1]:
+        a, b, w = map(int, line.split())
+        graph[a].append((b, w))
+        graph[b].append((a, w))
+    return n, graph
+
+def shortest(n, graph, source):
+    import heapq
+    dist = [10 ** 18] * (n + 1)
+    dist[source] = 0
+    heap = [(0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for v, w in graph[u]:
+            if d + w < dist[v]:
+                dist[v] = d + w
+                heapq.heappush(heap, (dist[v], v))
+    return dist
+
+n, graph = read_graph(sys.stdin.read().splitlines())
+print(shortest(n, graph, 1)[n])
+'''
+
+# Renamed, recommented and reformatted
+COPY = '''
+import sys
+# my own solution
+
+def parse(rows):
+    nodes, edges = map(int, rows[0].split())
+    adj = [[] for _ in range(nodes + 1)]
+    for row in rows[1:edges + 1]:
+        x, y, cost = map(int, row.split())
+        adj[x].append((y, cost))
+        adj[y].append((x, cost))
+    return nodes, adj
+
+def dijkstra(nodes, adj, start):
+    import heapq
+    best = [10 ** 18] * (nodes + 1)
+    best[start] = 0
+    queue = [(0, start)]
+    while queue:
+        cur, node = heapq.heappop(queue)
+        if cur > best[node]:
+            continue
+        for nxt, cost in adj[node]:
+            if cur + cost < best[nxt]:
+                best[nxt] = cur + cost
+                heapq.heappush(queue, (best[nxt], nxt))
+    return best
+
+nodes, adj = parse(sys.stdin.read().splitlines())
+print(dijkstra(nodes, adj, 1)[nodes])
+'''
+
+DIFFERENT = '''
+n = int(input())
+values = list(map(int, input().split()))
+total = 0
+best = values[0]
+for value in values:
+    total = max(value, total + value)
+    best = max(best, total)
+print(best)
+'''
+
+def accepted(user, problem, code, status=0):
+    submission = make_submission(user, problem, code=code, status=status)
+    similarity.index(submission)
+    db.session.commit()
+    return submission
+
+def test_renaming_and_comments_dont_change_the_fingerprints():
+    assert similarity.fingerprint("python3", ORIGINAL) == similarity.fingerprint("python3", COPY)
+    assert not similarity.fingerprint("python3", ORIGINAL) & similarity.fingerprint("python3", DIFFERENT)
+
+def test_only_accepted_contest_submissions_are_indexed(app, contest):
+    user = make_user("alice")
+    problem = contest.problems.first()
+    submission = accepted(user, problem, ORIGINAL)
+    accepted(user, problem, ORIGINAL, status=-1)
+    assert {f.submission_id for f in Fingerprint.query} == {submission.id}
+
+    # Rejudged, no longer passing
+    submission.status = -1
+    similarity.index(submission)
+    db.session.commit()
+    assert Fingerprint.query.count() == 0
+
+def test_check_finds_copies_between_different_users(app, contest):
+    app.config["SIMILARITY_COMMON"] = 0.9
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    problem = contest.problems.first()
+    original = accepted(alice, problem, ORIGINAL)
+    copy = accepted(bob, problem, COPY)
+    accepted(alice, problem, ORIGINAL)
+    accepted(carol, problem, DIFFERENT)
+
+    assert similarity.check(contest) == 2
+    matches = {(m.first_id, m.second_id): m.score for m in SimilarityMatch.query}
+    assert matches[(original.id, copy.id)] == 1.0
+    # Not alice's two copies of her own code
+    assert all(copy.id in pair for pair in matches)
+
+    # Checking again replaces the earlier matches
+    assert similarity.check(contest) == 2
+    assert SimilarityMatch.query.count() == 2
+
+def test_code_most_submissions_share_is_ignored(app, contest):
+    problem = contest.problems.first()
+    for username in ("alice", "bob", "carol"):
+        accepted(make_user(username), problem, ORIGINAL)
+    accepted(make_user("dave"), problem, DIFFERENT)
+
+    assert similarity.check(contest) == 0
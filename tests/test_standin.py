@@ -0,0 +1,47 @@
+from app import db, outbox, reconciler
+from app.models import Standing, Submission
+from benchmarks.common import percentile
+from benchmarks.standin import server
+from tests.conftest import make_user
+
+import pytest
+import rq
+
+@pytest.fixture
+def judge(app, monkeypatch):
+    # Writes through the test database, without the sleeps
+    monkeypatch.setattr(server, "_engine", db.engine)
+    monkeypatch.setattr(server, "CASE_LATENCY", 0)
+    monkeypatch.setattr(server, "CASES", 3)
+    queues = list(app.task_queues.values())
+
+    def judge():
+        job, _ = rq.Queue.dequeue_any(queues, None, connection=app.redis)
+        server.run(job, app.redis)
+        return job
+
+    return judge
+
+def test_submission_goes_through_the_stand_in_judge(app, contest, judge, monkeypatch):
+    monkeypatch.setattr(server, "ACCEPT", 1)
+    user = make_user("alice", contest=contest)
+    submission = Submission(user_id=user.id, problem=contest.problems.first(), code="print(1)", language="python3")
+    outbox.add(submission)
+    db.session.add(submission)
+    db.session.commit()
+    outbox.drain()
+
+    job = judge()
+    assert job.meta["progress"] == "3/3"
+
+    db.session.expire_all()
+    judged = Submission.query.get(submission.id)
+    assert judged.status == 0
+    assert [case["result"] for case in judged.get_testcases()] == [0, 0, 0]
+
+    assert reconciler.land() == 1
+    assert Standing.query.one().submission_id == submission.id
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert (percentile(samples, 50), percentile(samples, 90), percentile(samples, 100)) == (51, 91, 100)
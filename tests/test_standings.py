@@ -0,0 +1,56 @@
+from app import standings
+from app.models import Registration, Standing
+from datetime import timedelta
+from tests.conftest import make_submission, make_user
+
+def test_record_verdict_keeps_the_first_accepted_submission(contest):
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+    first = make_submission(user, problem, status=0)
+    later = make_submission(user, problem, status=0, timestamp=first.timestamp + timedelta(minutes=5))
+
+    standings.record_verdict(later)
+    standings.record_verdict(first)
+    standings.record_verdict(later)
+
+    assert Standing.query.one().submission_id == first.id
+
+def test_record_verdict_ignores_what_doesnt_score(contest):
+    user = make_user("alice", contest=contest)
+    outsider = make_user("bob")
+    problem = contest.problems.first()
+
+    assert standings.record_verdict(make_submission(user, problem, status=-1)) is None
+    assert standings.record_verdict(make_submission(outsider, problem, status=0)) is None
+    assert standings.record_verdict(make_submission(user, problem, status=0,
+        timestamp=contest.end_time + timedelta(minutes=1))) is None
+    assert Standing.query.count() == 0
+
+def test_rebuild_matches_the_submissions(contest):
+    alice = make_user("alice", contest=contest)
+    bob = make_user("bob", contest=contest)
+    first, second, _ = contest.problems.all()
+
+    solved = make_submission(alice, first, status=0)
+    make_submission(alice, first, status=0, timestamp=solved.timestamp + timedelta(minutes=1))
+    make_submission(alice, second, status=-1)
+    late = make_submission(bob, second, status=0)
+
+    assert standings.rebuild(contest) == 2
+
+    cells = standings.get_standings(contest.id)
+    registrations = {r.user_id: r for r in Registration.query}
+    assert cells[first.id][registrations[alice.id].id].submission_id == solved.id
+    assert cells[second.id][registrations[bob.id].id].submission_id == late.id
+    assert registrations[alice.id].score == first.points
+    assert registrations[bob.id].score == second.points
+    assert registrations[bob.id].last_submission == late.timestamp
+
+def test_leaderboard_renders_from_the_standings(client, contest):
+    user = make_user("alice", contest=contest)
+    standings.record_verdict(make_submission(user, contest.problems.first(), status=0))
+    standings.rebuild(contest)
+
+    response = client.get(f"/contest/{contest.id}/leaderboard")
+    assert response.status_code == 200
+    assert b"alice" in response.data
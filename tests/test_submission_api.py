@@ -0,0 +1,69 @@
+from app import db, testcases
+from datetime import datetime, timedelta
+from rq.job import Job
+from tests.conftest import events, login, make_submission, make_user
+
+import pytest
+
+CASES = [{"id": 1, "result": 0, "real_time": 12, "memory": 1024}]
+
+@pytest.fixture
+def judged(contest):
+    author = make_user("alice", contest=contest)
+    submission = make_submission(author, contest.problems.first(), status=0, progress="1/1", judged_at=datetime.utcnow())
+    testcases.record(db.session, submission.id, CASES)
+    db.session.commit()
+    return submission
+
+def test_unknown_submission_is_404(client):
+    assert client.get("/api/submission/999").status_code == 404
+
+def test_author_sees_cases_during_the_contest(client, judged):
+    login(client, "alice")
+
+    assert client.get(f"/api/submission/{judged.id}").get_json()["cases"] == CASES
+    assert events(client.get(f"/api/submission/{judged.id}/stream"))[0]["cases"] == CASES
+
+@pytest.mark.parametrize("username", [None, "bob"])
+def test_others_only_see_the_verdict_during_the_contest(client, contest, judged, username):
+    make_user("bob", contest=contest)
+    if username:
+        login(client, username)
+
+    state = client.get(f"/api/submission/{judged.id}").get_json()
+    assert state == {"progress": "1/1", "status": 0}
+    assert "cases" not in events(client.get(f"/api/submission/{judged.id}/stream"))[0]
+    assert client.get(f"/submission/{judged.id}").status_code == 302
+
+def test_everyone_sees_cases_once_the_contest_ends(client, contest, judged):
+    contest.end_time = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+
+    assert client.get(f"/api/submission/{judged.id}").get_json()["cases"] == CASES
+    assert client.get(f"/submission/{judged.id}").status_code == 200
+
+def test_status_of_many_submissions_in_one_request(app, client, contest):
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+    judged = make_submission(user, problem, status=0, progress="3/3")
+    running = make_submission(user, problem, status=-2, task_id="submission:2:a")
+
+    job = Job.create("server.evaluate", args=(running.id,), id=running.task_id, connection=app.redis)
+    job.meta["progress"] = "1/3"
+    job.save()
+
+    response = client.get(f"/api/submissions/status?ids={judged.id},{running.id},999,x")
+
+    assert response.get_json() == {
+        str(judged.id): {"progress": "3/3", "status": 0},
+        str(running.id): {"progress": "1/3", "status": -2}
+    }
+
+def test_status_takes_at_most_the_batch_limit(app, client, contest):
+    app.config["STATUS_BATCH_LIMIT"] = 2
+    user = make_user("alice", contest=contest)
+    ids = [make_submission(user, contest.problems.first(), status=0).id for _ in range(3)]
+
+    response = client.get(f"/api/submissions/status?ids={','.join(map(str, ids))}")
+
+    assert sorted(response.get_json()) == [str(id) for id in ids[:2]]
@@ -0,0 +1,47 @@
+from app import db, testcases
+from app.models import Submission
+from tests.conftest import login, make_submission, make_user
+
+def case(id, result=0, real_time=10, memory=1024):
+    return {"id": id, "result": result, "real_time": real_time, "memory": memory}
+
+def test_cases_are_visible_as_they_finish_and_retries_replace_them(contest):
+    submission = make_submission(make_user("alice"), contest.problems.first())
+
+    testcases.record(db.session, submission.id, [case(1)])
+    db.session.commit()
+    assert [c["id"] for c in Submission.query.get(submission.id).get_testcases()] == [1]
+
+    testcases.record(db.session, submission.id, [case(2), case(1, result=-1)])
+    db.session.commit()
+    db.session.expire_all()
+    assert [(c["id"], c["result"]) for c in Submission.query.get(submission.id).get_testcases()] == [(1, -1), (2, 0)]
+
+    testcases.reset(db.session, submission.id)
+    db.session.commit()
+    db.session.expire_all()
+    assert Submission.query.get(submission.id).get_testcases() is None
+
+def test_case_stats_of_a_problem(client, contest):
+    user = make_user("alice")
+    problem = contest.problems.first()
+    runs = ([case(1, real_time=100), case(2, real_time=200)], [case(1, real_time=100), case(2, -1, real_time=400)])
+    for cases in runs:
+        testcases.record(db.session, make_submission(user, problem).id, cases)
+    db.session.commit()
+
+    stats = testcases.case_stats(problem.id)
+    assert [(s["case"], s["runs"], s["failures"]) for s in stats] == [(1, 2, 0), (2, 2, 1)]
+    assert testcases.slowest(problem.id, 1)[0]["real_time"] == 400
+
+def test_case_stats_are_for_administrators(client, contest):
+    make_user("alice")
+    make_user("admin", admin=True)
+    path = f"/api/problem/{contest.problems.first().id}/testcases"
+
+    login(client, "alice")
+    assert client.get(path).status_code == 403
+
+    client.get("/logout")
+    login(client, "admin")
+    assert client.get(path).get_json() == {"cases": [], "slowest": []}
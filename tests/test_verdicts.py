@@ -0,0 +1,43 @@
+from app import db, verdicts
+from app.models import Registration, Standing, Submission
+from tests.conftest import make_submission, make_user
+
+def judged(user, problem, code, status=0):
+    # Scheduled, then judged, then landed
+    submission = make_submission(user, problem, code=code)
+    assert submission.launch_task() is not None
+
+    submission.status, submission.progress = status, "3/3"
+    db.session.commit()
+    verdicts.landed(submission)
+    return submission
+
+def test_identical_resubmission_reuses_the_verdict(app, contest):
+    user = make_user("alice", contest=contest)
+    problem = contest.problems.first()
+    judged(make_user("bob"), problem, "print(1)\n")
+
+    again = make_submission(user, problem, code="print(1)   \r\n\r\n")
+    assert again.launch_task() is None
+
+    again = Submission.query.get(again.id)
+    assert (again.status, again.progress, again.task_id) == (0, "3/3", None)
+    assert Registration.query.filter_by(user_id=user.id).one().score == problem.points
+    assert Standing.query.one().submission_id == again.id
+
+def test_new_tests_or_limits_invalidate_cached_verdicts(app, contest):
+    user = make_user("alice")
+    problem = contest.problems.first()
+    judged(user, problem, "print(1)")
+    assert verdicts.lookup(make_submission(user, problem, code="print(1)")) is not None
+
+    problem.testcase_version = (problem.testcase_version or 0) + 1
+    db.session.commit()
+    assert verdicts.lookup(make_submission(user, problem, code="print(1)")) is None
+
+def test_judge_errors_are_not_cached(app, contest):
+    user = make_user("alice")
+    problem = contest.problems.first()
+    judged(user, problem, "print(1)", status=-4)
+
+    assert verdicts.lookup(make_submission(user, problem, code="print(1)")) is None